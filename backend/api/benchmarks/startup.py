@@ -0,0 +1,101 @@
+"""
+    file: startup.py
+    brief: Cold-start benchmark for the backend service
+
+    Usage:
+        python api/benchmarks/startup.py [--runs 5] [--path /api/types] [--warmup] [--basedir DIR]
+
+    Each run starts a fresh interpreter, imports api.service and issues one
+    request through the Flask test client, reporting import time and
+    time-to-first-response (median and worst over all runs). --importtime
+    also lists the slowest imports from `python -X importtime`. --basedir
+    points at another checkout's backend/ directory, so a tree from before
+    the lazy initialization can be measured with the same probe.
+
+    Reference numbers (9 runs, median ms, Python 3.11, Flask 3.0, Pillow 11.3;
+    firebase-admin and server_utils replaced by stand-ins that import the
+    same google-auth / api-core / grpc / storage stack):
+
+                              import   first response (/api/types)
+        eager (before)         524.0   531.8
+        lazy                   284.8   295.6
+        lazy + --warmup        268.8   503.1 (warmup 226.9)
+
+    What remains at import is Flask and werkzeug themselves.
+"""
+# Standard library imports
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+from pathlib import Path
+
+basedir = Path(__file__).parent.parent.parent
+
+PROBE = """
+import json, time
+t0 = time.perf_counter()
+import api.service as service
+t1 = time.perf_counter()
+if {warmup} and hasattr(service, "warmup"):
+    service.warmup()
+t2 = time.perf_counter()
+response = service.app.test_client().get({path!r})
+t3 = time.perf_counter()
+print(json.dumps({{
+    "import_ms": (t1 - t0) * 1000,
+    "warmup_ms": (t2 - t1) * 1000,
+    "first_response_ms": (t3 - t0) * 1000,
+    "status": response.status_code,
+    "report": service.startup.report() if hasattr(service, "startup") else None
+}}))
+"""
+
+def run_once(path: str, warmup: bool, cwd: Path = basedir) -> dict:
+    """Start a fresh interpreter and time import plus first response."""
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE.format(path=path, warmup=warmup)],
+        cwd=cwd, capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def slowest_imports(limit: int = 15, cwd: Path = basedir) -> list:
+    """Parse `python -X importtime` for api.service and return the slowest cumulative imports."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import api.service"],
+        cwd=cwd, capture_output=True, text=True
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        # Format: "import time:   self_us | cumulative_us | module"
+        _, cumulative_us, name = [p.strip() for p in line.split(":", 1)[1].split("|")]
+        rows.append((int(cumulative_us) / 1000, name))
+    return sorted(rows, reverse=True)[:limit]
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure backend cold start.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--path", default="/api/types", help="Route used for the first request")
+    parser.add_argument("--warmup", action="store_true", help="Call service.warmup() before the first request")
+    parser.add_argument("--importtime", action="store_true", help="Also list the slowest imports")
+    parser.add_argument("--basedir", type=Path, default=basedir, help="backend/ directory of the tree to measure")
+    args = parser.parse_args()
+
+    runs = [run_once(args.path, args.warmup, args.basedir) for _ in range(args.runs)]
+    for key in ("import_ms", "warmup_ms", "first_response_ms"):
+        values = [r[key] for r in runs]
+        print(f"{key:>18}: median {statistics.median(values):8.1f}  max {max(values):8.1f}")
+    print(f"{'status':>18}: {runs[-1]['status']}")
+    if runs[-1]["report"] is not None:
+        print(json.dumps(runs[-1]["report"], indent=2))
+
+    if args.importtime:
+        print("\nSlowest imports (cumulative ms):")
+        for ms, name in slowest_imports(cwd=args.basedir):
+            print(f"{ms:10.1f}  {name}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+    file: build_geo_dataset.py
+    brief: Build the bundled country/state/city dataset served by /api/geo
+
+    Usage:
+        python api/migrations/build_geo_dataset.py [--country Brazil --country Portugal ...]
+
+    Downloads states and cities once from GEO_FALLBACK_URL (countriesnow.space)
+    and writes api/data/geo/countries.json sorted by accent-insensitive name,
+    which is the order GeoIndex expects. Countries already in the file are
+    replaced (and marked complete, so the service stops asking the remote
+    source for their cities); others are kept.
+"""
+# Standard library imports
+import os
+import sys
+import json
+import argparse
+from pathlib import Path
+
+# Third-party imports
+import requests
+
+# Add backend directory to sys.path
+basedir = Path(__file__).parent.parent.parent
+sys.path.append(str(basedir))
+
+from api.models.geo import DATASET, fold
+
+BASE_URL = os.environ.get("GEO_FALLBACK_URL", "https://countriesnow.space/api/v0.1")
+
+def fetch_country(session: requests.Session, name: str) -> dict:
+    """States (with cities) of one country."""
+    resp = session.post(f"{BASE_URL}/countries/states", json={"country": name}, timeout=30)
+    resp.raise_for_status()
+    data = resp.json()["data"]
+    states = []
+    for state in data["states"]:
+        resp = session.post(f"{BASE_URL}/countries/state/cities", json={"country": name, "state": state["name"]}, timeout=30)
+        cities = (resp.json().get("data") or []) if resp.ok else []
+        states.append({"name": state["name"], "code": state.get("state_code"), "cities": sorted(set(cities), key=fold)})
+        print(f"  {state['name']}: {len(cities)} cities")
+    return {"name": data.get("name", name), "iso2": data.get("iso2"), "complete": True, "states": sorted(states, key=lambda s: fold(s["name"]))}
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build the bundled geo dataset.")
+    parser.add_argument("--country", action="append", default=None, help="Country to (re)build; repeatable")
+    parser.add_argument("--output", type=Path, default=DATASET)
+    args = parser.parse_args()
+
+    existing = {"version": 0, "countries": []}
+    if args.output.exists():
+        existing = json.loads(args.output.read_text(encoding="utf-8"))
+    countries = {fold(c["name"]): c for c in existing["countries"]}
+
+    session = requests.Session()
+    for name in args.country or ["Brazil"]:
+        print(f"Fetching {name}...")
+        countries[fold(name)] = fetch_country(session, name)
+
+    dataset = {
+        "version": int(existing.get("version", 0)) + 1,
+        "source": BASE_URL,
+        "countries": sorted(countries.values(), key=lambda c: fold(c["name"]))
+    }
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(dataset, ensure_ascii=False, indent=1), encoding="utf-8")
+    print(f"Wrote {args.output} (version {dataset['version']})")
+
+if __name__ == "__main__":
+    main()
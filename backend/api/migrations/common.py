@@ -0,0 +1,20 @@
+"""
+    file: common.py
+    brief: Shared setup for one-off migration and maintenance scripts
+"""
+# Standard library imports
+import os
+import sys
+import json
+
+# Local imports
+from server_utils.database import Database
+
+def init_database() -> None:
+    """Initialize firebase-admin the same way service.py does."""
+    credentials = os.environ.get("DATABASE_SERVICE_ACCOUNT")
+    if not credentials:
+        sys.exit("DATABASE_SERVICE_ACCOUNT not set")
+    if credentials.startswith("{"):
+        credentials = json.loads(credentials)
+    Database.initialize_app(credentials, os.environ.get("DATABASE_URL"))
@@ -0,0 +1,204 @@
+"""
+    file: images_to_blobs.py
+    brief: Move inline base64 images out of Firestore documents into the blob store
+
+    Usage:
+        python api/migrations/images_to_blobs.py [--batch-size 50] [--workers 8] [--dry-run] [--restart]
+
+    The migration is idempotent (blob keys are content hashes and documents
+    that only hold references are left untouched) and resumable (the last
+    processed document id per collection is checkpointed after each batch,
+    never past a document that failed). --dry-run uploads and writes nothing.
+"""
+# Standard library imports
+import os
+import sys
+import json
+import argparse
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+
+# Third-party imports
+from dotenv import load_dotenv
+from firebase_admin import firestore, storage
+
+# Add backend directory to sys.path
+basedir = Path(__file__).parent.parent.parent
+sys.path.append(str(basedir))
+
+load_dotenv(basedir / ".env")
+load_dotenv(basedir / ".env.local", override=True)
+
+from api.migrations.common import init_database
+from api.utils.blobstore import create_blob_store, externalize_image, store_inline_image
+from api.utils.cache import create_shared_cache
+
+CHECKPOINT_FILE = Path(__file__).parent / ".images_to_blobs.checkpoint.json"
+
+def load_checkpoint() -> Dict[str, Any]:
+    if CHECKPOINT_FILE.exists():
+        return json.loads(CHECKPOINT_FILE.read_text())
+    return {}
+
+def save_checkpoint(checkpoint: Dict[str, Any]) -> None:
+    tmp = CHECKPOINT_FILE.with_suffix(".tmp")
+    tmp.write_text(json.dumps(checkpoint, indent=2))
+    os.replace(tmp, CHECKPOINT_FILE)
+
+def migrate_announcement(data: Dict[str, Any], store: Any) -> Tuple[Dict[str, Any], int]:
+    """Return (changed fields, bytes saved) for an announcement document."""
+    prefix = f"properties/{data.get('owner_id') or 'unknown'}"
+    updates: Dict[str, Any] = {}
+    saved = 0
+
+    images = data.get("images")
+    if isinstance(images, list):
+        new_images = []
+        for image in images:
+            ref, delta = externalize_image(image, store, prefix)
+            new_images.append(ref)
+            saved += delta
+        if saved:
+            updates["images"] = new_images
+
+    if data.get("layout_image"):
+        ref, delta = externalize_image(data["layout_image"], store, prefix)
+        if delta:
+            updates["layout_image"] = ref
+            saved += delta
+    if updates:
+        # Delta-sync clients only pick up documents whose updated_at moved
+        updates["updated_at"] = firestore.SERVER_TIMESTAMP
+    return updates, saved
+
+def migrate_user(doc_id: str, data: Dict[str, Any], store: Any) -> Tuple[Dict[str, Any], int]:
+    """Return (changed fields, bytes saved) for a users document."""
+    if not data.get("photoData"):
+        return {}, 0
+    stored = store_inline_image(data["photoData"], store, f"users/{doc_id}")
+    if stored is None:
+        # A legacy field that already holds a URL is just moved to photoUrl
+        return {"photoUrl": data["photoData"], "photoData": firestore.DELETE_FIELD}, 0
+    return {
+        "photoUrl": stored["url"],
+        "photoKey": stored["key"],
+        "photoVersion": stored["version"],
+        "photoData": firestore.DELETE_FIELD
+    }, max(len(data["photoData"]) - len(stored["url"]), 0)
+
+class DryRunBlobStore:
+    """Blob store that writes nothing; URLs only stand in for the real ones to estimate savings."""
+
+    def put(self, key: str, data: bytes, content_type: str) -> str:
+        return f"https://storage.googleapis.com/dry-run/{key}"
+
+def migrate_collection(name: str, store: Any, checkpoint: Dict[str, Any], batch_size: int, workers: int, dry_run: bool, cache: Any = None) -> Dict[str, int]:
+    """
+    Migrate one collection in id-ordered batches, checkpointing after each batch.
+
+    Each rewrite is conditioned on the document's update time, so an edit
+    made while its images were uploading is never overwritten; such
+    documents count as failed. The checkpoint never moves past the first
+    failed document, so the next run retries it. The collection's namespace
+    in the shared `cache` is invalidated after each batch that wrote.
+    """
+    client = firestore.client()
+    collection = client.collection(name)
+    stats = {"scanned": 0, "migrated": 0, "failed": 0, "bytes_saved": 0}
+    last_id: Optional[str] = checkpoint.get(name)
+    resume_id = last_id
+    blocked = False
+
+    def process(doc: Any) -> Tuple[Dict[str, Any], int]:
+        data = doc.to_dict() or {}
+        if name == "users":
+            return migrate_user(doc.id, data, store)
+        return migrate_announcement(data, store)
+
+    def write(doc: Any, updates: Dict[str, Any], batch: Any) -> None:
+        batch.update(doc.reference, updates, option=client.write_option(last_update_time=doc.update_time))
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while True:
+            query = collection.order_by("__name__").limit(batch_size)
+            if last_id:
+                # A cursor by id, so a checkpointed document deleted since still resumes after it
+                query = query.start_after({"__name__": collection.document(last_id)})
+            docs = list(query.stream())
+            if not docs:
+                break
+
+            results: Dict[str, Any] = {}
+            for doc, future in [(doc, pool.submit(process, doc)) for doc in docs]:
+                try:
+                    results[doc.id] = future.result()
+                except Exception as e:
+                    results[doc.id] = e
+                    print(f"[ERROR_MIGRATION] {name}/{doc.id}: {e}")
+
+            writes = [doc for doc in docs if isinstance(results[doc.id], tuple) and results[doc.id][0]]
+            if writes and not dry_run:
+                batch = client.batch()
+                for doc in writes:
+                    write(doc, results[doc.id][0], batch)
+                try:
+                    batch.commit()
+                except Exception as e:
+                    # One conflicting document fails the whole batch; find it by writing one by one
+                    print(f"[ERROR_MIGRATION] {name}: batch failed ({e}), retrying documents individually")
+                    for doc in writes:
+                        single = client.batch()
+                        write(doc, results[doc.id][0], single)
+                        try:
+                            single.commit()
+                        except Exception as e:
+                            results[doc.id] = e
+                            print(f"[ERROR_MIGRATION] {name}/{doc.id}: {e}")
+                if cache is not None:
+                    cache.invalidate(name)
+
+            for doc in docs:
+                result = results[doc.id]
+                if isinstance(result, Exception):
+                    stats["failed"] += 1
+                    blocked = True
+                    continue
+                stats["scanned"] += 1
+                if result[0]:
+                    stats["migrated"] += 1
+                    stats["bytes_saved"] += result[1]
+                if not blocked:
+                    resume_id = doc.id
+
+            last_id = docs[-1].id
+            if not dry_run and resume_id:
+                checkpoint[name] = resume_id
+                save_checkpoint(checkpoint)
+            print(f"[MIGRATION] {name}: {stats['scanned']} scanned, {stats['migrated']} migrated, {stats['failed']} failed, {stats['bytes_saved']} bytes saved")
+    return stats
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Move inline images from Firestore documents into the blob store.")
+    parser.add_argument("--batch-size", type=int, default=50, help="Documents per batch (max 500 writes per Firestore batch)")
+    parser.add_argument("--workers", type=int, default=8, help="Parallel uploads")
+    parser.add_argument("--collections", default="announcements,users", help="Comma separated collections to migrate")
+    parser.add_argument("--dry-run", action="store_true", help="Report savings without uploading, rewriting documents or checkpointing")
+    parser.add_argument("--restart", action="store_true", help="Ignore the saved checkpoint")
+    args = parser.parse_args()
+
+    init_database()
+    store = DryRunBlobStore() if args.dry_run else create_blob_store(lambda: storage.bucket())
+    checkpoint = {} if args.restart else load_checkpoint()
+    # Same CACHE_BACKEND as the service, so running workers drop stale reads
+    cache = None if args.dry_run else create_shared_cache()
+
+    total = 0
+    for name in [c.strip() for c in args.collections.split(",") if c.strip()]:
+        stats = migrate_collection(name, store, checkpoint, min(args.batch_size, 500), args.workers, args.dry_run, cache)
+        total += stats["bytes_saved"]
+        print(f"[MIGRATION] {name} done: {stats}")
+    print(f"[MIGRATION] Total bytes saved: {total}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+    file: migrate_schema.py
+    brief: Rewrite announcements to the current schema_version and quarantine corrupt ones
+
+    Usage:
+        python api/migrations/migrate_schema.py [--batch-size 200] [--background]
+
+    Runs page by page in id order until every document is at SCHEMA_VERSION.
+    With --background the work is queued on the service's task queue instead
+    (TASK_QUEUE_PATH), so running workers carry it out and resume after restarts.
+"""
+# Standard library imports
+import sys
+import argparse
+from pathlib import Path
+
+# Third-party imports
+from dotenv import load_dotenv
+
+# Add backend directory to sys.path
+basedir = Path(__file__).parent.parent.parent
+sys.path.append(str(basedir))
+
+load_dotenv(basedir / ".env")
+load_dotenv(basedir / ".env.local", override=True)
+
+from api.migrations.common import init_database
+from api.models.manager import PropertyManager, SCHEMA_VERSION
+from api.utils.tasks import create_task_queue
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Migrate announcements to the current schema.")
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--background", action="store_true", help="Queue the migration for the service workers")
+    args = parser.parse_args()
+
+    if args.background:
+        task_id = create_task_queue().enqueue("migrate_schema", {"batch_size": args.batch_size}, max_attempts=10)
+        print(f"Queued schema migration as task {task_id}")
+        return
+
+    init_database()
+    manager = PropertyManager()
+    cursor, migrated, quarantined = None, 0, 0
+    while True:
+        result = manager.migrate_schema_page(cursor, args.batch_size)
+        migrated += result["migrated"]
+        quarantined += result["quarantined"]
+        print(f"...{migrated} migrated, {quarantined} quarantined")
+        cursor = result["cursor"]
+        if not cursor:
+            break
+    print(f"Done: schema v{SCHEMA_VERSION}, {migrated} migrated, {quarantined} quarantined")
+
+if __name__ == "__main__":
+    main()
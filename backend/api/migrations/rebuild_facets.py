@@ -0,0 +1,34 @@
+"""
+    file: rebuild_facets.py
+    brief: Recompute the incremental facet aggregates from a full scan
+
+    Usage:
+        python api/migrations/rebuild_facets.py
+
+    Run once after deploying the aggregates (backfill) or to repair drift.
+"""
+# Standard library imports
+import sys
+import json
+from pathlib import Path
+
+# Third-party imports
+from dotenv import load_dotenv
+
+# Add backend directory to sys.path
+basedir = Path(__file__).parent.parent.parent
+sys.path.append(str(basedir))
+
+load_dotenv(basedir / ".env")
+load_dotenv(basedir / ".env.local", override=True)
+
+from api.migrations.common import init_database
+from api.models.manager import PropertyManager
+
+def main() -> None:
+    init_database()
+    totals = PropertyManager().rebuild_facets()
+    print(json.dumps(totals, indent=2, ensure_ascii=False))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""
+    file: recompute_prices.py
+    brief: Recompute normalized prices after editing the exchange rate table
+
+    Usage:
+        python api/migrations/recompute_prices.py [--batch-size 400]
+
+    Also backfills documents written before normalized prices existed.
+"""
+# Standard library imports
+import sys
+import argparse
+from pathlib import Path
+
+# Third-party imports
+from dotenv import load_dotenv
+
+# Add backend directory to sys.path
+basedir = Path(__file__).parent.parent.parent
+sys.path.append(str(basedir))
+
+load_dotenv(basedir / ".env")
+load_dotenv(basedir / ".env.local", override=True)
+
+from api.migrations.common import init_database
+from api.models.manager import PropertyManager
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Recompute normalized announcement prices.")
+    parser.add_argument("--batch-size", type=int, default=400, help="Writes per Firestore batch (max 500)")
+    args = parser.parse_args()
+
+    init_database()
+    manager = PropertyManager()
+    if manager.rates is None:
+        sys.exit("Exchange rate table could not be loaded")
+    updated = manager.recompute_normalized_prices(min(args.batch_size, 500))
+    print(f"[MIGRATION] Rates {manager.rates.version}: {updated} announcements updated")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+    file: aggregates.py
+    brief: Incrementally maintained facet counts and histograms for announcements
+"""
+# Standard library imports
+import time
+import random
+import threading
+from typing import Any, Dict, List, Optional
+
+# Local imports
+from api.utils.startup import lazy_module
+
+firestore = lazy_module("firebase_admin.firestore")
+
+# 1-2-5 series bucket lower edges
+PRICE_EDGES: List[float] = [0] + [m * 10 ** e for e in range(2, 8) for m in (1, 2, 5)]
+AREA_EDGES: List[float] = [0, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000]
+BEDROOM_BUCKETS = ["0", "1", "2", "3", "4", "5+"]
+
+def bucket_of(value: float, edges: List[float]) -> str:
+    """Label of the bucket containing value (its lower edge)."""
+    label = edges[0]
+    for edge in edges:
+        if value >= edge:
+            label = edge
+        else:
+            break
+    return str(int(label))
+
+def facet_key(value: Any) -> str:
+    """Normalize a facet value into a safe Firestore map key."""
+    key = str(value or "").strip().replace(".", "")
+    return key or "unknown"
+
+def city_of(public_address: str) -> str:
+    """Extract the city from a public address formatted as "Neighborhood, City, State - Country"."""
+    parts = [p.strip() for p in (public_address or "").split(" - ")[0].split(",") if p.strip()]
+    if not parts:
+        return ""
+    return parts[-2] if len(parts) >= 2 else parts[0]
+
+def contributions(prop: Any) -> Dict[str, Dict[str, Any]]:
+    """Counts a single announcement adds to the aggregates (nested dict of ints)."""
+    d = prop.data
+    c = d.characteristics
+    currency = facet_key(d.currency)
+    bedrooms = min(int(c.bedrooms or 0), 5)
+
+    counts: Dict[str, Dict[str, Any]] = {
+        "total": {"count": 1},
+        "property_type": {facet_key(d.property_type): 1},
+        "listing_type": {facet_key(d.listing_type): 1},
+        "status": {facet_key(d.status): 1},
+        "bedrooms": {BEDROOM_BUCKETS[bedrooms]: 1},
+        "amenities": {facet_key(a): 1 for a in (d.amenities or [])},
+        "city": {facet_key(city_of(d.address.public)): 1},
+        "price": {currency: {facet_key(d.listing_type): {bucket_of(d.price or 0, PRICE_EDGES): 1}}},
+        "area": {facet_key(c.area_unit): {bucket_of(c.area or 0, AREA_EDGES): 1}},
+    }
+    return counts
+
+def _merge(target: Dict[str, Any], source: Dict[str, Any], sign: int) -> None:
+    for key, value in source.items():
+        if isinstance(value, dict):
+            _merge(target.setdefault(key, {}), value, sign)
+        else:
+            target[key] = target.get(key, 0) + sign * value
+
+def _prune(counts: Dict[str, Any]) -> Dict[str, Any]:
+    pruned = {}
+    for key, value in counts.items():
+        if isinstance(value, dict):
+            value = _prune(value)
+            if value:
+                pruned[key] = value
+        elif value:
+            pruned[key] = value
+    return pruned
+
+def delta(old: Optional[Any], new: Optional[Any]) -> Dict[str, Any]:
+    """Non-zero count changes for replacing `old` with `new` (either may be None)."""
+    counts: Dict[str, Any] = {}
+    if new is not None:
+        _merge(counts, contributions(new), 1)
+    if old is not None:
+        _merge(counts, contributions(old), -1)
+    return _prune(counts)
+
+def _as_increments(counts: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        key: _as_increments(value) if isinstance(value, dict) else firestore.firestore.Increment(value)
+        for key, value in counts.items()
+    }
+
+class AggregateStats:
+    """
+    Facet counts stored in sharded counter documents.
+
+    Writes add deltas to a random shard inside the caller's batch, so the
+    aggregates commit atomically with the announcement and no single
+    document takes every write. Reads sum the shards and never scan
+    announcements.
+    """
+
+    COLLECTION = "stats"
+    NAME = "announcements"
+
+    def __init__(self, shards: int = 10, cache_ttl: float = 30.0) -> None:
+        """Initialize the aggregates accessor."""
+        self.shards = shards
+        self.cache_ttl = cache_ttl
+        self._cache: Optional[Dict[str, Any]] = None
+        self._cache_time = 0.0
+        self._lock = threading.Lock()
+
+    def _shard_ref(self, client: Any, index: int) -> Any:
+        return client.collection(self.COLLECTION).document(f"{self.NAME}_{index}")
+
+    def apply(self, batch: Any, client: Any, old: Optional[Any], new: Optional[Any]) -> None:
+        """Add the aggregate changes for old -> new to a write batch."""
+        changes = delta(old, new)
+        if changes:
+            batch.set(self._shard_ref(client, random.randrange(self.shards)), _as_increments(changes), merge=True)
+        self._cache = None
+
+    def facets(self) -> Dict[str, Any]:
+        """Summed aggregates across shards (cached for cache_ttl seconds)."""
+        with self._lock:
+            if self._cache is not None and time.time() - self._cache_time < self.cache_ttl:
+                return self._cache
+        client = firestore.client()
+        totals: Dict[str, Any] = {}
+        for doc in client.get_all([self._shard_ref(client, i) for i in range(self.shards)]):
+            if doc.exists:
+                _merge(totals, doc.to_dict() or {}, 1)
+        totals = _prune(totals)
+        with self._lock:
+            self._cache = totals
+            self._cache_time = time.time()
+        return totals
+
+    def rebuild(self, props: List[Any]) -> Dict[str, Any]:
+        """Recompute aggregates from scratch (one-time backfill) and overwrite all shards."""
+        client = firestore.client()
+        totals: Dict[str, Any] = {}
+        for prop in props:
+            _merge(totals, contributions(prop), 1)
+        batch = client.batch()
+        batch.set(self._shard_ref(client, 0), totals)
+        for i in range(1, self.shards):
+            batch.set(self._shard_ref(client, i), {})
+        batch.commit()
+        self._cache = None
+        return totals
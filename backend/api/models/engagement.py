@@ -0,0 +1,161 @@
+"""
+    file: engagement.py
+    brief: Buffered, write-coalesced view and engagement counters for announcements
+"""
+# Standard library imports
+import os
+import atexit
+import threading
+from collections import defaultdict
+from typing import Any, Dict, Iterable, Optional
+
+# Local imports
+from api.utils.startup import lazy_module
+
+firestore = lazy_module("firebase_admin.firestore")
+
+# Events that may be counted (stored as announcement.engagement.<event>)
+EVENTS = {"views", "contact_clicks", "share_clicks", "map_clicks", "photo_opens"}
+# Events clients may report themselves; views are counted server-side
+CLIENT_EVENTS = EVENTS - {"views"}
+# Firestore batches are capped at 500 writes
+MAX_BATCH = 500
+
+class EngagementCounters:
+    """
+    Per-worker accumulator for engagement counters.
+
+    `record()` only touches a dict in memory, so counting adds nothing to
+    read latency. A background thread flushes the accumulated deltas every
+    `interval` seconds as one Increment update per announcement, which keeps
+    each document far below Firestore's sustained per-document write rate no
+    matter how hot the listing is. Pending deltas are flushed at exit
+    (gunicorn's graceful shutdown runs atexit handlers); a hard kill loses at
+    most one interval of counts.
+    """
+
+    def __init__(self, collection: str = "announcements", interval: Optional[float] = None) -> None:
+        """Initialize an empty buffer; the flusher starts on first record()."""
+        self.collection = collection
+        self.interval = interval if interval is not None else float(os.environ.get("ENGAGEMENT_FLUSH_SECONDS", "15"))
+        self._pending: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._pid: Optional[int] = None
+        self.flushed_writes = 0
+        self.dropped = 0
+
+    def record(self, property_id: str, event: str, count: int = 1) -> None:
+        """Count an event for an announcement (buffered)."""
+        if event not in EVENTS:
+            raise ValueError(f"Unknown engagement event: {event}")
+        self._ensure_flusher()
+        with self._lock:
+            self._pending[property_id][event] += count
+
+    def pending(self, property_id: str) -> Dict[str, int]:
+        """Deltas not yet flushed for an announcement (this worker only)."""
+        with self._lock:
+            return dict(self._pending.get(property_id, {}))
+
+    def _ensure_flusher(self) -> None:
+        # One flusher thread per process; the buffer of a forked parent is not inherited work
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pending = defaultdict(lambda: defaultdict(int))
+            self._stop.clear()
+            threading.Thread(target=self._run, name="engagement-flusher", daemon=True).start()
+            atexit.register(self.shutdown)
+            self._pid = os.getpid()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"[ERROR_ENGAGEMENT] Flush failed: {e}")
+
+    def _merge_back(self, deltas: Iterable) -> None:
+        """Return unwritten deltas to the buffer so the next flush retries them."""
+        with self._lock:
+            for property_id, counts in deltas:
+                for event, n in counts.items():
+                    self._pending[property_id][event] += n
+
+    def flush(self) -> int:
+        """
+        Write all pending deltas in batched Increment updates.
+
+        Returns the number of announcements updated.
+        """
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                pending, self._pending = self._pending, defaultdict(lambda: defaultdict(int))
+
+            items = list(pending.items())
+            written = 0
+            start = 0
+            try:
+                client = firestore.client()
+                for start in range(0, len(items), MAX_BATCH):
+                    chunk = items[start:start + MAX_BATCH]
+                    batch = client.batch()
+                    for property_id, counts in chunk:
+                        batch.update(client.collection(self.collection).document(property_id), self._increments(counts))
+                    try:
+                        batch.commit()
+                        written += len(chunk)
+                    except Exception:
+                        # One deleted listing fails the whole batch; retry documents one by one
+                        written += self._write_individually(client, chunk)
+            except Exception:
+                self._merge_back(items[start:])
+                raise
+            finally:
+                self.flushed_writes += written
+            return written
+
+    def _write_individually(self, client: Any, chunk: list) -> int:
+        from google.api_core.exceptions import NotFound
+        written = 0
+        failed = []
+        for property_id, counts in chunk:
+            try:
+                client.collection(self.collection).document(property_id).update(self._increments(counts))
+                written += 1
+            except NotFound:
+                # Listing was deleted; its counts go with it
+                self.dropped += 1
+            except Exception as e:
+                print(f"[ERROR_ENGAGEMENT] Failed to write counters for {property_id}: {e}")
+                failed.append((property_id, counts))
+        self._merge_back(failed)
+        return written
+
+    @staticmethod
+    def _increments(counts: Dict[str, int]) -> Dict[str, Any]:
+        updates: Dict[str, Any] = {f"engagement.{event}": firestore.Increment(n) for event, n in counts.items() if n}
+        # Counters are serialized with the listing, so delta-sync clients must see the change
+        updates["updated_at"] = firestore.SERVER_TIMESTAMP
+        return updates
+
+    def shutdown(self) -> None:
+        """Stop the flusher and write whatever is still buffered."""
+        self._stop.set()
+        try:
+            self.flush()
+        except Exception as e:
+            print(f"[ERROR_ENGAGEMENT] Final flush failed, {sum(len(c) for c in self._pending.values())} counters lost: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Buffer size and flush counters for this worker."""
+        with self._lock:
+            buffered = sum(sum(c.values()) for c in self._pending.values())
+            listings = len(self._pending)
+        return {"buffered_events": buffered, "buffered_listings": listings, "interval": self.interval, "flushed_writes": self.flushed_writes, "dropped": self.dropped}
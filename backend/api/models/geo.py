@@ -0,0 +1,216 @@
+"""
+    file: geo.py
+    brief: Bundled country/state/city reference data with prefix search, and a cached address autocomplete proxy
+"""
+# Standard library imports
+import json
+import time
+import bisect
+import threading
+import unicodedata
+from pathlib import Path
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+DATASET = Path(__file__).parent.parent / "data" / "geo" / "countries.json"
+
+def fold(text: str) -> str:
+    """Accent- and case-insensitive search key ("São  Paulo" -> "sao paulo")."""
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return " ".join(stripped.casefold().split())
+
+class PrefixIndex:
+    """Sorted key list answering prefix queries with bisect; every word of a name is a key."""
+
+    def __init__(self, entries: List[Tuple[str, Any]]) -> None:
+        """Build from (name, payload) pairs."""
+        rows = []
+        for order, (name, payload) in enumerate(entries):
+            words = fold(name).split()
+            for i in range(len(words)):
+                # Whole-name matches rank before word matches, then dataset order
+                rows.append((" ".join(words[i:]), 0 if i == 0 else 1, order, payload))
+        rows.sort(key=lambda r: r[0])
+        self._keys = [r[0] for r in rows]
+        self._rows = rows
+
+    def search(self, prefix: str, limit: Optional[int] = 20) -> List[Any]:
+        """Payloads whose name (or any word of it) starts with prefix (all of them when limit is None)."""
+        key = fold(prefix)
+        start = bisect.bisect_left(self._keys, key)
+        matches = []
+        for i in range(start, len(self._keys)):
+            if not self._keys[i].startswith(key):
+                break
+            matches.append(self._rows[i])
+        matches.sort(key=lambda r: (r[1], r[2]))
+        seen, results = set(), []
+        for _, _, order, payload in matches:
+            if order in seen:
+                continue
+            seen.add(order)
+            results.append(payload)
+            if limit is not None and len(results) >= limit:
+                break
+        return results
+
+def filter_prefix(names: List[str], prefix: str = "", limit: Optional[int] = None) -> List[str]:
+    """Names matching prefix the way GeoIndex does (any word, accent-insensitive)."""
+    if not fold(prefix):
+        return list(names)[:limit]
+    return PrefixIndex([(name, name) for name in names]).search(prefix, limit)
+
+class GeoIndex:
+    """
+    Countries, states and cities from the bundled dataset.
+
+    The dataset is sorted at build time (see migrations/build_geo_dataset.py),
+    so loading is a single pass; lookups are accent-insensitive and accept
+    state codes ("SP") as well as names. A country may be bundled with only
+    part of its cities ("complete": false); callers fill in the rest from
+    the remote source.
+    """
+
+    def __init__(self, dataset: Dict[str, Any]) -> None:
+        """Index a dataset dict ({"countries": [{"name", "iso2", "states": [...]}]})."""
+        self.version = dataset.get("version")
+        self._countries: Dict[str, Dict[str, Any]] = {}
+        self._states: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._city_index: Dict[Tuple[str, str], PrefixIndex] = {}
+        self._state_index: Dict[str, PrefixIndex] = {}
+        places: List[Tuple[str, Any]] = []
+
+        for country in dataset.get("countries", []):
+            ckey = fold(country["name"])
+            self._countries[ckey] = country
+            if country.get("iso2"):
+                self._countries[fold(country["iso2"])] = country
+            states = self._states.setdefault(ckey, {})
+            for state in country.get("states", []):
+                states[fold(state["name"])] = state
+                if state.get("code"):
+                    states[fold(state["code"])] = state
+                self._city_index[(ckey, fold(state["name"]))] = PrefixIndex([(city, city) for city in state.get("cities", [])])
+                places.append((state["name"], {"type": "state", "name": state["name"], "code": state.get("code"), "country": country["name"]}))
+                places.extend((city, {"type": "city", "name": city, "state": state["name"], "country": country["name"]}) for city in state.get("cities", []))
+            self._state_index[ckey] = PrefixIndex([(s["name"], s) for s in country.get("states", [])])
+
+        self._country_index = PrefixIndex([(c["name"], c) for c in dataset.get("countries", [])])
+        self._places = PrefixIndex(places)
+
+    @classmethod
+    def load(cls, path: Optional[Path] = None) -> "GeoIndex":
+        """Load the bundled dataset (or the file at path)."""
+        with open(path or DATASET, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def country(self, name: str) -> Optional[Dict[str, Any]]:
+        """Country record by name or ISO code, if bundled."""
+        return self._countries.get(fold(name))
+
+    def is_complete(self, country: str) -> bool:
+        """Whether every city of a country is bundled."""
+        record = self.country(country)
+        return record is not None and record.get("complete", True)
+
+    def state_name(self, country: str, state: str) -> Optional[str]:
+        """Canonical name of a bundled state given its name or code."""
+        record = self.country(country)
+        if record is None:
+            return None
+        state_record = self._states[fold(record["name"])].get(fold(state))
+        return state_record["name"] if state_record else None
+
+    def countries(self, prefix: str = "", limit: Optional[int] = None) -> List[Dict[str, str]]:
+        """Bundled countries matching prefix."""
+        return [{"name": c["name"], "iso2": c.get("iso2")} for c in self._country_index.search(prefix, limit)]
+
+    def states(self, country: str, prefix: str = "", limit: Optional[int] = None) -> Optional[List[Dict[str, Any]]]:
+        """States of a country matching prefix; None when the country is not bundled."""
+        record = self.country(country)
+        if record is None:
+            return None
+        return [{"name": s["name"], "code": s.get("code")} for s in self._state_index[fold(record["name"])].search(prefix, limit)]
+
+    def cities(self, country: str, state: str, prefix: str = "", limit: Optional[int] = None) -> Optional[List[str]]:
+        """Cities of a state matching prefix; None when the country or state is not bundled."""
+        record = self.country(country)
+        if record is None:
+            return None
+        state_record = self._states[fold(record["name"])].get(fold(state))
+        if state_record is None:
+            return None
+        return self._city_index[(fold(record["name"]), fold(state_record["name"]))].search(prefix, limit)
+
+    def search(self, prefix: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """States and cities of every bundled country matching prefix."""
+        return self._places.search(prefix, limit) if fold(prefix) else []
+
+class AddressAutocomplete:
+    """
+    Cached, throttled and coalesced proxy in front of an external geocoder.
+
+    Results are stored in a persistent SharedCache keyed by the folded query,
+    so repeated lookups (by anyone) never leave the server. Identical queries
+    in flight at the same time share one upstream call, and upstream calls
+    are spaced at least `min_interval` apart per worker (Nominatim's usage
+    policy is one request per second).
+    """
+
+    def __init__(self, fetch: Callable[[str, int, str], List[Dict[str, Any]]], cache: Any, min_interval: float = 1.0, ttl: float = 30 * 86400, min_length: int = 3) -> None:
+        """Initialize with fetch(query, limit, lang) and a SharedCache."""
+        self.fetch = fetch
+        self.cache = cache
+        self.min_interval = min_interval
+        self.ttl = ttl
+        self.min_length = min_length
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._throttle = threading.Lock()
+        self._last_call = 0.0
+        self.upstream_calls = 0
+        self.coalesced = 0
+
+    def search(self, query: str, limit: int = 5, lang: str = "") -> List[Dict[str, Any]]:
+        """Suggestions for query (empty for queries shorter than min_length)."""
+        folded = fold(query)
+        if len(folded) < self.min_length:
+            return []
+        key = f"{lang}:{limit}:{folded}"
+        cached = self.cache.get("geocode", key)
+        if cached is not None:
+            return cached
+
+        with self._lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[key] = future
+            else:
+                self.coalesced += 1
+        if not owner:
+            return future.result(timeout=30)
+
+        try:
+            with self._throttle:
+                wait = self._last_call + self.min_interval - time.monotonic()
+                if wait > 0:
+                    time.sleep(wait)
+                self._last_call = time.monotonic()
+                self.upstream_calls += 1
+            results = self.fetch(query.strip(), limit, lang)
+            self.cache.set("geocode", key, results, ttl=self.ttl)
+            future.set_result(results)
+            return results
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Upstream and coalescing counters for this worker."""
+        return {"upstream_calls": self.upstream_calls, "coalesced": self.coalesced, "cache": self.cache.stats()}
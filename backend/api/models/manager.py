@@ -3,7 +3,12 @@
     brief: Property and Category models for State Manager
 """
 # Standard library imports
+import json
+import time
 import uuid
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
 import random
 import string
 from typing import Any, Dict, List, Optional
@@ -11,9 +16,24 @@ from dataclasses import dataclass, field
 
 # Local imports
 from server_utils.database import Database
+from api.models.replica import AnnouncementReplica
+from api.models.aggregates import AggregateStats
+from api.models.pricing import RateTable, normalized_prices
+from api.utils.images import pick_variant
+from api.utils.startup import lazy_module
 import flask
 
+firestore = lazy_module("firebase_admin.firestore")
+
+DATA_DIR = Path(__file__).parent.parent / "data"
+
+# Bump when the stored layout changes; upgrade_document must handle every older version
+SCHEMA_VERSION = 2
 INTERNAL_KEYS = {"bedrooms", "bathrooms", "suites", "rooms", "garages", "area", "total", "total_area", "area_unit", "total_area_unit"}
+# Maintained server-side with Increment writes only; never taken from client payloads
+COUNTER_KEYS = ("favorite_count", "engagement")
+# Top-level fields of older layouts; upgrade_document prefers them, so they must not outlive a migration
+LEGACY_KEYS = INTERNAL_KEYS | {"private_address", "public_address"}
 
 def generate_friendly_id() -> str:
     """Generate a friendly, random alphanumeric ID."""
@@ -57,7 +77,16 @@ class PropertyData:
     annual_fee_label: str = "iptu"
     condo_fee: Optional[float] = 0.0
     favorite_count: int = 0
+    # Buffered engagement counters (views, contact_clicks, ...), see api.models.engagement
+    engagement: Dict[str, int] = field(default_factory=dict)
     show_exact_address: bool = False
+
+    # Base-currency, monthly-equivalent prices maintained on write (see pricing.py)
+    normalized_price: Optional[float] = None
+    normalized_sale_price: Optional[float] = None
+    normalized_rent_price: Optional[float] = None
+    normalized_vacation_price: Optional[float] = None
+    price_rates_version: str = ""
     
     # Nested Data Classes
     characteristics: PropertyCharacteristics = field(default_factory=PropertyCharacteristics)
@@ -68,6 +97,8 @@ class PropertyData:
     amenities: List[str] = field(default_factory=list)
     
     images: List[str] = field(default_factory=list)
+    # Server-generated variant manifests, parallel to `images`
+    image_variants: List[Optional[Dict[str, Any]]] = field(default_factory=list)
     layout_image: Optional[str] = None
     owner_id: str = ""
     created_at: Any = None
@@ -90,8 +121,14 @@ class Property:
         if not self.data.title or not str(self.data.title).strip():
             raise ValueError("Title is required and cannot be empty")
 
-    def to_dict(self, include_location: bool = True, is_owner: bool = False) -> Dict[str, Any]:
-        """Convert property to dictionary."""
+    def to_dict(self, include_location: bool = True, is_owner: bool = False, image_size: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Convert property to dictionary.
+
+        When `image_size` is given (e.g. "card"), images that have server-side
+        variants are replaced by the URL of the smallest variant that fits and
+        the variant manifests are left out.
+        """
         d = self.data
         c = d.characteristics
         addr = d.address
@@ -146,6 +183,12 @@ class Property:
             "listing_type": d.listing_type,
             "status": d.status,
             "favorite_count": d.favorite_count,
+            "engagement": d.engagement,
+            "normalized_price": d.normalized_price,
+            "normalized_sale_price": d.normalized_sale_price,
+            "normalized_rent_price": d.normalized_rent_price,
+            "normalized_vacation_price": d.normalized_vacation_price,
+            "price_rates_version": d.price_rates_version,
             
             # Sub-category characteristics (Stats)
             "characteristics": characteristics_dict,
@@ -154,7 +197,7 @@ class Property:
             "features": {k: v for k, v in d.features.items() if k not in INTERNAL_KEYS},
             "amenities": [a for a in d.amenities if a not in INTERNAL_KEYS] if d.amenities else [k for k, v in d.features.items() if v and k not in INTERNAL_KEYS],
             
-            "images": d.images,
+            "images": self._sized_images(image_size) if image_size else d.images,
             "layout_image": d.layout_image,
             "address": addr_dict,
             "display_address": display_str,
@@ -171,6 +214,10 @@ class Property:
             "created_at": None
         }
 
+        # Sized views already carry the variant URL; the manifests would only add weight
+        if not image_size:
+            export["image_variants"] = d.image_variants
+
         # Date serialization
         if d.created_at:
             if hasattr(d.created_at, 'isoformat'):
@@ -180,66 +227,51 @@ class Property:
                 
         return export
 
+    def _sized_images(self, image_size: str) -> List[str]:
+        """Images list with inline payloads swapped for sized variant URLs where available."""
+        variants = self.data.image_variants
+        sized = []
+        for i, image in enumerate(self.data.images):
+            manifest = variants[i] if i < len(variants) else None
+            sized.append(pick_variant(manifest, image_size) or image if manifest else image)
+        return sized
+
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'Property':
-        """Create a property from dictionary."""
-        # 1. Parse Characteristics (Stats)
-        # Check top level or 'characteristics' dict (legacy mixed bag)
-        raw_chars = data.get("characteristics", {})
-        raw_features = data.get("features", {}) # New field
-        
-        def get_stat(key, default=0):
-            # 1. Try explicit new structure (data.characteristics not passed usually, data is flattened JSON)
-            # 2. Try top level key
-            # 3. Try inside 'characteristics' (legacy)
-            return data.get(key) or raw_chars.get(key) or default
+        """
+        Create a property from dictionary.
+
+        Documents at SCHEMA_VERSION are read as-is; anything older (and
+        client payloads) is first normalized by upgrade_document.
+        """
+        if data.get("schema_version", 0) < SCHEMA_VERSION:
+            data = upgrade_document(data)
 
+        # 1. Characteristics (Stats)
+        chars = data.get("characteristics") or {}
         stats = PropertyCharacteristics(
-            bedrooms=int(get_stat("bedrooms")),
-            bathrooms=int(get_stat("bathrooms")),
-            suites=int(get_stat("suites")),
-            rooms=int(get_stat("rooms")),
-            garages=int(get_stat("garages")),
-            area=float(get_stat("area", 0.0)),
-            total_area=float(get_stat("total_area") or get_stat("total") or 0.0),
-            area_unit=data.get("area_unit") or raw_chars.get("area_unit") or "m2",
-            total_area_unit=data.get("total_area_unit") or raw_chars.get("total_area_unit") or data.get("area_unit") or raw_chars.get("area_unit") or "m2"
+            bedrooms=int(chars.get("bedrooms") or 0),
+            bathrooms=int(chars.get("bathrooms") or 0),
+            suites=int(chars.get("suites") or 0),
+            rooms=int(chars.get("rooms") or 0),
+            garages=int(chars.get("garages") or 0),
+            area=float(chars.get("area") or 0.0),
+            total_area=float(chars.get("total_area") or 0.0),
+            area_unit=chars.get("area_unit") or "m2",
+            total_area_unit=chars.get("total_area_unit") or chars.get("area_unit") or "m2"
         )
 
-        # 2. Parse Features (Extras)
-        # If 'features' exists, use it. Else extract from 'characteristics' excluding stats.
-        if raw_features:
-            features = {k: v for k, v in raw_features.items() if (k not in INTERNAL_KEYS and isinstance(v, bool))}
-        else:
-            features = {k: v for k, v in raw_chars.items() if (k not in INTERNAL_KEYS and isinstance(v, bool))}
-        
-        # New amenities list (ordered)
-        amenities = data.get("amenities")
-        if isinstance(amenities, list):
-            # Filter specifically for the problematic keys
-            amenities = [a for a in amenities if a not in INTERNAL_KEYS]
-        
-        if not amenities and features:
-            amenities = [k for k, v in features.items() if v]
-        if not amenities:
-            amenities = []
-        
-        # 3. Parse Address
-        # Check 'address' dict (new layout) or legacy flat fields
-        if "address" in data and isinstance(data["address"], dict):
-            a_data = data["address"]
-            addr = PropertyAddress(
-                private=a_data.get("private", ""),
-                public=a_data.get("public", ""),
-                location=a_data.get("location")
-            )
-        else:
-            # Migration
-            addr = PropertyAddress(
-                private=data.get("private_address") or data.get("address") or "",
-                public=data.get("public_address", ""),
-                location=data.get("location")
-            )
+        # 2. Features (Extras) and ordered amenities
+        features = {k: v for k, v in (data.get("features") or {}).items() if k not in INTERNAL_KEYS and isinstance(v, bool)}
+        amenities = [a for a in data.get("amenities") or [] if a not in INTERNAL_KEYS]
+
+        # 3. Address
+        a_data = data.get("address") or {}
+        addr = PropertyAddress(
+            private=a_data.get("private", ""),
+            public=a_data.get("public", ""),
+            location=a_data.get("location")
+        )
 
         # Parse Prices with safety for empty strings
         def safe_float(val):
@@ -303,11 +335,18 @@ class Property:
             annual_fee_label=data.get("annual_fee_label", "iptu"),
             condo_fee=condo_fee,
             favorite_count=int(data.get("favorite_count", 0)),
+            engagement={k: int(v) for k, v in (data.get("engagement") or {}).items()},
+            normalized_price=safe_float(data.get("normalized_price")),
+            normalized_sale_price=safe_float(data.get("normalized_sale_price")),
+            normalized_rent_price=safe_float(data.get("normalized_rent_price")),
+            normalized_vacation_price=safe_float(data.get("normalized_vacation_price")),
+            price_rates_version=data.get("price_rates_version", ""),
             characteristics=stats,
             address=addr,
             features=features,
             amenities=amenities,
             images=data.get("images", []),
+            image_variants=data.get("image_variants") or [],
             layout_image=data.get("layout_image"),
             owner_id=data.get("owner_id", ""),
             show_exact_address=data.get("show_exact_address", False),
@@ -315,14 +354,153 @@ class Property:
         )
         return cls(prop_data)
 
+def upgrade_document(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Normalize a legacy document (or client payload) to the current layout.
+
+    Handles flat private/public address fields, stats at the top level or
+    mixed into `characteristics`, `total` instead of `total_area`, and
+    features derived from boolean characteristics. Returns a new dict with
+    schema_version set; the input is not modified.
+    """
+    raw_chars = data.get("characteristics") or {}
+    raw_features = data.get("features") or {}
+
+    def get_stat(key, default=0):
+        # Top level key first (flattened payloads), then inside 'characteristics' (legacy)
+        return data.get(key) or raw_chars.get(key) or default
+
+    characteristics = {
+        "bedrooms": get_stat("bedrooms"),
+        "bathrooms": get_stat("bathrooms"),
+        "suites": get_stat("suites"),
+        "rooms": get_stat("rooms"),
+        "garages": get_stat("garages"),
+        "area": get_stat("area", 0.0),
+        "total_area": get_stat("total_area") or get_stat("total") or 0.0,
+        "area_unit": data.get("area_unit") or raw_chars.get("area_unit") or "m2",
+        "total_area_unit": data.get("total_area_unit") or raw_chars.get("total_area_unit") or data.get("area_unit") or raw_chars.get("area_unit") or "m2"
+    }
+
+    # If 'features' exists, use it. Else extract from 'characteristics' excluding stats.
+    source = raw_features if raw_features else raw_chars
+    features = {k: v for k, v in source.items() if k not in INTERNAL_KEYS and isinstance(v, bool)}
+
+    amenities = data.get("amenities")
+    if isinstance(amenities, list):
+        amenities = [a for a in amenities if a not in INTERNAL_KEYS]
+    if not amenities and features:
+        amenities = [k for k, v in features.items() if v]
+
+    if isinstance(data.get("address"), dict):
+        a_data = data["address"]
+        address = {"private": a_data.get("private", ""), "public": a_data.get("public", ""), "location": a_data.get("location")}
+    else:
+        address = {
+            "private": data.get("private_address") or data.get("address") or "",
+            "public": data.get("public_address", ""),
+            "location": data.get("location")
+        }
+
+    upgraded = dict(data)
+    upgraded.update({
+        "characteristics": characteristics,
+        "features": features,
+        "amenities": amenities or [],
+        "address": address,
+        "schema_version": SCHEMA_VERSION
+    })
+    return upgraded
+
+def needs_upgrade(data: Dict[str, Any]) -> bool:
+    """Whether a payload carries any legacy layout that upgrade_document must normalize."""
+    return bool(LEGACY_KEYS & data.keys()) or ("address" in data and not isinstance(data["address"], dict))
+
+def image_urls(data: Dict[str, Any]) -> List[str]:
+    """Every image URL an announcement dict points at (originals, layout and variants)."""
+    urls = [img for img in data.get("images") or [] if isinstance(img, str)]
+    if isinstance(data.get("layout_image"), str):
+        urls.append(data["layout_image"])
+    for manifest in data.get("image_variants") or []:
+        for variant in (manifest or {}).get("variants", {}).values():
+            urls.extend(variant.get("urls", {}).values())
+    return urls
+
 class PropertyManager:
     """Manager for property operations."""
 
     COLLECTION = "announcements"
-
-    def __init__(self) -> None:
+    # One document per announcement id that failed to parse
+    QUARANTINE = "announcements_quarantine"
+    # One document per deleted announcement id, kept for TOMBSTONE_TTL seconds
+    TOMBSTONES = "announcements_tombstones"
+    TOMBSTONE_TTL = 30 * 86400
+    # Server timestamps are assigned at commit, so a write can surface slightly
+    # behind a sync that already ran; each sync re-reads this much history
+    SYNC_OVERLAP = 5.0
+
+    def __init__(self, replica: Optional[AnnouncementReplica] = None, cache: Any = None) -> None:
         """Initialize PropertyManager."""
         self.db = Database()
+        # Optional SharedCache (api.utils.cache), invalidated on every write
+        self.cache = cache
+        # Announcement reads are only cached when every worker sees the invalidations;
+        # a per-worker cache would keep serving data another worker just changed
+        self.read_cache = cache if cache is not None and cache.shared else None
+        # Optional in-memory replica (see ANNOUNCEMENT_REPLICA)
+        self.replica = replica if replica is not None else AnnouncementReplica.from_env(self.COLLECTION, Property.from_dict)
+        self.aggregates = AggregateStats()
+        try:
+            self.rates: Optional[RateTable] = RateTable.load()
+        except Exception as e:
+            print(f"Warning: exchange rates not loaded, normalized prices disabled: {e}")
+            self.rates = None
+        # Built on the first similar-listings query
+        self.similar: Optional[Any] = None
+        self._similar_lock = threading.Lock()
+
+    def _apply_pricing(self, prop: Property) -> bool:
+        """Refresh a property's normalized price fields; returns True if any changed."""
+        if self.rates is None:
+            return False
+        changed = False
+        for key, value in normalized_prices(prop.data, self.rates).items():
+            if getattr(prop.data, key) != value:
+                setattr(prop.data, key, value)
+                changed = True
+        return changed
+
+    def _replica_ready(self) -> bool:
+        """Whether reads can be served from the local replica (never waits for the seed)."""
+        return self.replica is not None and self.replica.ensure_started()
+
+    @staticmethod
+    def _matches_filters(prop: Property, filters: Dict[str, Any]) -> bool:
+        """In-memory equivalent of the Firestore filters in get_all_announcements."""
+        d = prop.data
+        if "type" in filters and d.property_type != filters["type"]:
+            return False
+        if "listing_type" in filters and d.listing_type != filters["listing_type"]:
+            return False
+        if "min_price" in filters and d.price < float(filters["min_price"]):
+            return False
+        if "max_price" in filters and d.price > float(filters["max_price"]):
+            return False
+        if "min_normalized_price" in filters and (d.normalized_price is None or d.normalized_price < float(filters["min_normalized_price"])):
+            return False
+        if "max_normalized_price" in filters and (d.normalized_price is None or d.normalized_price > float(filters["max_normalized_price"])):
+            return False
+        return True
+
+    @staticmethod
+    def _sort_results(results: List[Dict[str, Any]], sort: Optional[str]) -> List[Dict[str, Any]]:
+        """Order by normalized price; unpriced listings go last."""
+        if sort not in ("price_asc", "price_desc"):
+            return results
+        priced = [r for r in results if r.get("normalized_price") is not None]
+        unpriced = [r for r in results if r.get("normalized_price") is None]
+        priced.sort(key=lambda r: r["normalized_price"], reverse=(sort == "price_desc"))
+        return priced + unpriced
 
     def get_all_announcements(self, filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         """
@@ -334,8 +512,32 @@ class PropertyManager:
         Returns:
             list: List of property dictionaries.
         """
+        if self._replica_ready():
+            snapshot = self.replica.snapshot()
+            return self._sort_results([
+                prop.to_dict(include_location=False, image_size="card")
+                for prop in snapshot.values()
+                if not filters or self._matches_filters(prop, filters)
+            ], (filters or {}).get("sort"))
+
+        if self.read_cache is not None:
+            key = json.dumps(filters or {}, sort_keys=True)
+            return self.read_cache.get_or_set(self.COLLECTION, f"list:{key}", lambda: self._query_announcements(filters))
+        return self._query_announcements(filters)
+
+    def _query_announcements(self, filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Run the filtered Firestore query behind get_all_announcements.
+
+        Every query has at most one range field, so it is served by the
+        equality + range indexes in firestore.indexes.json. Price sorts are
+        applied after the read: order_by("normalized_price") would drop
+        listings the recompute task has not reached yet.
+        """
         query = self.db.collection(self.COLLECTION)
-        
+        # Normalized ranges next to a raw price range are checked after parsing
+        in_memory: Dict[str, Any] = {}
+
         if filters:
             if "type" in filters:
                 query = query.where("property_type", "==", filters["type"])
@@ -345,27 +547,216 @@ class PropertyManager:
                 query = query.where("price", ">=", float(filters["min_price"]))
             if "max_price" in filters:
                 query = query.where("price", "<=", float(filters["max_price"]))
+            # Cross-currency range filters use the normalized index
+            normalized = {k: filters[k] for k in ("min_normalized_price", "max_normalized_price") if k in filters}
+            if "min_price" in filters or "max_price" in filters:
+                in_memory = normalized
+            else:
+                if "min_normalized_price" in normalized:
+                    query = query.where("normalized_price", ">=", float(normalized["min_normalized_price"]))
+                if "max_normalized_price" in normalized:
+                    query = query.where("normalized_price", "<=", float(normalized["max_normalized_price"]))
             # Add more filters as needed (bedrooms, etc.)
 
         docs = query.get()
+        quarantined = self.quarantined_ids()
         results = []
         for doc in docs:
+            # Known-bad documents are skipped without parsing
+            if doc.id in quarantined:
+                continue
             try:
-                # Safely attempt to convert each document
                 prop = Property.from_dict(doc.to_dict())
-                results.append(prop.to_dict(include_location=False))
+                if in_memory and not self._matches_filters(prop, in_memory):
+                    continue
+                results.append(prop.to_dict(include_location=False, image_size="card"))
             except Exception as e:
-                # Log bad document but don't crash the endpoint
-                print(f"[ERROR] Skipping corrupt property {doc.id}: {e}")
+                # First failure: record it so later requests skip the document
+                print(f"[ERROR] Quarantining corrupt property {doc.id}: {e}")
+                self.quarantine(doc.id, e)
+        # Same order as the replica path (unpriced last)
+        return self._sort_results(results, (filters or {}).get("sort"))
+
+    def get_changes(self, since: Optional[int] = None, limit: int = 500) -> Dict[str, Any]:
+        """
+        Listings upserted and deleted since a sync token.
+
+        Tokens are opaque to clients (microseconds since the epoch). Without
+        a token, or with one older than the tombstone retention, the full list
+        is returned with reset=True. Results may repeat items from the
+        previous sync (SYNC_OVERLAP); applying them is idempotent.
+
+        Returns:
+            dict: {"upserts", "deletions", "token", "reset", "has_more"}
+        """
+        started = time.time()
+        if since is None or since / 1e6 < started - self.TOMBSTONE_TTL:
+            # Straight from Firestore: the replica and cache may lag `started` by minutes
+            return {
+                "upserts": self._query_announcements(),
+                "deletions": [],
+                "token": str(int((started - self.SYNC_OVERLAP) * 1e6)),
+                "reset": True,
+                "has_more": False
+            }
+
+        client = firestore.client()
+        cutoff = datetime.fromtimestamp(since / 1e6 - self.SYNC_OVERLAP, tz=timezone.utc)
+        docs = list(
+            client.collection(self.COLLECTION)
+            .where("updated_at", ">", cutoff)
+            .order_by("updated_at")
+            .limit(limit)
+            .stream()
+        )
+        quarantined = self.quarantined_ids()
+        upserts = []
+        latest = since / 1e6
+        for doc in docs:
+            data = doc.to_dict()
+            latest = max(latest, data["updated_at"].timestamp())
+            if doc.id in quarantined:
                 continue
-        return results
+            try:
+                upserts.append(Property.from_dict(data).to_dict(include_location=False, image_size="card"))
+            except Exception as e:
+                print(f"[ERROR] Quarantining corrupt property {doc.id}: {e}")
+                self.quarantine(doc.id, e)
+
+        has_more = len(docs) == limit
+        if has_more and latest <= since / 1e6:
+            # A full page inside the overlap window cannot advance the token; resync instead
+            return self.get_changes(None, limit)
+        tombstones = client.collection(self.TOMBSTONES).where("deleted_at", ">", cutoff).stream()
+        deletions = [t.id for t in tombstones]
+        if not has_more:
+            # Nothing newer was seen; advance to now so idle clients do not re-read the overlap forever
+            latest = max(latest, started - self.SYNC_OVERLAP)
+        return {
+            "upserts": upserts,
+            "deletions": deletions,
+            "token": str(int(latest * 1e6)),
+            "reset": False,
+            "has_more": has_more
+        }
+
+    def expire_tombstone(self, property_id: str) -> None:
+        """Drop a tombstone once no client can still need it."""
+        self.db.collection(self.TOMBSTONES).document(property_id).delete()
+
+    def quarantined_ids(self) -> set:
+        """Ids of announcements that failed to parse (shared cache, refreshed every minute)."""
+        def load() -> set:
+            return {doc.id for doc in self.db.collection(self.QUARANTINE).select([]).get()}
+        if self.cache is not None:
+            return self.cache.get_or_set(self.QUARANTINE, "ids", load, ttl=60)
+        return load()
+
+    def quarantine(self, property_id: str, error: Exception) -> None:
+        """Exclude a corrupt announcement from list queries until it is fixed."""
+        try:
+            self.db.collection(self.QUARANTINE).document(property_id).set({
+                "error": f"{type(error).__name__}: {error}",
+                "quarantined_at": self.db.SERVER_TIMESTAMP
+            })
+        except Exception as e:
+            print(f"[ERROR] Failed to quarantine {property_id}: {e}")
+        if self.cache is not None:
+            self.cache.invalidate(self.QUARANTINE)
+
+    def release_quarantine(self, property_id: str) -> None:
+        """Readmit an announcement after it was repaired."""
+        self.db.collection(self.QUARANTINE).document(property_id).delete()
+        if self.cache is not None:
+            self.cache.invalidate(self.QUARANTINE)
+        self.invalidate_cache()
+
+    def migrate_schema_page(self, cursor: Optional[str] = None, batch_size: int = 200) -> Dict[str, Any]:
+        """
+        Rewrite one page of announcements to SCHEMA_VERSION.
+
+        Documents are visited in id order starting after `cursor`. Outdated
+        ones are rewritten in the normalized layout (counters and created_at
+        are left untouched) with a last-update precondition, so a concurrent
+        user edit is never overwritten: the page is re-read and retried.
+        Documents that fail to parse are quarantined; ones that parse again
+        are released.
+
+        Returns:
+            dict: {"cursor": id to resume after or None when done, "migrated", "quarantined"}
+        """
+        client = firestore.client()
+        query = client.collection(self.COLLECTION).order_by("__name__").limit(batch_size)
+        if cursor:
+            query = query.start_after({"__name__": client.collection(self.COLLECTION).document(cursor)})
+
+        quarantined = self.quarantined_ids()
+        for attempt in range(3):
+            docs = list(query.stream())
+            batch = client.batch()
+            migrated, newly_quarantined = 0, 0
+            for doc in docs:
+                data = doc.to_dict()
+                try:
+                    prop = Property.from_dict(data)
+                except Exception as e:
+                    if doc.id not in quarantined:
+                        self.quarantine(doc.id, e)
+                        quarantined.add(doc.id)
+                        newly_quarantined += 1
+                    continue
+                if doc.id in quarantined:
+                    self.release_quarantine(doc.id)
+                    quarantined.discard(doc.id)
+                # Current documents are skipped unless an earlier run left legacy keys behind
+                if data.get("schema_version", 0) >= SCHEMA_VERSION and not LEGACY_KEYS & data.keys():
+                    continue
+                upgraded = prop.to_dict(include_location=True, is_owner=True)
+                for key in (*COUNTER_KEYS, "created_at"):
+                    upgraded.pop(key, None)
+                upgraded["schema_version"] = SCHEMA_VERSION
+                upgraded["updated_at"] = firestore.SERVER_TIMESTAMP
+                for key in LEGACY_KEYS & data.keys():
+                    upgraded[key] = firestore.DELETE_FIELD
+                batch.update(doc.reference, upgraded, option=client.write_option(last_update_time=doc.update_time))
+                migrated += 1
+            try:
+                if migrated:
+                    batch.commit()
+                    self.invalidate_cache()
+                break
+            except Exception as e:
+                # A document changed under us; re-read the page
+                print(f"[ERROR] Schema migration page after {cursor} failed (attempt {attempt + 1}): {e}")
+        else:
+            raise RuntimeError(f"Schema migration page after {cursor} kept conflicting")
+
+        return {
+            "cursor": docs[-1].id if len(docs) == batch_size else None,
+            "migrated": migrated,
+            "quarantined": newly_quarantined
+        }
 
     def get_announcement(self, property_id: str) -> Optional[Property]:
         """Get a specific announcement."""
+        if self._replica_ready():
+            prop = self.replica.get(property_id)
+            if prop is not None:
+                return prop
+            # Created after the last poll (or not yet delivered): ask Firestore
+        if self.read_cache is None:
+            return self._fetch_announcement(property_id)
+        return self.read_cache.get_or_set(self.COLLECTION, f"doc:{property_id}", lambda: self._fetch_announcement(property_id))
+
+    def _fetch_announcement(self, property_id: str) -> Optional[Property]:
+        """Read one announcement straight from Firestore."""
         doc = self.db.collection(self.COLLECTION).document(property_id).get()
-        if doc.exists:
-            return Property.from_dict(doc.to_dict())
-        return None
+        return Property.from_dict(doc.to_dict()) if doc.exists else None
+
+    def invalidate_cache(self) -> None:
+        """Drop every cached announcement read in all workers (call after any write)."""
+        if self.cache is not None:
+            self.cache.invalidate(self.COLLECTION)
 
     def create_announcement(self, property_data: Property) -> str:
         """Create a new announcement."""
@@ -379,11 +770,22 @@ class PropertyManager:
             property_data.data.friendly_id = generate_friendly_id()
             return self.create_announcement(property_data)
 
+        self._apply_pricing(property_data)
         # Always save full data to DB (is_owner=True)
         data = property_data.to_dict(include_location=True, is_owner=True)
         data["created_at"] = self.db.SERVER_TIMESTAMP
+        data["updated_at"] = self.db.SERVER_TIMESTAMP
+        data["schema_version"] = SCHEMA_VERSION
         print(f"[DEBUG] Saving NEW announcement {property_data.id} ({property_data.data.friendly_id})")
-        self.db.collection(self.COLLECTION).document(property_data.id).set(data)
+        # Document and facet counts are committed together
+        client = firestore.client()
+        batch = client.batch()
+        batch.set(client.collection(self.COLLECTION).document(property_data.id), data)
+        self.aggregates.apply(batch, client, None, property_data)
+        batch.commit()
+        self.invalidate_cache()
+        if self.similar is not None:
+            self.similar.upsert(property_data)
         return property_data.id
 
     def update_announcement(self, property_id: str, data: Dict[str, Any]) -> bool:
@@ -393,21 +795,198 @@ class PropertyManager:
         if not existing_doc.exists:
             return False
             
-        merged_data = existing_doc.to_dict()
-        merged_data.update(data)
+        stored = existing_doc.to_dict()
+        previous = self._parse_or_none(stored)
+        current = stored.get("schema_version", 0) >= SCHEMA_VERSION
+        # Legacy keys left on a migrated document must never override the current layout
+        merged_data = {k: v for k, v in stored.items() if not (current and k in LEGACY_KEYS)}
+        # Counters in the payload are ignored; the stored ones are kept for parsing
+        merged_data.update({k: v for k, v in data.items() if k not in COUNTER_KEYS})
+        if current and not needs_upgrade(data):
+            # Already normalized: parsed as-is
+            merged_data["schema_version"] = SCHEMA_VERSION
+        else:
+            # Legacy document or payload; normalize the merge as a whole
+            merged_data.pop("schema_version", None)
         
         property_obj = Property.from_dict(merged_data)
+        self._apply_pricing(property_obj)
         # Always save full data to DB (is_owner=True)
         final_data = property_obj.to_dict(include_location=True, is_owner=True)
+        # Counters are only ever written as increments (see EngagementCounters.flush)
+        for key in COUNTER_KEYS:
+            final_data.pop(key, None)
+        final_data["schema_version"] = SCHEMA_VERSION
+        final_data["updated_at"] = self.db.SERVER_TIMESTAMP
+        for key in LEGACY_KEYS & stored.keys():
+            final_data[key] = firestore.DELETE_FIELD
         
-        self.db.collection(self.COLLECTION).document(property_id).update(final_data)
+        client = firestore.client()
+        batch = client.batch()
+        batch.update(client.collection(self.COLLECTION).document(property_id), final_data)
+        self.aggregates.apply(batch, client, previous, property_obj)
+        batch.commit()
+        self.invalidate_cache()
+        if self.similar is not None:
+            self.similar.upsert(property_obj)
+        if property_id in self.quarantined_ids():
+            self.release_quarantine(property_id)
         return True
 
     def delete_announcement(self, property_id: str) -> bool:
         """Delete an announcement."""
-        self.db.collection(self.COLLECTION).document(property_id).delete()
+        client = firestore.client()
+        doc_ref = client.collection(self.COLLECTION).document(property_id)
+        existing_doc = doc_ref.get()
+        batch = client.batch()
+        batch.delete(doc_ref)
+        if existing_doc.exists:
+            self.aggregates.apply(batch, client, self._parse_or_none(existing_doc.to_dict()), None)
+            # Tombstone for delta-sync clients (see get_changes)
+            batch.set(client.collection(self.TOMBSTONES).document(property_id), {"deleted_at": firestore.SERVER_TIMESTAMP})
+        batch.commit()
+        self.invalidate_cache()
+        if self.similar is not None:
+            self.similar.remove(property_id)
+        return True
+
+    def remove_from_favorites(self, property_id: str, batch_size: int = 400) -> int:
+        """
+        Remove a deleted announcement from every user's favorites.
+
+        Users are updated in batches of at most batch_size; re-running after a
+        partial failure only touches the users that still reference the id.
+        Returns the number of users updated.
+        """
+        client = firestore.client()
+        query = client.collection("users").where("favorites", "array_contains", property_id).select([]).limit(batch_size)
+        updated = 0
+        while True:
+            docs = list(query.stream())
+            if not docs:
+                return updated
+            batch = client.batch()
+            for doc in docs:
+                batch.update(doc.reference, {"favorites": firestore.ArrayRemove([property_id])})
+            batch.commit()
+            updated += len(docs)
+
+    def image_references(self, owner_id: str) -> set:
+        """Every image URL (originals, layouts and variants) referenced by an owner's announcements."""
+        docs = self.db.collection(self.COLLECTION).where("owner_id", "==", owner_id).get()
+        return {url for doc in docs for url in image_urls(doc.to_dict())}
+
+    def set_image_variants(self, property_id: str, images: List[str], variants: List[Optional[Dict[str, Any]]]) -> bool:
+        """
+        Store generated variants, unless the images changed in the meantime.
+
+        Returns False when the announcement is gone or its images no longer
+        match (a newer update will have queued its own run).
+        """
+        doc_ref = firestore.client().collection(self.COLLECTION).document(property_id)
+        doc = doc_ref.get()
+        if not doc.exists or (doc.to_dict().get("images") or []) != images:
+            return False
+        doc_ref.update({"image_variants": variants, "updated_at": firestore.SERVER_TIMESTAMP}, option=firestore.client().write_option(last_update_time=doc.update_time))
+        self.invalidate_cache()
         return True
 
+    @staticmethod
+    def _parse_or_none(data: Dict[str, Any]) -> Optional[Property]:
+        """Parse stored data, returning None for documents that fail validation."""
+        try:
+            return Property.from_dict(data)
+        except Exception:
+            return None
+
+    def recompute_normalized_prices(self, batch_size: int = 400) -> int:
+        """
+        Rewrite normalized prices after the rate table changes.
+
+        Only documents whose values actually change are written, in batches
+        of at most batch_size. Returns the number of updated documents.
+        """
+        if self.rates is None:
+            return 0
+        client = firestore.client()
+        batch = client.batch()
+        pending = 0
+        updated = 0
+        for doc in self.db.collection(self.COLLECTION).get():
+            prop = self._parse_or_none(doc.to_dict())
+            if prop is None or not self._apply_pricing(prop):
+                continue
+            changes = normalized_prices(prop.data, self.rates)
+            changes["updated_at"] = firestore.SERVER_TIMESTAMP
+            batch.update(client.collection(self.COLLECTION).document(doc.id), changes)
+            pending += 1
+            updated += 1
+            if pending >= batch_size:
+                batch.commit()
+                batch = client.batch()
+                pending = 0
+        if pending:
+            batch.commit()
+        if updated:
+            self.invalidate_cache()
+        return updated
+
+    def _similarity_index(self) -> Any:
+        """
+        Return the similar-listings index, (re)building it when needed.
+
+        With the replica enabled the index follows replica snapshots; otherwise
+        it is rebuilt from a full scan once its TTL expires, and kept current
+        in between by this worker's own writes.
+        """
+        with self._similar_lock:
+            if self.similar is None:
+                # NumPy is only imported once similar listings are actually requested
+                from api.models.similarity import FeatureSpace, SimilarityIndex
+                vocab = {}
+                for name in ("property_types", "listing_types", "key_amenities"):
+                    with open(DATA_DIR / f"{name}.json", "r", encoding="utf-8") as f:
+                        vocab[name] = json.load(f)
+                self.similar = SimilarityIndex(FeatureSpace(vocab["property_types"], vocab["listing_types"], vocab["key_amenities"]))
+
+            if self._replica_ready():
+                snapshot = self.replica.snapshot()
+                if self.similar.source is not snapshot:
+                    self.similar.rebuild(snapshot.values(), source=snapshot)
+            elif self.similar.stale:
+                docs = self.db.collection(self.COLLECTION).get()
+                self.similar.rebuild(p for p in (self._parse_or_none(doc.to_dict()) for doc in docs) if p)
+            return self.similar
+
+    def get_similar_announcements(self, property_id: str, k: int = 6) -> Optional[List[Dict[str, Any]]]:
+        """Top-k listings similar to property_id (None if it does not exist)."""
+        index = self._similarity_index()
+        if property_id not in index:
+            # Created in another worker since the last rebuild
+            prop = self.get_announcement(property_id)
+            if prop is None:
+                return None
+            index.upsert(prop)
+        results = []
+        # Cards come from the index itself: no per-result reads
+        for similar_id, score in index.query(property_id, k):
+            prop = index.get(similar_id)
+            if prop is None:
+                continue
+            item = prop.to_dict(include_location=False, image_size="card")
+            item["similarity"] = round(score, 4)
+            results.append(item)
+        return results
+
+    def get_facets(self) -> Dict[str, Any]:
+        """Facet counts and price/area histograms, maintained incrementally on write."""
+        return self.aggregates.facets()
+
+    def rebuild_facets(self) -> Dict[str, Any]:
+        """Recompute facet aggregates with one full scan (backfill or repair)."""
+        props = [p for p in (self._parse_or_none(doc.to_dict()) for doc in self.db.collection(self.COLLECTION).get()) if p]
+        return self.aggregates.rebuild(props)
+
     def get_user_announcements(self, user_id: str) -> List[Dict[str, Any]]:
         """Get all announcements made by a specific user."""
         docs = self.db.collection(self.COLLECTION).where("owner_id", "==", user_id).get()
@@ -0,0 +1,82 @@
+"""
+    file: pricing.py
+    brief: Normalized prices (base currency, monthly-equivalent rents) for sorting and range filters
+"""
+# Standard library imports
+import os
+import json
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+DEFAULT_RATES_FILE = Path(__file__).parent.parent / "data" / "exchange_rates.json"
+
+# Multiplier turning a price per period into a monthly equivalent
+PERIOD_TO_MONTH = {
+    "day": 30.0,
+    "week": 52.0 / 12.0,
+    "month": 1.0,
+    "year": 1.0 / 12.0,
+}
+
+class RateTable:
+    """Locally configured exchange rates: base-currency units per unit of each currency."""
+
+    def __init__(self, base: str, rates: Dict[str, float], version: str) -> None:
+        """Initialize from already parsed values."""
+        self.base = base
+        self.rates = {k.upper(): float(v) for k, v in rates.items()}
+        self.version = version
+
+    @classmethod
+    def load(cls, path: Optional[str] = None) -> 'RateTable':
+        """Load the table from EXCHANGE_RATES_FILE (defaults to data/exchange_rates.json)."""
+        path = path or os.environ.get("EXCHANGE_RATES_FILE") or DEFAULT_RATES_FILE
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data.get("base", "BRL"), data.get("rates", {}), str(data.get("version", "")))
+
+    def to_base(self, amount: Optional[float], currency: str) -> Optional[float]:
+        """Convert an amount to the base currency (None if the currency is unknown)."""
+        if amount is None:
+            return None
+        rate = self.rates.get((currency or "").upper())
+        if rate is None:
+            return None
+        return round(float(amount) * rate, 2)
+
+def monthly(amount: Optional[float], period: str) -> Optional[float]:
+    """Monthly equivalent of a per-period price."""
+    if amount is None:
+        return None
+    return float(amount) * PERIOD_TO_MONTH.get(period or "month", 1.0)
+
+def normalized_prices(data: Any, rates: RateTable) -> Dict[str, Any]:
+    """
+    Normalized price fields for a PropertyData.
+
+    `normalized_price` follows the same listing_type rules as `price`: sales
+    compare on sale price, rentals and vacation stays on their monthly
+    equivalent, all in the base currency.
+    """
+    sale = rates.to_base(data.sale_price, data.currency)
+    rent = rates.to_base(monthly(data.rent_price, data.rent_period), data.currency)
+    vacation = rates.to_base(monthly(data.vacation_price, data.vacation_period), data.currency)
+
+    if data.listing_type in ["sale", "both", "sale_rent"] and sale is not None:
+        primary = sale
+    elif data.listing_type == "rent" and rent is not None:
+        primary = rent
+    elif data.listing_type == "vacation" and vacation is not None:
+        primary = vacation
+    else:
+        period = data.rent_period if data.listing_type == "rent" else data.vacation_period if data.listing_type == "vacation" else "month"
+        raw = monthly(data.price, period) if data.listing_type in ["rent", "vacation"] else data.price
+        primary = rates.to_base(raw, data.currency)
+
+    return {
+        "normalized_price": primary,
+        "normalized_sale_price": sale,
+        "normalized_rent_price": rent,
+        "normalized_vacation_price": vacation,
+        "price_rates_version": rates.version,
+    }
@@ -0,0 +1,223 @@
+"""
+    file: replica.py
+    brief: In-process replica of the announcements collection
+"""
+# Standard library imports
+import os
+import time
+import threading
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Mapping, Optional
+
+# Local imports
+from server_utils.database import Database
+
+REPLICA_MODES = {"off", "snapshot", "poll"}
+
+class AnnouncementReplica:
+    """
+    Full local copy of the announcements collection, kept as Property objects.
+
+    The replica is seeded once and then kept current either by a Firestore
+    snapshot listener ("snapshot") or by periodically diffing document
+    update_time values ("poll", for the local engine). Readers always get an
+    immutable mapping so a single request sees one consistent snapshot.
+    """
+
+    def __init__(self, collection: str, parse: Callable[[Dict[str, Any]], Any], mode: str = "snapshot", poll_interval: float = 5.0) -> None:
+        """Initialize the replica (not started)."""
+        if mode not in REPLICA_MODES:
+            raise ValueError(f"Unknown replica mode: {mode}")
+        self.collection = collection
+        self.parse = parse
+        self.mode = mode
+        self.poll_interval = poll_interval
+
+        self._lock = threading.Lock()
+        self._items: Mapping[str, Any] = MappingProxyType({})
+        self._versions: Dict[str, Any] = {}
+        self._started = False
+        self._ready = threading.Event()
+        self._stop = threading.Event()
+        self._watch = None
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+
+        self.last_sync: Optional[float] = None
+        self.last_change: Optional[float] = None
+        # Delivery delay of the latest listener snapshot (receipt time minus read_time)
+        self.lag: Optional[float] = None
+        self.errors = 0
+
+    @classmethod
+    def from_env(cls, collection: str, parse: Callable[[Dict[str, Any]], Any]) -> Optional['AnnouncementReplica']:
+        """Build a replica from ANNOUNCEMENT_REPLICA / ANNOUNCEMENT_REPLICA_POLL_SECONDS, or None when disabled."""
+        mode = os.environ.get("ANNOUNCEMENT_REPLICA", "off").strip().lower() or "off"
+        if mode == "off":
+            return None
+        interval = float(os.environ.get("ANNOUNCEMENT_REPLICA_POLL_SECONDS", "5"))
+        return cls(collection, parse, mode=mode, poll_interval=interval)
+
+    # Lifecycle
+    def ensure_started(self, timeout: float = 0.0) -> bool:
+        """
+        Start the replica in the current process if needed; True once it is seeded.
+
+        Listener threads do not survive fork, so a replica created before
+        gunicorn forks is restarted lazily inside each worker. Request paths
+        keep the default and fall back to Firestore until the seed lands;
+        warmup() passes a timeout to wait for it.
+        """
+        pid = os.getpid()
+        with self._lock:
+            if not self._started or self._pid != pid or not self.listener_active():
+                self._start()
+        if timeout > 0:
+            return self._ready.wait(timeout)
+        return self._ready.is_set()
+
+    def _start(self) -> None:
+        self._started = True
+        self._pid = os.getpid()
+        self._ready.clear()
+        self._stop.clear()
+        self._items = MappingProxyType({})
+        self._versions = {}
+
+        if self.mode == "snapshot":
+            query = Database().collection(self.collection)
+            self._watch = query.on_snapshot(self._on_snapshot)
+        else:
+            self._thread = threading.Thread(target=self._poll_loop, name="announcement-replica", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Stop listening for changes."""
+        self._stop.set()
+        if self._watch is not None:
+            try:
+                self._watch.unsubscribe()
+            except Exception as e:
+                print(f"[ERROR_REPLICA] Failed to unsubscribe listener: {e}")
+            self._watch = None
+        self._started = False
+
+    # Change application
+    def _parse_doc(self, doc: Any) -> Optional[Any]:
+        try:
+            return self.parse(doc.to_dict())
+        except Exception as e:
+            self.errors += 1
+            print(f"[ERROR_REPLICA] Skipping corrupt property {doc.id}: {e}")
+            return None
+
+    def _apply(self, upserts: Dict[str, Any], removals: set, versions: Dict[str, Any], reset: bool = False, read_time: Optional[float] = None) -> None:
+        """Publish a new immutable snapshot containing the given changes."""
+        with self._lock:
+            items = {} if reset else dict(self._items)
+            for doc_id in removals:
+                items.pop(doc_id, None)
+                self._versions.pop(doc_id, None)
+            for doc_id, prop in upserts.items():
+                if prop is None:
+                    items.pop(doc_id, None)
+                else:
+                    items[doc_id] = prop
+            if reset:
+                self._versions = dict(versions)
+            else:
+                self._versions.update(versions)
+            self._items = MappingProxyType(items)
+
+            now = time.time()
+            self.last_sync = now
+            if read_time is not None:
+                self.lag = max(now - read_time, 0.0)
+            if upserts or removals or reset:
+                self.last_change = now
+        self._ready.set()
+
+    def _on_snapshot(self, col_snapshot: Any, changes: Any, read_time: Any) -> None:
+        """Firestore listener callback (runs on the watch thread)."""
+        upserts: Dict[str, Any] = {}
+        removals = set()
+        versions: Dict[str, Any] = {}
+        for change in changes:
+            doc = change.document
+            if change.type.name == "REMOVED":
+                removals.add(doc.id)
+            else:
+                upserts[doc.id] = self._parse_doc(doc)
+                versions[doc.id] = getattr(doc, "update_time", None)
+        self._apply(upserts, removals, versions, reset=not self._ready.is_set(), read_time=read_time.timestamp() if read_time is not None else None)
+
+    def _poll_once(self) -> None:
+        """Diff the collection against known update_time values."""
+        docs = Database().collection(self.collection).get()
+        upserts: Dict[str, Any] = {}
+        versions: Dict[str, Any] = {}
+        seen = set()
+        for doc in docs:
+            seen.add(doc.id)
+            version = getattr(doc, "update_time", None)
+            if doc.id in self._versions and version is not None and self._versions[doc.id] == version:
+                continue
+            upserts[doc.id] = self._parse_doc(doc)
+            versions[doc.id] = version
+        removals = set(self._versions) - seen
+        self._apply(upserts, removals, versions, reset=not self._ready.is_set())
+
+    def _poll_loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self._poll_once()
+            except Exception as e:
+                self.errors += 1
+                print(f"[ERROR_REPLICA] Poll failed: {e}")
+            self._stop.wait(self.poll_interval)
+
+    # Reads
+    def snapshot(self) -> Mapping[str, Any]:
+        """Return the current immutable id -> Property mapping."""
+        return self._items
+
+    def get(self, property_id: str) -> Optional[Any]:
+        """Return a single Property from the replica."""
+        return self._items.get(property_id)
+
+    def listener_active(self) -> bool:
+        """Whether the snapshot listener is still running (always True in poll mode)."""
+        if self.mode != "snapshot" or not self._started:
+            return True
+        # The client closes a watch that hit an unrecoverable error
+        return self._watch is not None and getattr(self._watch, "is_active", True)
+
+    def staleness(self) -> Optional[float]:
+        """
+        Seconds the replica lags behind Firestore (None before seeding).
+
+        In snapshot mode the listener only calls back on changes, so this is
+        the delivery delay of the latest snapshot (its read_time against when
+        it arrived), not the idle time of a quiet collection; a dead listener
+        shows up as listener_active=False instead. In poll mode the data is as
+        old as the last poll.
+        """
+        if self.last_sync is None:
+            return None
+        if self.mode == "snapshot" and self.lag is not None:
+            return self.lag
+        return time.time() - self.last_sync
+
+    def status(self) -> Dict[str, Any]:
+        """Metrics describing the replica."""
+        return {
+            "mode": self.mode,
+            "ready": self._ready.is_set(),
+            "size": len(self._items),
+            "staleness_seconds": self.staleness(),
+            "idle_seconds": time.time() - self.last_sync if self.last_sync is not None else None,
+            "listener_active": self.listener_active(),
+            "last_sync": self.last_sync,
+            "last_change": self.last_change,
+            "errors": self.errors
+        }
@@ -0,0 +1,253 @@
+"""
+    file: similarity.py
+    brief: Vectorized "similar listings" index over announcement features
+"""
+# Standard library imports
+import math
+import time
+import zlib
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Third-party imports
+import numpy as np
+
+# Relative importance of each feature block in the similarity score
+DEFAULT_WEIGHTS: Dict[str, float] = {
+    "size": 1.0,
+    "price": 1.5,
+    "property_type": 1.0,
+    "listing_type": 1.5,
+    "amenities": 0.5,
+    "location": 2.0,
+}
+
+HASHED_AMENITY_BUCKETS = 16
+EARTH_RADIUS_KM = 6371.0
+# Squared location distance is capped so other cities are "far", not infinitely far;
+# pairs where either side has no coordinates get a quarter of it
+LOCATION_CAP = 4.0
+
+class FeatureSpace:
+    """Column layout of the feature matrix."""
+
+    def __init__(self, property_types: List[str], listing_types: List[str], amenities: List[str]) -> None:
+        """Build the column layout from the known vocabularies."""
+        self.property_types = {v: i for i, v in enumerate(property_types)}
+        self.listing_types = {v: i for i, v in enumerate(listing_types)}
+        self.amenities = {v: i for i, v in enumerate(amenities)}
+
+        self.blocks: Dict[str, slice] = {}
+        offset = 0
+        for name, width in [
+            ("size", 5),
+            ("price", 1),
+            ("property_type", len(property_types) + 1),
+            ("listing_type", len(listing_types) + 1),
+            ("amenities", len(amenities) + HASHED_AMENITY_BUCKETS),
+            ("location", 3),
+        ]:
+            self.blocks[name] = slice(offset, offset + width)
+            offset += width
+        self.width = offset
+
+    def vector(self, prop: Any) -> np.ndarray:
+        """Unweighted feature vector of a Property."""
+        d = prop.data
+        c = d.characteristics
+        v = np.zeros(self.width, dtype=np.float32)
+
+        # Counts are soft-capped so a 12-bedroom outlier does not dominate
+        size = self.blocks["size"]
+        v[size] = [
+            min(c.bedrooms, 8) / 4.0,
+            min(c.bathrooms, 8) / 4.0,
+            min(c.suites, 8) / 4.0,
+            min(c.garages, 8) / 4.0,
+            math.log1p(max(c.area or 0.0, 0.0)) / 5.0,
+        ]
+
+        price = d.normalized_price if d.normalized_price is not None else d.price
+        v[self.blocks["price"].start] = math.log1p(max(price or 0.0, 0.0)) / 10.0
+
+        pt = self.blocks["property_type"]
+        v[pt.start + self.property_types.get(d.property_type, pt.stop - pt.start - 1)] = 1.0
+        lt = self.blocks["listing_type"]
+        v[lt.start + self.listing_types.get(d.listing_type, lt.stop - lt.start - 1)] = 1.0
+
+        am = self.blocks["amenities"]
+        known = len(self.amenities)
+        for amenity in d.amenities or []:
+            index = self.amenities.get(amenity)
+            if index is None:
+                index = known + zlib.crc32(amenity.encode("utf-8")) % HASHED_AMENITY_BUCKETS
+            v[am.start + index] = 1.0
+        if d.amenities:
+            v[am] /= math.sqrt(len(d.amenities))
+
+        # Coarse location as a point on the unit sphere; chord distance tracks geographic distance
+        location = d.address.location or {}
+        lat, lng = location.get("lat"), location.get("lng")
+        if lat is not None and lng is not None:
+            lat_r, lng_r = math.radians(float(lat)), math.radians(float(lng))
+            # Scaled so a few km is a noticeable but not decisive difference
+            scale = EARTH_RADIUS_KM / 50.0
+            v[self.blocks["location"]] = [
+                math.cos(lat_r) * math.cos(lng_r) * scale,
+                math.cos(lat_r) * math.sin(lng_r) * scale,
+                math.sin(lat_r) * scale,
+            ]
+        return v
+
+    def weight_vector(self, weights: Dict[str, float]) -> np.ndarray:
+        """Per-column weights expanded from per-block weights."""
+        w = np.ones(self.width, dtype=np.float32)
+        for name, block in self.blocks.items():
+            w[block] = weights.get(name, 1.0)
+        return w
+
+class SimilarityIndex:
+    """
+    In-memory feature matrix answering top-k similar-listing queries.
+
+    Rows are updated in place on writes; removed rows are masked out and
+    reused on the next rebuild. A query is a single vectorized pass over the
+    matrix using weighted Euclidean distance (location is embedded so the
+    distance includes it without a separate geo query). The indexed Property
+    objects are kept alongside the rows so results need no further reads.
+    """
+
+    def __init__(self, space: FeatureSpace, weights: Optional[Dict[str, float]] = None, ttl: float = 300.0) -> None:
+        """Initialize an empty index; call rebuild() before querying."""
+        self.space = space
+        self.weights = space.weight_vector({**DEFAULT_WEIGHTS, **(weights or {})})
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._matrix = np.zeros((0, space.width), dtype=np.float32)
+        self._valid = np.zeros(0, dtype=bool)
+        self._has_loc = np.zeros(0, dtype=bool)
+        # Status per row as a small integer code (see _status_code)
+        self._status = np.zeros(0, dtype=np.int16)
+        self._status_codes: Dict[str, int] = {}
+        self._ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._props: Dict[str, Any] = {}
+        self.built_at: Optional[float] = None
+        self.source: Any = None
+
+    @property
+    def stale(self) -> bool:
+        """Whether the index has never been built or is older than ttl."""
+        return self.built_at is None or time.time() - self.built_at > self.ttl
+
+    def _status_code(self, status: str) -> int:
+        """Small integer standing for a status string (codes are never reused)."""
+        code = self._status_codes.get(status)
+        if code is None:
+            code = self._status_codes[status] = len(self._status_codes)
+        return code
+
+    def rebuild(self, props: Iterable[Any], source: Any = None) -> None:
+        """Replace the whole matrix from an iterable of Property objects."""
+        props = list(props)
+        matrix = np.zeros((max(len(props), 1), self.space.width), dtype=np.float32)
+        ids: List[str] = []
+        has_loc = np.zeros(matrix.shape[0], dtype=bool)
+        for i, prop in enumerate(props):
+            matrix[i] = self.space.vector(prop) * self.weights
+            has_loc[i] = self._located(prop)
+            ids.append(prop.id)
+        valid = np.zeros(matrix.shape[0], dtype=bool)
+        valid[:len(props)] = True
+        with self._lock:
+            status = np.zeros(matrix.shape[0], dtype=np.int16)
+            status[:len(props)] = [self._status_code(prop.data.status) for prop in props]
+            self._matrix = matrix
+            self._valid = valid
+            self._has_loc = has_loc
+            self._status = status
+            self._ids = ids
+            self._rows = {pid: i for i, pid in enumerate(ids)}
+            self._props = {prop.id: prop for prop in props}
+            self.built_at = time.time()
+            self.source = source
+
+    def __contains__(self, property_id: str) -> bool:
+        index = self._rows.get(property_id)
+        return index is not None and bool(self._valid[index])
+
+    @staticmethod
+    def _located(prop: Any) -> bool:
+        location = prop.data.address.location or {}
+        return location.get("lat") is not None and location.get("lng") is not None
+
+    def upsert(self, prop: Any) -> None:
+        """Insert or replace a single listing's row."""
+        row = self.space.vector(prop) * self.weights
+        with self._lock:
+            index = self._rows.get(prop.id)
+            if index is None:
+                index = len(self._ids)
+                if index >= self._matrix.shape[0]:
+                    # Grow geometrically so repeated inserts stay amortized O(1)
+                    grown = np.zeros((max(index * 2, 16), self.space.width), dtype=np.float32)
+                    grown[:self._matrix.shape[0]] = self._matrix
+                    valid = np.zeros(grown.shape[0], dtype=bool)
+                    valid[:self._valid.shape[0]] = self._valid
+                    has_loc = np.zeros(grown.shape[0], dtype=bool)
+                    has_loc[:self._has_loc.shape[0]] = self._has_loc
+                    status = np.zeros(grown.shape[0], dtype=np.int16)
+                    status[:self._status.shape[0]] = self._status
+                    self._matrix, self._valid, self._has_loc, self._status = grown, valid, has_loc, status
+                self._ids.append(prop.id)
+                self._rows[prop.id] = index
+            self._matrix[index] = row
+            self._valid[index] = True
+            self._has_loc[index] = self._located(prop)
+            self._status[index] = self._status_code(prop.data.status)
+            self._props[prop.id] = prop
+
+    def remove(self, property_id: str) -> None:
+        """Mask out a deleted listing."""
+        with self._lock:
+            index = self._rows.get(property_id)
+            if index is not None:
+                self._valid[index] = False
+
+    def get(self, property_id: str) -> Optional[Any]:
+        """Indexed Property for property_id, or None if absent or removed."""
+        with self._lock:
+            index = self._rows.get(property_id)
+            if index is None or not self._valid[index]:
+                return None
+            return self._props.get(property_id)
+
+    def query(self, property_id: str, k: int = 6, exclude_statuses: Iterable[str] = ("sold",)) -> List[Tuple[str, float]]:
+        """
+        Top-k listings most similar to property_id.
+
+        Returns:
+            list: (property_id, score) pairs, score in (0, 1], best first.
+        """
+        # Vectorized reads under the lock; upserts write rows in place
+        with self._lock:
+            index = self._rows.get(property_id)
+            if index is None or not self._valid[index]:
+                return []
+            n = len(self._ids)
+            mask = self._valid[:n] & ~np.isin(self._status[:n], [self._status_codes[s] for s in exclude_statuses if s in self._status_codes])
+            mask[index] = False
+            candidates = np.flatnonzero(mask)
+            if candidates.size == 0:
+                return []
+
+            diff = self._matrix[candidates] - self._matrix[index]
+            total = np.einsum("ij,ij->i", diff, diff)
+            loc = self.space.blocks["location"]
+            loc_sq = np.einsum("ij,ij->i", diff[:, loc], diff[:, loc])
+            loc_term = np.where(self._has_loc[candidates] & self._has_loc[index], np.minimum(loc_sq, LOCATION_CAP), LOCATION_CAP / 4)
+            distances = total - loc_sq + loc_term
+            top = min(k, candidates.size)
+            best = np.argpartition(distances, top - 1)[:top]
+            best = best[np.argsort(distances[best])]
+            return [(self._ids[candidates[i]], float(1.0 / (1.0 + math.sqrt(distances[i])))) for i in best]
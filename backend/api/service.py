@@ -6,18 +6,19 @@
 import os
 import sys
 import json
+import time
 from pathlib import Path
 from typing import Any, Dict, Tuple
 
+IMPORT_STARTED = time.perf_counter()
+
 # Third-party imports
 import flask
 from dotenv import load_dotenv
-from flask import Flask, jsonify, request
+from flask import Flask, g, jsonify, request
 from flask_cors import CORS
-from firebase_admin import auth, firestore
 
 # Local imports
-from server_utils.ai import AI as AIService
 from server_utils.database import Database
 from server_utils.security import Security
 from server_utils.auth import Auth
@@ -30,27 +31,50 @@ sys.path.append(str(basedir))
 load_dotenv(basedir / ".env")
 load_dotenv(basedir / ".env.local", override=True)
 
-from api.models.manager import PropertyManager, Property
+from api.utils import startup
+from api.utils.startup import Lazy, lazy_module
+from api.models.manager import COUNTER_KEYS, PropertyManager, Property, image_urls
+from api.models.engagement import CLIENT_EVENTS, EngagementCounters
+from api.models.geo import AddressAutocomplete, GeoIndex, filter_prefix, fold
+from api.utils.images import MANIFEST_NAME, ImagePipeline, content_hash, decode_inline_image
+from api.utils.blobstore import BucketBlobStore, LocalBlobStore, create_blob_store, externalize_image, store_inline_image
+from api.utils.cache import LRUCache, SharedCache, SqliteBackend, create_shared_cache
+from api.utils.tasks import create_task_queue
+from api.utils.admission import create_admission_controller
+
+startup.begin(IMPORT_STARTED)
 
-# Initialize Database
-credentials = os.environ.get("DATABASE_SERVICE_ACCOUNT")
-database_url = os.environ.get("DATABASE_URL")
+# Heavy SDK modules are imported on first use
+auth = lazy_module("firebase_admin.auth")
+firestore = lazy_module("firebase_admin.firestore")
+storage = lazy_module("firebase_admin.storage")
+http = Lazy("http", lambda: __import__("requests").Session())
 
-if credentials:
-    import json
+def init_database() -> bool:
+    """Initialize firebase-admin from DATABASE_SERVICE_ACCOUNT."""
+    credentials = os.environ.get("DATABASE_SERVICE_ACCOUNT")
+    database_url = os.environ.get("DATABASE_URL")
+
+    if not credentials:
+        print("Warning: DATABASE_SERVICE_ACCOUNT not set. Database not initialized.")
+        return False
     if isinstance(credentials, str) and credentials.startswith("{"):
         credentials = json.loads(credentials)
     Database.initialize_app(credentials, database_url)
-else:
-    print("Warning: DATABASE_SERVICE_ACCOUNT not set. Database not initialized.")
+    return True
 
-# Initialize AI
-ai_key = os.environ.get("AI_API_KEY")
-if ai_key:
+def init_ai() -> Any:
+    """Initialize the AI client (only for routes that use it)."""
+    from server_utils.ai import AI as AIService
+    ai_key = os.environ.get("AI_API_KEY")
+    if not ai_key:
+        print("Warning: AI_API_KEY not set. AI features disabled.")
+        return None
     AIService.initialize(ai_key)
-else:
-    print("Warning: AI_API_KEY not set. AI features disabled.")
+    return AIService
 
+database = Lazy("database", init_database)
+ai = Lazy("ai", init_ai)
 
 app = Flask(__name__)
 
@@ -64,32 +88,270 @@ def home() -> Any:
     """Status endpoint for the backend service."""
     return "Vit Estate Manager API is running", 200
 
+# Cache tier shared across gunicorn workers (see CACHE_BACKEND)
+cache = create_shared_cache()
+
 # Initialize Security
-security = Security()
-manager = PropertyManager()
+security = Lazy("security", Security)
+manager = Lazy("manager", lambda: PropertyManager(cache=cache), requires=[database])
+image_pipeline = ImagePipeline(lambda: storage.bucket())
+blob_store = create_blob_store(lambda: storage.bucket())
+# Variants are always written to the bucket, whatever BLOB_STORE says
+bucket_store = blob_store if isinstance(blob_store, BucketBlobStore) else BucketBlobStore(lambda: storage.bucket())
+# View and click counters, buffered per worker and flushed in batches
+engagement = EngagementCounters(PropertyManager.COLLECTION)
+# Bundled country/state/city data, and an on-disk cache for external geo lookups
+geo = Lazy("geo", GeoIndex.load)
+geo_cache = Lazy("geo_cache", lambda: SharedCache(
+    SqliteBackend(os.environ.get("GEO_CACHE_PATH", str(basedir / "api" / "data" / "geo_cache.db")), int(os.environ.get("GEO_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))),
+    default_ttl=30 * 86400
+))
+GEOCODER_URL = os.environ.get("GEOCODER_URL", "https://nominatim.openstreetmap.org/search")
+GEO_FALLBACK_URL = os.environ.get("GEO_FALLBACK_URL", "https://countriesnow.space/api/v0.1")
+# Per-IP/uid rate limits and concurrency caps (see ADMISSION_BACKEND)
+admission = create_admission_controller()
+TRUST_PROXY = os.environ.get("ADMISSION_TRUST_PROXY", "false").lower() == "true"
+if TRUST_PROXY:
+    from werkzeug.middleware.proxy_fix import ProxyFix
+    # remote_addr becomes the X-Forwarded-For entry our own proxies appended; entries left of it are client-supplied
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=int(os.environ.get("ADMISSION_PROXY_HOPS", "1")))
+# Durable queue for slow side effects (see TASK_QUEUE_PATH); consumers start per worker
+tasks = create_task_queue()
+# Uploads younger than this are never swept (they may belong to a listing being written)
+ORPHAN_GRACE_SECONDS = float(os.environ.get("ORPHAN_BLOB_GRACE_SECONDS", str(24 * 3600)))
+# Decoded profile photos keyed by (uid, version)
+photo_cache = LRUCache(max_entries=4096, max_bytes=int(os.environ.get("PROFILE_PHOTO_CACHE_BYTES", str(32 * 1024 * 1024))), sizeof=lambda v: len(v[0]))
+PHOTO_FIELDS = ["photoVersion", "photoKey", "photoUrl"]
+
+# Routes that never touch firebase and must stay fast on a cold instance
+LIGHTWEIGHT_ENDPOINTS = {
+    "home", "warmup_route", "get_startup_report", "get_task_status", "get_engagement_status", "get_admission_status", "get_property_types", "get_listing_types",
+    "get_property_statuses", "get_amenities", "get_region",
+    "get_geo_countries", "get_geo_states", "get_geo_cities", "search_geo_places", "autocomplete_address"
+}
+
+startup.mark("imports")
+startup.check_budget()
+
+def warmup() -> Dict[str, Any]:
+    """
+    Initialize every heavy client ahead of traffic.
+
+    Call from gunicorn's post_worker_init hook or hit /_ah/warmup so the first
+    real request does not pay for SDK imports and firebase initialization.
+    """
+    report = startup.warm(["database", "firebase_admin.auth", "firebase_admin.firestore", "security", "manager", "http", "geo"])
+    if manager.replica is not None:
+        # Off the request path, so waiting for the seed is fine here
+        manager.replica.ensure_started(timeout=float(os.environ.get("ANNOUNCEMENT_REPLICA_SEED_TIMEOUT", "30")))
+    return report
+
+@app.after_request
+def record_first_response(response: flask.Response) -> flask.Response:
+    """Record time-to-first-response for the startup report."""
+    startup.mark("first_response")
+    return response
+
+@app.route("/_ah/warmup", methods=["GET"])
+def warmup_route() -> Tuple[flask.Response, int]:
+    """Warmup hook for autoscaled instances."""
+    return jsonify(warmup()), 200
+
+@app.route("/api/status/startup", methods=["GET"])
+def get_startup_report() -> Tuple[flask.Response, int]:
+    """Import-time budget report and lazy initialization costs for this worker."""
+    return jsonify(startup.report()), 200
+
+@app.route("/api/status/admission", methods=["GET"])
+def get_admission_status() -> Tuple[flask.Response, int]:
+    """Admission control rejections for this worker."""
+    return jsonify(admission.stats() if admission is not None else {"backend": "off"}), 200
+
+@app.route("/api/status/tasks", methods=["GET"])
+def get_task_status() -> Tuple[flask.Response, int]:
+    """Background task queue counts and recent failures."""
+    return jsonify(tasks.stats()), 200
+
+def attach_image_variants(data: Dict[str, Any], existing: Any = None) -> bool:
+    """
+    Realign existing variants with an (externalized) images list.
+
+    Only reuses manifests; nothing is processed here. Returns True when some
+    image still lacks variants, i.e. the build_image_variants task is needed.
+    """
+    if "images" not in data:
+        return False
+    previous = existing.data.image_variants if existing else []
+    previous_images = existing.data.images if existing else []
+    data["image_variants"] = image_pipeline.process_images(data.get("images") or [], previous, previous_images, lookup=variant_manifest)
+    return any(m is None for m in data["image_variants"])
+
+def variant_manifest(url: Any) -> Any:
+    """Manifest of the variant set an image URL belongs to (e.g. an /api/upload result), or None."""
+    try:
+        key = bucket_store.key_for_url(url)
+        return image_pipeline.stored_manifest(key) if key else None
+    except Exception as e:
+        print(f"[ERROR] Variant manifest lookup failed for {url}: {e}")
+        return None
+
+def resolve_blob(url: Any) -> Tuple[Any, Any]:
+    """Return (store, key) for a URL served by the blob store or the bucket, else (None, None)."""
+    for store in (blob_store, bucket_store):
+        key = store.key_for_url(url)
+        if key:
+            return store, key
+    return None, None
+
+def load_blob(url: str) -> Any:
+    """Raw bytes behind an image reference, or None."""
+    store, key = resolve_blob(url)
+    found = store.get(key) if store else None
+    return found[0] if found else None
+
+@tasks.task("build_image_variants")
+def build_image_variants_task(payload: Dict[str, Any]) -> None:
+    """Generate missing image variants for an announcement after it was saved."""
+    database.get()
+    # Read past the replica and cache: the task must see the latest images
+    doc = firestore.client().collection(PropertyManager.COLLECTION).document(payload["property_id"]).get()
+    if not doc.exists:
+        return
+    prop = Property.from_dict(doc.to_dict())
+    images = list(prop.data.images or [])
+    variants = image_pipeline.process_images(images, prop.data.image_variants, images, loader=load_blob, prefix=f"properties/{prop.owner_id}", lookup=variant_manifest)
+    manager.set_image_variants(prop.id, images, variants)
+
+@tasks.task("remove_favorite_references")
+def remove_favorite_references_task(payload: Dict[str, Any]) -> None:
+    """Drop a deleted announcement from every user's favorites."""
+    database.get()
+    removed = manager.remove_from_favorites(payload["property_id"])
+    print(f"[DEBUG] Removed {payload['property_id']} from {removed} favorites lists")
+
+@tasks.task("collect_images")
+def collect_images_task(payload: Dict[str, Any]) -> None:
+    """
+    Delete an owner's images that no announcement references anymore.
+
+    Candidates are the URLs in the payload; with `sweep`, every blob under
+    properties/{uid}/ older than ORPHAN_BLOB_GRACE_SECONDS is a candidate too
+    (covers uploads that were never attached to a listing).
+    """
+    database.get()
+    owner_id = payload["owner_id"]
+    prefix = f"properties/{owner_id}/"
+    referenced = set()
+    for url in manager.image_references(owner_id):
+        store, key = resolve_blob(url)
+        if store is not None:
+            referenced.add((id(store), key))
+
+    candidates = {resolve_blob(url) for url in payload.get("urls") or []}
+    if payload.get("sweep"):
+        cutoff = time.time() - ORPHAN_GRACE_SECONDS
+        for store in {id(s): s for s in (blob_store, bucket_store)}.values():
+            candidates.update((store, key) for key, modified in store.list(prefix) if modified < cutoff)
+
+    # A variant set's manifest lives as long as any of its files is referenced
+    referenced_dirs = {(store_id, key.rsplit("/", 1)[0]) for store_id, key in referenced}
+    deleted = 0
+    for store, key in candidates:
+        # Never touch blobs outside the owner's prefix (e.g. shared content-hashed images/)
+        if store is None or not key.startswith(prefix) or (id(store), key) in referenced:
+            continue
+        if key.endswith(f"/{MANIFEST_NAME}") and (id(store), key.rsplit("/", 1)[0]) in referenced_dirs:
+            continue
+        store.delete(key)
+        deleted += 1
+    print(f"[DEBUG] Collected {deleted} unreferenced blobs for {owner_id}")
+
+@tasks.task("expire_tombstone")
+def expire_tombstone_task(payload: Dict[str, Any]) -> None:
+    """Remove a deletion tombstone after the sync retention window."""
+    database.get()
+    manager.expire_tombstone(payload["property_id"])
+
+@tasks.task("migrate_schema")
+def migrate_schema_task(payload: Dict[str, Any]) -> None:
+    """Upgrade one page of announcements to the current schema and queue the next page."""
+    database.get()
+    result = manager.migrate_schema_page(payload.get("cursor"), int(payload.get("batch_size", 200)))
+    print(f"[DEBUG] Schema migration after {payload.get('cursor')}: {result}")
+    if result["cursor"]:
+        tasks.enqueue("migrate_schema", {**payload, "cursor": result["cursor"]})
+
+def externalize_images(data: Dict[str, Any], uid: str) -> None:
+    """Replace inline images in an announcement payload with blob store references."""
+    prefix = f"properties/{uid}"
+    if isinstance(data.get("images"), list):
+        data["images"] = [externalize_image(img, blob_store, prefix)[0] for img in data["images"]]
+    if data.get("layout_image"):
+        data["layout_image"] = externalize_image(data["layout_image"], blob_store, prefix)[0]
+
+def load_data_file(relative_path: str) -> Any:
+    """Load a bundled JSON data file through the shared cache."""
+    def read() -> Any:
+        with open(basedir / "api" / "data" / relative_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return cache.get_or_set("data", relative_path, read, ttl=86400)
 
 def verify_token() -> Any:
-    """Verify Firebase JWT from Authorization header."""
+    """Verify Firebase JWT from Authorization header (once per request)."""
+    if "user" in g:
+        return g.user
     auth_header = request.headers.get("Authorization")
     if not auth_header or not auth_header.startswith("Bearer "):
         return None
     
     token = auth_header.split("Bearer ")[1]
-    return Auth.verify_id_token(token)
+    g.user = Auth.verify_id_token(token)
+    return g.user
+
+def client_ip() -> str:
+    """Client address (behind a trusted proxy, the hop it appended; see ProxyFix above)."""
+    return request.remote_addr or "unknown"
+
+def request_uid() -> Any:
+    """Uid of a valid bearer token, or None (invalid tokens are rejected by the route itself)."""
+    try:
+        user = verify_token()
+        return user["uid"] if user else None
+    except Exception:
+        return None
 
 @app.before_request
 def before_request_hook() -> Any:
-    """Apply security validation before each request."""
+    """Apply security validation and admission control before each request."""
     security.validation()
+    # CORS preflights never reach a route (see EXEMPT_METHODS in api.utils.admission)
+    lightweight = request.endpoint in LIGHTWEIGHT_ENDPOINTS or request.method == "OPTIONS"
+    if not lightweight:
+        database.get()
+        tasks.ensure_worker(int(os.environ.get("TASK_WORKER_THREADS", "1")))
+
+    if admission is not None:
+        # Tokens are only verified once the IP bucket admitted the request
+        identify = request_uid if not lightweight and request.headers.get("Authorization") else None
+        rejection, g.admission_slot = admission.admit(request.endpoint, client_ip(), identify, request.method)
+        if rejection:
+            response = jsonify({"error": rejection["error"]})
+            response.status_code = rejection["status"]
+            response.headers["Retry-After"] = str(rejection["retry_after"])
+            return response
     return None
 
+@app.teardown_request
+def release_admission_slot(error: Any = None) -> None:
+    """Return the concurrency slot taken in before_request_hook."""
+    if admission is not None:
+        admission.release(g.pop("admission_slot", None))
+
 @app.route("/api/types", methods=["GET"])
 def get_property_types() -> Tuple[flask.Response, int]:
     """Get list of allowed property types from JSON file."""
     try:
-        types_file = basedir / "api" / "data" / "property_types.json"
-        with open(types_file, "r") as f:
-            types_list = json.load(f)
+        types_list = load_data_file("property_types.json")
         return jsonify(types_list), 200
     except Exception as e:
         print(f"[ERROR_SERVICE] Failed to load types: {e}")
@@ -99,9 +361,7 @@ def get_property_types() -> Tuple[flask.Response, int]:
 def get_listing_types() -> Tuple[flask.Response, int]:
     """Get list of allowed listing types from JSON file."""
     try:
-        types_file = basedir / "api" / "data" / "listing_types.json"
-        with open(types_file, "r") as f:
-            types_list = json.load(f)
+        types_list = load_data_file("listing_types.json")
         return jsonify(types_list), 200
     except Exception as e:
         print(f"[ERROR_SERVICE] Failed to load listing types: {e}")
@@ -111,9 +371,7 @@ def get_listing_types() -> Tuple[flask.Response, int]:
 def get_property_statuses() -> Tuple[flask.Response, int]:
     """Get list of allowed property statuses from JSON file."""
     try:
-        statuses_file = basedir / "api" / "data" / "property_statuses.json"
-        with open(statuses_file, "r") as f:
-            statuses_list = json.load(f)
+        statuses_list = load_data_file("property_statuses.json")
         return jsonify(statuses_list), 200
     except Exception as e:
         print(f"[ERROR_SERVICE] Failed to load statuses: {e}")
@@ -123,9 +381,7 @@ def get_property_statuses() -> Tuple[flask.Response, int]:
 def get_amenities() -> Tuple[flask.Response, int]:
     """Get list of common key amenities from JSON file."""
     try:
-        amenities_file = basedir / "api" / "data" / "key_amenities.json"
-        with open(amenities_file, "r") as f:
-            amenities_list = json.load(f)
+        amenities_list = load_data_file("key_amenities.json")
         return jsonify(amenities_list), 200
     except Exception as e:
         print(f"[ERROR_SERVICE] Failed to load amenities: {e}")
@@ -165,10 +421,7 @@ def get_region() -> Tuple[flask.Response, int]:
             if matches:
                 target_lang = matches[0]
                 
-        lang_file = lang_dir / f"{target_lang}.json"
-        
-        with open(lang_file, "r", encoding="utf-8") as f:
-            lang_pack = json.load(f)
+        lang_pack = load_data_file(f"languages/{target_lang}.json")
             
         return jsonify({
             "regions": ["Brazil"],
@@ -186,6 +439,99 @@ def get_region() -> Tuple[flask.Response, int]:
             "languagePack": {}
         }), 200
 
+def geocode(query: str, limit: int, lang: str) -> Any:
+    """Forward an address query to the external geocoder (Nominatim format)."""
+    params = {"format": "json", "q": query, "addressdetails": 1, "limit": limit}
+    if lang:
+        params["accept-language"] = lang
+    resp = http.get(GEOCODER_URL, params=params, headers={"User-Agent": "vit-estate-manager/1.0"}, timeout=10)
+    resp.raise_for_status()
+    return resp.json()
+
+address_autocomplete = Lazy("address_autocomplete", lambda: AddressAutocomplete(geocode, geo_cache, min_interval=float(os.environ.get("GEOCODER_MIN_INTERVAL", "1.0"))))
+
+def fetch_remote_geo(path: str, body: Dict[str, str]) -> Any:
+    """States/cities for countries missing from the bundled dataset, cached on disk."""
+    def fetch() -> Any:
+        resp = http.post(f"{GEO_FALLBACK_URL}/{path}", json=body, timeout=10)
+        resp.raise_for_status()
+        payload = resp.json()
+        if payload.get("error"):
+            raise LookupError(payload.get("msg") or "Not found")
+        return payload.get("data")
+    return geo_cache.get_or_set("geo", f"{path}:{json.dumps(body, sort_keys=True)}", fetch)
+
+def geo_response(payload: Any) -> flask.Response:
+    """JSON response for reference data that changes at most with a deploy."""
+    response = jsonify(payload)
+    response.headers["Cache-Control"] = "public, max-age=86400"
+    return response
+
+@app.route("/api/geo/countries", methods=["GET"])
+def get_geo_countries() -> Tuple[flask.Response, int]:
+    """Bundled countries, optionally filtered by ?q= prefix."""
+    return geo_response(geo.countries(request.args.get("q", ""))), 200
+
+@app.route("/api/geo/states", methods=["GET"])
+def get_geo_states() -> Tuple[flask.Response, int]:
+    """States of ?country=, optionally filtered by ?q= prefix."""
+    country = request.args.get("country", "")
+    prefix = request.args.get("q", "")
+    if not country:
+        return jsonify({"error": "country is required"}), 400
+    states = geo.states(country, prefix)
+    if states is None:
+        try:
+            remote = fetch_remote_geo("countries/states", {"country": country})
+            by_name = {s["name"]: {"name": s["name"], "code": s.get("state_code")} for s in remote["states"]}
+            states = [by_name[name] for name in filter_prefix(sorted(by_name, key=fold), prefix)]
+        except Exception as e:
+            print(f"[ERROR_SERVICE] Failed to fetch states for {country}: {e}")
+            return jsonify([]), 200
+    return geo_response(states), 200
+
+@app.route("/api/geo/cities", methods=["GET"])
+def get_geo_cities() -> Tuple[flask.Response, int]:
+    """Cities of ?country= and ?state=, optionally filtered by ?q= prefix."""
+    country = request.args.get("country", "")
+    state = request.args.get("state", "")
+    prefix = request.args.get("q", "")
+    if not country or not state:
+        return jsonify({"error": "country and state are required"}), 400
+    cities = geo.cities(country, state, prefix)
+    if cities is None or not geo.is_complete(country):
+        # Not bundled, or bundled with major cities only: complete the list from the remote source
+        try:
+            remote = fetch_remote_geo("countries/state/cities", {"country": country, "state": geo.state_name(country, state) or state})
+            merged = sorted(set(remote or []) | set(geo.cities(country, state) or []), key=fold)
+            cities = filter_prefix(merged, prefix)
+        except Exception as e:
+            print(f"[ERROR_SERVICE] Failed to fetch cities for {state}, {country}: {e}")
+            if cities is None:
+                return jsonify([]), 200
+    return geo_response(cities), 200
+
+@app.route("/api/geo/search", methods=["GET"])
+def search_geo_places() -> Tuple[flask.Response, int]:
+    """States and cities of all bundled countries matching ?q= (prefix of any word)."""
+    return geo_response(geo.search(request.args.get("q", ""))), 200
+
+@app.route("/api/geo/autocomplete", methods=["GET"])
+def autocomplete_address() -> Tuple[flask.Response, int]:
+    """Address suggestions (Nominatim format) through the cached geocoder proxy."""
+    try:
+        limit = min(max(int(request.args.get("limit", "5")), 1), 10)
+    except ValueError:
+        return jsonify({"error": "Invalid limit"}), 400
+    try:
+        results = address_autocomplete.search(request.args.get("q", ""), limit, request.args.get("lang", ""))
+    except Exception as e:
+        print(f"[ERROR_SERVICE] Address autocomplete failed: {e}")
+        return jsonify({"error": "Geocoder unavailable"}), 502
+    response = jsonify(results)
+    response.headers["Cache-Control"] = "public, max-age=3600"
+    return response, 200
+
 @app.route("/api/announcements", methods=["GET"])
 def get_announcements() -> Tuple[flask.Response, int]:
     """Get all announcements with filters."""
@@ -194,6 +540,33 @@ def get_announcements() -> Tuple[flask.Response, int]:
     announcements = manager.get_all_announcements(filters)
     return jsonify(announcements), 200
 
+@app.route("/api/announcements/changes", methods=["GET"])
+def get_announcement_changes() -> Tuple[flask.Response, int]:
+    """Listings upserted and deleted since ?since=<token> (omit for a full sync)."""
+    since = request.args.get("since")
+    try:
+        since = int(since) if since else None
+        limit = min(max(int(request.args.get("limit", "500")), 1), 1000)
+    except ValueError:
+        return jsonify({"error": "Invalid sync token"}), 400
+    return jsonify(manager.get_changes(since, limit)), 200
+
+@app.route("/api/announcements/facets", methods=["GET"])
+def get_announcement_facets() -> Tuple[flask.Response, int]:
+    """Facet counts and price/area histograms for the filter UI (never scans announcements)."""
+    try:
+        return jsonify(manager.get_facets()), 200
+    except Exception as e:
+        print(f"[ERROR_SERVICE] Failed to load facets: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/api/status/replica", methods=["GET"])
+def get_replica_status() -> Tuple[flask.Response, int]:
+    """Report size and staleness of this worker's announcements replica."""
+    if manager.replica is None:
+        return jsonify({"mode": "off"}), 200
+    return jsonify(manager.replica.status()), 200
+
 @app.route("/api/announcements/<property_id>", methods=["GET"])
 def get_announcement(property_id: str) -> Tuple[flask.Response, int]:
     """Get details of a single announcement."""
@@ -212,25 +585,58 @@ def get_announcement(property_id: str) -> Tuple[flask.Response, int]:
     include_coords = request.args.get("coords", "false").lower() == "true"
     
     data = announcement.to_dict(include_location=include_coords, is_owner=is_owner)
+    if not is_owner:
+        engagement.record(property_id, "views")
     
     # Fetch owner details
     if announcement.owner_id:
         # Optimization: Only fetch owner details if not self? Or always?
         # Always fetch so we can show "Listed by You" or similar
         try:
-            owner_record = auth.get_user(announcement.owner_id)
-            data["owner"] = {
-                "uid": owner_record.uid,
-                "name": owner_record.display_name,
-                "email": owner_record.email,
-                "photo": owner_record.photo_url
-            }
+            def fetch_owner() -> Dict[str, Any]:
+                owner_record = auth.get_user(announcement.owner_id)
+                return {
+                    "uid": owner_record.uid,
+                    "name": owner_record.display_name,
+                    "email": owner_record.email,
+                    "photo": owner_record.photo_url
+                }
+            data["owner"] = cache.get_or_set("owners", announcement.owner_id, fetch_owner, ttl=3600)
         except Exception as e:
             print(f"[ERROR_SERVICE] Failed to fetch owner details: {e}")
             data["owner"] = None
             
     return jsonify(data), 200
 
+@app.route("/api/announcements/<property_id>/engagement", methods=["POST"])
+def record_engagement(property_id: str) -> Tuple[flask.Response, int]:
+    """Count a client-side engagement event (e.g. contact_clicks) for an announcement."""
+    event = (request.get_json(silent=True) or {}).get("event")
+    if event not in CLIENT_EVENTS:
+        return jsonify({"error": f"event must be one of {sorted(CLIENT_EVENTS)}"}), 400
+    if manager.get_announcement(property_id) is None:
+        return jsonify({"error": "Announcement not found"}), 404
+    engagement.record(property_id, event)
+    return jsonify({"status": "accepted"}), 202
+
+@app.route("/api/status/engagement", methods=["GET"])
+def get_engagement_status() -> Tuple[flask.Response, int]:
+    """Buffered engagement counters for this worker."""
+    return jsonify(engagement.stats()), 200
+
+@app.route("/api/announcements/<property_id>/similar", methods=["GET"])
+def get_similar_announcements(property_id: str) -> Tuple[flask.Response, int]:
+    """Get listings similar to an announcement."""
+    try:
+        k = max(1, min(int(request.args.get("k", 6)), 24))
+    except ValueError:
+        return jsonify({"error": "Invalid k"}), 400
+
+    similar = manager.get_similar_announcements(property_id, k)
+    if similar is None:
+        return jsonify({"error": "Announcement not found"}), 404
+    return jsonify(similar), 200
+
 @app.route("/api/announcements", methods=["POST"])
 def create_announcement() -> Tuple[flask.Response, int]:
     """Create a new announcement (Auth required)."""
@@ -243,10 +649,17 @@ def create_announcement() -> Tuple[flask.Response, int]:
         return jsonify({"error": "Missing data"}), 400
     
     data["owner_id"] = user["uid"]
+    # New listings start with zero counters whatever the client sends
+    for key in COUNTER_KEYS:
+        data.pop(key, None)
     
     try:
+        externalize_images(data, user["uid"])
+        needs_variants = attach_image_variants(data)
         property_obj = Property.from_dict(data)
         property_id = manager.create_announcement(property_obj)
+        if needs_variants:
+            tasks.enqueue("build_image_variants", {"property_id": property_id})
         return jsonify({"id": property_id, "status": "created"}), 201
     except Exception as e:
         print(f"[ERROR_SERVICE] Failed to create property: {e}")
@@ -272,7 +685,16 @@ def update_announcement(property_id: str) -> Tuple[flask.Response, int]:
     if not data:
         return jsonify({"error": "Missing data"}), 400
     
+    externalize_images(data, user["uid"])
+    needs_variants = attach_image_variants(data, existing)
     manager.update_announcement(property_id, data)
+    if needs_variants:
+        tasks.enqueue("build_image_variants", {"property_id": property_id})
+    # Images dropped by this update are reclaimed unless another listing still uses them
+    previous = existing.to_dict(include_location=True, is_owner=True)
+    replaced = set(image_urls(previous)) - set(image_urls({**previous, **data}))
+    if replaced:
+        tasks.enqueue("collect_images", {"owner_id": user["uid"], "urls": sorted(replaced)})
     return jsonify({"status": "updated"}), 200
 
 @app.route("/api/announcements/<property_id>", methods=["DELETE"])
@@ -290,6 +712,10 @@ def delete_announcement(property_id: str) -> Tuple[flask.Response, int]:
         return jsonify({"error": "Forbidden"}), 403
     
     manager.delete_announcement(property_id)
+    # Cascades run in the background; the listing is already gone for readers
+    tasks.enqueue("remove_favorite_references", {"property_id": property_id})
+    tasks.enqueue("expire_tombstone", {"property_id": property_id}, delay=PropertyManager.TOMBSTONE_TTL)
+    tasks.enqueue("collect_images", {"owner_id": user["uid"], "urls": image_urls(existing.to_dict(include_location=True, is_owner=True)), "sweep": True})
     return jsonify({"status": "deleted"}), 200
 
 @app.route("/api/user/announcements", methods=["GET"])
@@ -302,10 +728,6 @@ def get_user_announcements() -> Tuple[flask.Response, int]:
     announcements = manager.get_user_announcements(user["uid"])
     return jsonify(announcements), 200
 
-from firebase_admin import storage
-
-# ... existing code ...
-
 @app.route("/api/upload", methods=["POST"])
 def upload_file() -> Tuple[flask.Response, int]:
     """Upload a file to Firebase Storage (Auth required)."""
@@ -321,23 +743,18 @@ def upload_file() -> Tuple[flask.Response, int]:
         return jsonify({"error": "No selected file"}), 400
 
     try:
-        bucket = storage.bucket()
-        import time
-        import uuid
         allowed_extensions = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
         ext = file.filename.rsplit('.', 1)[1].lower() if '.' in file.filename else 'jpg'
         
         if ext not in allowed_extensions:
              return jsonify({"error": "Invalid file type"}), 400
 
-        # Folder structure: properties/{uid}/{uuid}.{ext}
-        blob_path = f"properties/{user['uid']}/{uuid.uuid4()}.{ext}"
-        blob = bucket.blob(blob_path)
-        
-        blob.upload_from_file(file.stream, content_type=file.content_type)
-        blob.make_public()
+        # Resize, strip metadata and store content-hashed variants. The returned
+        # URL is itself a variant; attaching it to a listing reuses this manifest
+        manifest = image_pipeline.process(file.stream.read(), prefix=f"properties/{user['uid']}")
         
-        return jsonify({"url": blob.public_url}), 200
+        full = manifest["variants"]["full"]["urls"]
+        return jsonify({"url": full.get("jpeg") or next(iter(full.values())), "variants": manifest}), 200
 
     except Exception as e:
         print(f"Generic upload failed: {e}")
@@ -363,7 +780,6 @@ def upload_profile_image() -> Tuple[flask.Response, int]:
         
         # Create a blob path: users/{uid}/profile_{timestamp}.jpg
         # We can use the filename provided or generate one
-        import time
         allowed_extensions = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
         ext = file.filename.rsplit('.', 1)[1].lower() if '.' in file.filename else 'jpg'
         
@@ -410,13 +826,19 @@ def upload_profile_photo() -> Tuple[flask.Response, int]:
         return jsonify({"error": "Missing photo data"}), 400
     
     try:
-        # Store compressed photo data in users/{uid} document
+        # Photo bytes go to the blob store; the users/{uid} document keeps the reference
+        stored = store_inline_image(data["photoData"], blob_store, f"users/{user['uid']}")
+        if stored is None:
+            stored = {"url": data["photoData"], "key": None, "version": content_hash(str(data["photoData"]).encode())}
         db = Database()
         user_ref = db.collection("users").document(user["uid"])
         
         # Use set with merge=True to update or create
         user_ref.set({
-            "photoData": data["photoData"],
+            "photoUrl": stored["url"],
+            "photoKey": stored["key"],
+            "photoVersion": stored["version"],
+            "photoData": firestore.DELETE_FIELD,
             "updated_at": firestore.SERVER_TIMESTAMP
         }, merge=True)
         
@@ -442,16 +864,140 @@ def get_profile_photo(uid: str) -> Tuple[flask.Response, int]:
             return jsonify({"error": "User/Photo not found"}), 404
         
         user_data = user_doc.to_dict()
-        photo_data = user_data.get("photoData")
+        # photoData is the legacy inline field, kept until migrated
+        photo_data = user_data.get("photoUrl") or user_data.get("photoData")
         
         if not photo_data:
              return jsonify({"error": "Photo not found"}), 404
 
-        return jsonify({"photoData": photo_data}), 200
+        return jsonify({"photoData": photo_data, "photoVersion": photo_version(uid, user_data)}), 200
     except Exception as e:
         print(f"Failed to retrieve profile photo: {e}")
         return jsonify({"error": str(e)}), 500
 
+def photo_version(uid: str, meta: Dict[str, Any]) -> Any:
+    """
+    Version of a user's photo (None when there is none).
+
+    Legacy inline photos are hashed once and the hash is stored as
+    photoVersion, so the version only changes with the photo itself.
+    """
+    if "photoVersion" in meta:
+        return meta["photoVersion"]
+    if meta.get("photoUrl"):
+        return content_hash(str(meta["photoUrl"]).encode())
+    user_ref = firestore.client().collection("users").document(uid)
+    legacy = user_ref.get(field_paths=["photoData"])
+    if not legacy.exists:
+        return None
+    raw = decode_inline_image((legacy.to_dict() or {}).get("photoData"))
+    version = content_hash(raw) if raw else None
+    try:
+        # Conditioned on the read so a concurrent upload is never overwritten
+        user_ref.update({"photoVersion": version}, option=firestore.client().write_option(last_update_time=legacy.update_time))
+    except Exception as e:
+        print(f"[ERROR] Failed to store photo version for {uid}: {e}")
+    return version
+
+def load_profile_photo(uid: str, meta: Dict[str, Any]) -> Any:
+    """Load (bytes, content_type) for a photo from the blob store or the legacy inline field."""
+    if meta.get("photoKey"):
+        return blob_store.get(meta["photoKey"])
+    if not meta.get("photoUrl"):
+        # Legacy document: photoData is only read on a cache miss
+        legacy = firestore.client().collection("users").document(uid).get(field_paths=["photoData"])
+        raw = decode_inline_image((legacy.to_dict() or {}).get("photoData")) if legacy.exists else None
+        if raw:
+            return raw, "image/jpeg"
+    return None
+
+@app.route("/api/user/profile-photo/<uid>/image", methods=["GET"])
+def get_profile_photo_image(uid: str) -> Any:
+    """
+    Serve a profile photo as binary with ETag/304 support.
+
+    Requests carrying ?v=<photoVersion> are immutable and cached for a year;
+    unversioned requests are revalidated after a few minutes.
+    """
+    requested = request.args.get("v")
+    if requested and requested in request.if_none_match:
+        return flask.Response(status=304)
+
+    try:
+        cached = photo_cache.get((uid, requested)) if requested else None
+        version = requested
+        if cached is None:
+            doc = firestore.client().collection("users").document(uid).get(field_paths=PHOTO_FIELDS)
+            meta = (doc.to_dict() or {}) if doc.exists else {}
+            version = photo_version(uid, meta)
+            if not version:
+                return jsonify({"error": "Photo not found"}), 404
+            if version in request.if_none_match:
+                return flask.Response(status=304, headers={"ETag": f'"{version}"'})
+            cached = photo_cache.get((uid, version))
+            if cached is None:
+                cached = load_profile_photo(uid, meta)
+                if cached is None:
+                    if meta.get("photoUrl"):
+                        # External photo (e.g. provider avatar URL)
+                        return flask.redirect(meta["photoUrl"], code=302)
+                    return jsonify({"error": "Photo not found"}), 404
+                photo_cache.set((uid, version), cached)
+
+        body, content_type = cached
+        response = flask.make_response(body)
+        response.headers["Content-Type"] = content_type
+        response.set_etag(version)
+        if requested and requested == version:
+            response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        else:
+            response.headers["Cache-Control"] = "public, max-age=300"
+        return response
+    except Exception as e:
+        print(f"Failed to serve profile photo: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/api/user/profile-photos", methods=["POST"])
+def get_profile_photo_versions() -> Tuple[flask.Response, int]:
+    """Return photo versions for many users at once so clients can build versioned image URLs."""
+    data = request.json or {}
+    uids = [u for u in dict.fromkeys(data.get("uids") or []) if isinstance(u, str) and u]
+    if not uids:
+        return jsonify({"versions": {}}), 200
+    if len(uids) > 100:
+        return jsonify({"error": "Too many uids (max 100)"}), 400
+
+    try:
+        db = firestore.client()
+        refs = [db.collection("users").document(uid) for uid in uids]
+        versions = {uid: None for uid in uids}
+        # One round trip, projected so favorites and inline photos are never read
+        for doc in db.get_all(refs, field_paths=PHOTO_FIELDS):
+            if doc.exists:
+                versions[doc.id] = photo_version(doc.id, doc.to_dict() or {})
+        return jsonify({"versions": versions}), 200
+    except Exception as e:
+        print(f"Failed to get profile photo versions: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/api/blobs/<path:key>", methods=["GET"])
+def get_blob(key: str) -> Any:
+    """Serve blobs when the local filesystem blob store is in use."""
+    if not isinstance(blob_store, LocalBlobStore):
+        return jsonify({"error": "Not found"}), 404
+    try:
+        found = blob_store.get(key)
+    except ValueError:
+        return jsonify({"error": "Invalid key"}), 400
+    if not found:
+        return jsonify({"error": "Not found"}), 404
+    body, content_type = found
+    response = flask.make_response(body)
+    response.headers["Content-Type"] = content_type
+    # Keys are content hashes, so the payload never changes
+    response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    return response
+
 @app.route("/api/user/favorites", methods=["GET"])
 def get_user_favorites() -> Tuple[flask.Response, int]:
     """Get list of favorite property IDs for the logged-in user."""
@@ -502,11 +1048,12 @@ def add_user_favorite(property_id: str) -> Tuple[flask.Response, int]:
             "updated_at": firestore.firestore.SERVER_TIMESTAMP
         }, merge=True)
         
-        # Increment property counter
+        # Increment property counter (updated_at lets delta-sync clients see the new count)
         prop_ref = db.collection("announcements").document(property_id)
-        batch.update(prop_ref, {"favorite_count": firestore.firestore.Increment(1)})
+        batch.update(prop_ref, {"favorite_count": firestore.firestore.Increment(1), "updated_at": firestore.firestore.SERVER_TIMESTAMP})
         
         batch.commit()
+        manager.invalidate_cache()
         
         return jsonify({"status": "added", "property_id": property_id}), 200
     except Exception as e:
@@ -544,9 +1091,10 @@ def remove_user_favorite(property_id: str) -> Tuple[flask.Response, int]:
         
         # Decrement property counter
         prop_ref = db.collection("announcements").document(property_id)
-        batch.update(prop_ref, {"favorite_count": firestore.firestore.Increment(-1)})
+        batch.update(prop_ref, {"favorite_count": firestore.firestore.Increment(-1), "updated_at": firestore.firestore.SERVER_TIMESTAMP})
         
         batch.commit()
+        manager.invalidate_cache()
         
         return jsonify({"status": "removed", "property_id": property_id}), 200
     except Exception as e:
@@ -582,8 +1130,12 @@ def translate_text() -> Tuple[flask.Response, int]:
     text = data["text"]
     target_lang = data["target_lang"]
     
+    cache_key = content_hash(f"{target_lang}\0{text}".encode("utf-8"))
+    cached = cache.get("translations", cache_key)
+    if cached is not None:
+        return jsonify({"translatedText": cached}), 200
+
     try:
-        import requests
         # Use the same endpoint the user liked
         url = "https://translate.googleapis.com/translate_a/single"
         params = {
@@ -594,13 +1146,15 @@ def translate_text() -> Tuple[flask.Response, int]:
             "q": text
         }
         
-        resp = requests.get(url, params=params)
+        # Pooled session reuses the TLS connection across requests
+        resp = http.get(url, params=params, timeout=10)
         if resp.status_code != 200:
              return jsonify({"error": "Translation service error"}), 502
              
         # Response format: [[["translated", "original", ...], ...], ...]
         json_data = resp.json()
         translated_text = "".join([s[0] for s in json_data[0]])
+        cache.set("translations", cache_key, translated_text, ttl=7 * 86400)
         
         return jsonify({"translatedText": translated_text}), 200
     except Exception as e:
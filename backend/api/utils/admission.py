@@ -0,0 +1,287 @@
+"""
+    file: admission.py
+    brief: Admission control: token-bucket rate limits and concurrency caps shared across workers
+"""
+# Standard library imports
+import os
+import time
+import uuid
+import sqlite3
+import tempfile
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# Request cost per endpoint; anything unlisted costs DEFAULT_COST, 0 is never limited
+ROUTE_COSTS: Dict[str, float] = {
+    "home": 0, "warmup_route": 0, "static": 0,
+    "get_startup_report": 0, "get_admission_status": 0, "get_task_status": 0,
+    "get_replica_status": 0, "get_engagement_status": 0,
+    "get_property_types": 0.2, "get_listing_types": 0.2, "get_property_statuses": 0.2,
+    "get_amenities": 0.2, "get_region": 0.5, "get_geo_countries": 0.2, "get_geo_states": 0.5,
+    "get_geo_cities": 0.5, "search_geo_places": 0.5, "get_blob": 0.5,
+    "get_profile_photo_image": 0.5, "get_announcement": 1, "get_announcement_changes": 2,
+    "get_announcement_facets": 1, "get_similar_announcements": 2,
+    "get_announcements": 5, "autocomplete_address": 3, "translate_text": 10,
+    "upload_file": 10, "upload_profile_image": 10, "upload_profile_photo": 10,
+    "create_announcement": 5, "update_announcement": 5, "delete_announcement": 5,
+}
+DEFAULT_COST = 1.0
+
+# CORS preflights are answered without running the route; limiting them
+# would double every browser request's cost and surface 429s as CORS errors
+EXEMPT_METHODS = {"OPTIONS"}
+
+# In-flight requests allowed per endpoint across all workers sharing the backend
+CONCURRENCY_CAPS: Dict[str, int] = {
+    "get_announcements": 8,
+    "translate_text": 4,
+    "autocomplete_address": 4,
+    "upload_file": 4,
+    "upload_profile_image": 4,
+    "upload_profile_photo": 4,
+}
+
+class MemoryLimiterBackend:
+    """Per-process state (each gunicorn worker limits on its own)."""
+
+    def __init__(self) -> None:
+        """Initialize empty buckets and slots."""
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._slots: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def take(self, key: str, cost: float, rate: float, burst: float) -> float:
+        """Spend cost tokens; returns 0 when allowed, else seconds until it would be."""
+        now = time.monotonic()
+        with self._lock:
+            if len(self._buckets) > 100_000:
+                # Buckets idle long enough to refill are full anyway; forgetting them changes nothing
+                self._buckets = {k: v for k, v in self._buckets.items() if now - v[1] < burst / rate}
+            tokens, updated = self._buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            if tokens >= cost:
+                self._buckets[key] = (tokens - cost, now)
+                return 0.0
+            self._buckets[key] = (tokens, now)
+            return (cost - tokens) / rate
+
+    def acquire(self, key: str, limit: int, ttl: float) -> Optional[str]:
+        """Take a concurrency slot; returns a holder id, or None when all slots are busy."""
+        now = time.monotonic()
+        with self._lock:
+            holders = {h: exp for h, exp in self._slots.get(key, {}).items() if exp > now}
+            if len(holders) >= limit:
+                self._slots[key] = holders
+                return None
+            holder = uuid.uuid4().hex
+            holders[holder] = now + ttl
+            self._slots[key] = holders
+            return holder
+
+    def release(self, key: str, holder: str) -> None:
+        """Give a slot back."""
+        with self._lock:
+            self._slots.get(key, {}).pop(holder, None)
+
+class SqliteLimiterBackend:
+    """
+    Single-host state shared by every gunicorn worker.
+
+    Buckets and slots live in one SQLite file (by default on /dev/shm);
+    each decision is a short IMMEDIATE transaction. Slots expire after ttl
+    so a crashed worker cannot leak them.
+    """
+
+    def __init__(self, path: str) -> None:
+        """Initialize the store at path."""
+        self.path = path
+        self._local = threading.local()
+        self._takes = 0
+        conn = self._conn()
+        conn.execute("CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL, updated REAL)")
+        conn.execute("CREATE TABLE IF NOT EXISTS slots (key TEXT, holder TEXT, expires REAL, PRIMARY KEY (key, holder))")
+
+    def _conn(self) -> sqlite3.Connection:
+        # Connections are neither fork- nor thread-safe; keep one per thread per process
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=2, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def take(self, key: str, cost: float, rate: float, burst: float) -> float:
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+            tokens = burst if row is None else min(burst, row[0] + (now - row[1]) * rate)
+            wait = 0.0 if tokens >= cost else (cost - tokens) / rate
+            if wait == 0.0:
+                tokens -= cost
+            conn.execute("INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)", (key, tokens, now))
+            self._takes += 1
+            if self._takes % 1000 == 0:
+                # Buckets idle long enough to refill are full anyway
+                conn.execute("DELETE FROM buckets WHERE updated < ?", (now - burst / rate,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return wait
+
+    def acquire(self, key: str, limit: int, ttl: float) -> Optional[str]:
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM slots WHERE key = ? AND expires < ?", (key, now))
+            busy = conn.execute("SELECT COUNT(*) FROM slots WHERE key = ?", (key,)).fetchone()[0]
+            holder = None
+            if busy < limit:
+                holder = uuid.uuid4().hex
+                conn.execute("INSERT INTO slots (key, holder, expires) VALUES (?, ?, ?)", (key, holder, now + ttl))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return holder
+
+    def release(self, key: str, holder: str) -> None:
+        self._conn().execute("DELETE FROM slots WHERE key = ? AND holder = ?", (key, holder))
+
+class RedisLimiterBackend:
+    """Network backend for multi-host deployments (requires the optional `redis` package)."""
+
+    TAKE = """
+    local tokens = tonumber(redis.call('HGET', KEYS[1], 't') or ARGV[3])
+    local updated = tonumber(redis.call('HGET', KEYS[1], 'u') or ARGV[4])
+    tokens = math.min(tonumber(ARGV[3]), tokens + (tonumber(ARGV[4]) - updated) * tonumber(ARGV[2]))
+    local wait = 0
+    if tokens >= tonumber(ARGV[1]) then tokens = tokens - tonumber(ARGV[1]) else wait = (tonumber(ARGV[1]) - tokens) / tonumber(ARGV[2]) end
+    redis.call('HSET', KEYS[1], 't', tokens, 'u', ARGV[4])
+    redis.call('EXPIRE', KEYS[1], math.ceil(tonumber(ARGV[3]) / tonumber(ARGV[2])) + 1)
+    return tostring(wait)
+    """
+    ACQUIRE = """
+    redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+    if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[2]) then return 0 end
+    redis.call('ZADD', KEYS[1], ARGV[1] + ARGV[3], ARGV[4])
+    redis.call('EXPIRE', KEYS[1], math.ceil(tonumber(ARGV[3])) + 1)
+    return 1
+    """
+
+    def __init__(self, url: str, prefix: str = "state_manager:admission:") -> None:
+        """Connect lazily to the Redis server at url."""
+        import redis
+        self._client = redis.Redis.from_url(url)
+        self._take = self._client.register_script(self.TAKE)
+        self._acquire = self._client.register_script(self.ACQUIRE)
+        self.prefix = prefix
+
+    def take(self, key: str, cost: float, rate: float, burst: float) -> float:
+        return float(self._take(keys=[self.prefix + "bucket:" + key], args=[cost, rate, burst, time.time()]))
+
+    def acquire(self, key: str, limit: int, ttl: float) -> Optional[str]:
+        holder = uuid.uuid4().hex
+        return holder if self._acquire(keys=[self.prefix + "slots:" + key], args=[time.time(), limit, ttl, holder]) else None
+
+    def release(self, key: str, holder: str) -> None:
+        self._client.zrem(self.prefix + "slots:" + key, holder)
+
+class AdmissionController:
+    """
+    Per-request admission decision.
+
+    Every request spends its route cost from two token buckets, one per
+    client IP and one per authenticated uid (so neither a NAT nor a single
+    account can starve the others). Expensive routes additionally hold a
+    concurrency slot for their duration. Rejections are immediate: 429 with
+    Retry-After when a bucket is empty, 503 when a route is at capacity.
+    Backend failures admit the request (fail open).
+    """
+
+    def __init__(self, backend: Any, ip_rate: float = 10.0, ip_burst: float = 60.0, uid_rate: float = 20.0, uid_burst: float = 120.0, slot_ttl: float = 60.0, costs: Optional[Dict[str, float]] = None, caps: Optional[Dict[str, int]] = None) -> None:
+        """Initialize with a backend and limits (tokens per second, bucket size)."""
+        self.backend = backend
+        self.ip_rate, self.ip_burst = ip_rate, ip_burst
+        self.uid_rate, self.uid_burst = uid_rate, uid_burst
+        self.slot_ttl = slot_ttl
+        self.costs = costs if costs is not None else ROUTE_COSTS
+        self.caps = caps if caps is not None else CONCURRENCY_CAPS
+        self.rejected: Dict[str, int] = {"rate_limited": 0, "overloaded": 0}
+
+    def cost(self, endpoint: Optional[str]) -> float:
+        """Token cost of an endpoint."""
+        return self.costs.get(endpoint or "", DEFAULT_COST)
+
+    def admit(self, endpoint: Optional[str], ip: str, identify: Optional[Callable[[], Optional[str]]] = None, method: str = "GET") -> Tuple[Optional[Dict[str, Any]], Optional[Tuple[str, str]]]:
+        """
+        Decide on a request.
+
+        identify() returns the caller's uid (or None). It is only called
+        after the IP bucket admitted the request, so a flood of forged
+        tokens is turned away before any of them is verified.
+
+        Returns:
+            tuple: (rejection or None, slot to release after the request or None).
+                A rejection is {"status", "error", "retry_after"}.
+        """
+        cost = self.cost(endpoint)
+        if cost <= 0 or method in EXEMPT_METHODS:
+            return None, None
+        try:
+            wait = self.backend.take(f"ip:{ip}", cost, self.ip_rate, self.ip_burst)
+            uid = identify() if not wait and identify is not None else None
+            if uid:
+                wait = self.backend.take(f"uid:{uid}", cost, self.uid_rate, self.uid_burst)
+            if wait:
+                self.rejected["rate_limited"] += 1
+                return {"status": 429, "error": "Too many requests", "retry_after": max(1, int(wait + 0.999))}, None
+
+            cap = self.caps.get(endpoint or "")
+            if cap:
+                holder = self.backend.acquire(f"route:{endpoint}", cap, self.slot_ttl)
+                if holder is None:
+                    self.rejected["overloaded"] += 1
+                    return {"status": 503, "error": "Server busy, try again shortly", "retry_after": 1}, None
+                return None, (f"route:{endpoint}", holder)
+        except Exception as e:
+            print(f"[ERROR_ADMISSION] Backend failed, admitting request: {e}")
+        return None, None
+
+    def release(self, slot: Optional[Tuple[str, str]]) -> None:
+        """Release a concurrency slot returned by admit()."""
+        if slot is None:
+            return
+        try:
+            self.backend.release(*slot)
+        except Exception as e:
+            print(f"[ERROR_ADMISSION] Failed to release slot: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Rejection counters for this worker."""
+        return {"backend": type(self.backend).__name__, **self.rejected}
+
+def create_admission_controller() -> Optional[AdmissionController]:
+    """Build the controller selected by ADMISSION_BACKEND (memory | shm | redis | off)."""
+    kind = os.environ.get("ADMISSION_BACKEND", "memory").strip().lower()
+    if kind == "off":
+        return None
+    if kind == "redis":
+        backend: Any = RedisLimiterBackend(os.environ.get("ADMISSION_URL") or os.environ.get("CACHE_URL", "redis://localhost:6379/0"))
+    elif kind == "shm":
+        default_dir = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+        backend = SqliteLimiterBackend(os.environ.get("ADMISSION_URL", os.path.join(default_dir, "state_manager_admission.db")))
+    else:
+        backend = MemoryLimiterBackend()
+    return AdmissionController(
+        backend,
+        ip_rate=float(os.environ.get("RATE_LIMIT_IP_PER_SEC", "10")),
+        ip_burst=float(os.environ.get("RATE_LIMIT_IP_BURST", "60")),
+        uid_rate=float(os.environ.get("RATE_LIMIT_UID_PER_SEC", "20")),
+        uid_burst=float(os.environ.get("RATE_LIMIT_UID_BURST", "120")),
+    )
@@ -0,0 +1,160 @@
+"""
+    file: blobstore.py
+    brief: Blob storage for image payloads kept out of Firestore documents
+"""
+# Standard library imports
+import os
+from pathlib import Path
+from urllib.parse import unquote
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+# Local imports
+from api.utils.images import content_hash, decode_inline_image
+
+def sniff_content_type(data: bytes) -> Tuple[str, str]:
+    """Guess (mime, extension) from magic bytes; the frontend only produces JPEG."""
+    if data[:8] == b"\x89PNG\r\n\x1a\n":
+        return "image/png", "png"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp", "webp"
+    if data[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif", "gif"
+    return "image/jpeg", "jpg"
+
+class BucketBlobStore:
+    """Blob store backed by the Firebase Storage bucket."""
+
+    def __init__(self, bucket_factory: Callable[[], Any]) -> None:
+        """Initialize with a callable returning the bucket (resolved lazily)."""
+        self.bucket_factory = bucket_factory
+
+    def put(self, key: str, data: bytes, content_type: str) -> str:
+        """Store data under key (no-op if present) and return its public URL."""
+        blob = self.bucket_factory().blob(key)
+        if not blob.exists():
+            blob.cache_control = "public, max-age=31536000, immutable"
+            blob.upload_from_string(data, content_type=content_type)
+            blob.make_public()
+        return blob.public_url
+
+    def get(self, key: str) -> Optional[Tuple[bytes, str]]:
+        """Return (data, content_type) or None."""
+        blob = self.bucket_factory().blob(key)
+        if not blob.exists():
+            return None
+        blob.reload()
+        return blob.download_as_bytes(), blob.content_type or "application/octet-stream"
+
+    def delete(self, key: str) -> None:
+        """Delete a blob if it exists."""
+        blob = self.bucket_factory().blob(key)
+        if blob.exists():
+            blob.delete()
+
+    def key_for_url(self, url: Any) -> Optional[str]:
+        """Key of a blob given its public URL, or None if it is not in this bucket."""
+        if not isinstance(url, str):
+            return None
+        base = f"https://storage.googleapis.com/{self.bucket_factory().name}/"
+        return unquote(url[len(base):]) if url.startswith(base) else None
+
+    def list(self, prefix: str) -> Iterator[Tuple[str, float]]:
+        """Yield (key, last modified timestamp) for blobs under prefix."""
+        for blob in self.bucket_factory().list_blobs(prefix=prefix):
+            yield blob.name, blob.updated.timestamp() if blob.updated else 0.0
+
+class LocalBlobStore:
+    """Filesystem stand-in for the bucket, served through /api/blobs/<key>."""
+
+    def __init__(self, root: Path, base_url: str) -> None:
+        """Initialize with a storage directory and the public URL prefix."""
+        self.root = Path(root)
+        self.base_url = base_url.rstrip("/")
+
+    def _path(self, key: str) -> Path:
+        path = (self.root / key).resolve()
+        if self.root.resolve() not in path.parents:
+            raise ValueError(f"Invalid blob key: {key}")
+        return path
+
+    def put(self, key: str, data: bytes, content_type: str) -> str:
+        """Store data under key (no-op if present) and return its URL."""
+        path = self._path(key)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(path.suffix + ".tmp")
+            tmp.write_bytes(data)
+            os.replace(tmp, path)
+        return f"{self.base_url}/{key}"
+
+    def get(self, key: str) -> Optional[Tuple[bytes, str]]:
+        """Return (data, content_type) or None."""
+        path = self._path(key)
+        if not path.is_file():
+            return None
+        data = path.read_bytes()
+        return data, sniff_content_type(data)[0]
+
+    def delete(self, key: str) -> None:
+        """Delete a blob if it exists."""
+        path = self._path(key)
+        if path.is_file():
+            path.unlink()
+
+    def key_for_url(self, url: Any) -> Optional[str]:
+        """Key of a blob given its URL, or None if it is not served by this store."""
+        if not isinstance(url, str) or not url.startswith(self.base_url + "/"):
+            return None
+        return unquote(url[len(self.base_url) + 1:])
+
+    def list(self, prefix: str) -> Iterator[Tuple[str, float]]:
+        """Yield (key, last modified timestamp) for blobs under prefix."""
+        base = self._path(prefix) if prefix else self.root.resolve()
+        if not base.is_dir():
+            return
+        root = self.root.resolve()
+        for path in base.rglob("*"):
+            if path.is_file() and not path.name.endswith(".tmp"):
+                yield path.relative_to(root).as_posix(), path.stat().st_mtime
+
+def create_blob_store(bucket_factory: Callable[[], Any]) -> Any:
+    """Build the blob store selected by BLOB_STORE (bucket | local)."""
+    kind = os.environ.get("BLOB_STORE", "bucket").strip().lower()
+    if kind == "local":
+        root = Path(os.environ.get("BLOB_STORE_PATH", Path(__file__).parent.parent / "data" / "blobs"))
+        api_url = os.environ.get("API_URL", "http://localhost:5000").rstrip("/")
+        if not api_url.endswith("/api"):
+            api_url = f"{api_url}/api"
+        return LocalBlobStore(root, f"{api_url}/blobs")
+    return BucketBlobStore(bucket_factory)
+
+def store_inline_image(value: Any, store: Any, prefix: str) -> Optional[Dict[str, str]]:
+    """
+    Store an inline image under a content-hash key.
+
+    Returns:
+        dict: {"url", "key", "version"} or None if value is not an inline image.
+    """
+    raw = decode_inline_image(value)
+    if raw is None:
+        return None
+    content_type, ext = sniff_content_type(raw)
+    version = content_hash(raw)
+    key = f"{prefix}/{version}.{ext}"
+    return {"url": store.put(key, raw, content_type), "key": key, "version": version}
+
+def externalize_image(value: Any, store: Any, prefix: str) -> Tuple[Any, int]:
+    """
+    Move an inline image into the blob store.
+
+    Keys are content hashes, so repeating the call for the same image is a
+    no-op that returns the same URL. Values that are already references are
+    returned unchanged.
+
+    Returns:
+        tuple: (reference, bytes saved in the document)
+    """
+    stored = store_inline_image(value, store, prefix)
+    if stored is None:
+        return value, 0
+    return stored["url"], max(len(value) - len(stored["url"]), 0)
@@ -0,0 +1,305 @@
+"""
+    file: cache.py
+    brief: In-process LRU and the cross-worker shared cache tier
+"""
+# Standard library imports
+import os
+import time
+import pickle
+import sqlite3
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+class LRUCache:
+    """Thread-safe LRU cache bounded by entry count and total size."""
+
+    def __init__(self, max_entries: int = 1024, max_bytes: Optional[int] = None, sizeof: Callable[[Any], int] = len) -> None:
+        """Initialize an empty cache."""
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._sizes: dict = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return a cached value and mark it as recently used."""
+        with self._lock:
+            if key not in self._data:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Insert a value, evicting least recently used entries as needed."""
+        size = self.sizeof(value) if self.max_bytes is not None else 0
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._data:
+                self._bytes -= self._sizes.pop(key, 0)
+                del self._data[key]
+            self._data[key] = value
+            self._sizes[key] = size
+            self._bytes += size
+            while len(self._data) > self.max_entries or (self.max_bytes is not None and self._bytes > self.max_bytes):
+                old_key, _ = self._data.popitem(last=False)
+                self._bytes -= self._sizes.pop(old_key, 0)
+
+    def pop(self, key: Hashable) -> None:
+        """Remove a key if present."""
+        with self._lock:
+            if key in self._data:
+                del self._data[key]
+                self._bytes -= self._sizes.pop(key, 0)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+class MemoryBackend:
+    """Per-process backend; also the local stand-in for shared backends in tests."""
+
+    def __init__(self, max_bytes: int) -> None:
+        """Initialize with a total size bound."""
+        self._lru = LRUCache(max_entries=1 << 20, max_bytes=max_bytes, sizeof=lambda v: len(v[1]))
+        self._counters: dict = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        entry = self._lru.get(key)
+        if entry is None:
+            return None
+        expires, value = entry
+        if expires is not None and expires < time.time():
+            self._lru.pop(key)
+            return None
+        return value
+
+    def set(self, key: str, value: bytes, ttl: Optional[float]) -> None:
+        self._lru.set(key, (time.time() + ttl if ttl else None, value))
+
+    def delete(self, key: str) -> None:
+        self._lru.pop(key)
+
+    def counter(self, name: str) -> int:
+        return self._counters.get(name, 0)
+
+    def incr(self, name: str) -> int:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + 1
+            return self._counters[name]
+
+class SqliteBackend:
+    """
+    Single-host backend shared by every gunicorn worker.
+
+    Entries live in one SQLite file (by default on /dev/shm) read through
+    mmap, so a value warmed by one worker is a hit for all of them.
+    """
+
+    def __init__(self, path: str, max_bytes: int) -> None:
+        """Initialize the store at path, bounded to roughly max_bytes."""
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._sets = 0
+        with self._conn() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value BLOB, size INTEGER, expires REAL, accessed REAL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+            conn.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER)")
+
+    def _conn(self) -> sqlite3.Connection:
+        # Connections are neither fork- nor thread-safe; keep one per thread per process
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            conn.execute(f"PRAGMA mmap_size={self.max_bytes * 2}")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key: str) -> Optional[bytes]:
+        now = time.time()
+        conn = self._conn()
+        row = conn.execute("SELECT value, expires, accessed FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        value, expires, accessed = row
+        if expires is not None and expires < now:
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            return None
+        # Approximate LRU: only touch the row when it has not been touched for a while
+        if now - accessed > 1.0:
+            conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+        return value
+
+    def set(self, key: str, value: bytes, ttl: Optional[float]) -> None:
+        now = time.time()
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO entries (key, value, size, expires, accessed) VALUES (?, ?, ?, ?, ?)",
+            (key, sqlite3.Binary(value), len(value), now + ttl if ttl else None, now)
+        )
+        self._sets += 1
+        if self._sets % 32 == 0:
+            self._evict(conn)
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        """Drop expired entries, then least recently used ones until under max_bytes."""
+        conn.execute("DELETE FROM entries WHERE expires IS NOT NULL AND expires < ?", (time.time(),))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - int(self.max_bytes * 0.9)
+        freed = 0
+        victims = []
+        for key, size in conn.execute("SELECT key, size FROM entries ORDER BY accessed"):
+            victims.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        conn.executemany("DELETE FROM entries WHERE key = ?", victims)
+
+    def delete(self, key: str) -> None:
+        self._conn().execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def counter(self, name: str) -> int:
+        row = self._conn().execute("SELECT value FROM counters WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else 0
+
+    def incr(self, name: str) -> int:
+        conn = self._conn()
+        conn.execute("INSERT INTO counters (name, value) VALUES (?, 1) ON CONFLICT(name) DO UPDATE SET value = value + 1", (name,))
+        return self.counter(name)
+
+class RedisBackend:
+    """Network backend for multi-host deployments (requires the optional `redis` package)."""
+
+    def __init__(self, url: str, prefix: str = "state_manager:") -> None:
+        """Connect lazily to the Redis server at url."""
+        import redis
+        self._client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self._client.get(self.prefix + key)
+
+    def set(self, key: str, value: bytes, ttl: Optional[float]) -> None:
+        # Size bound is the server's maxmemory / allkeys-lru policy
+        self._client.set(self.prefix + key, value, px=int(ttl * 1000) if ttl else None)
+
+    def delete(self, key: str) -> None:
+        self._client.delete(self.prefix + key)
+
+    def counter(self, name: str) -> int:
+        return int(self._client.get(self.prefix + "counter:" + name) or 0)
+
+    def incr(self, name: str) -> int:
+        return int(self._client.incr(self.prefix + "counter:" + name))
+
+class SharedCache:
+    """
+    Namespaced, versioned cache over a pluggable backend.
+
+    Keys embed their namespace's version, so `invalidate(namespace)` makes
+    every older entry unreachable in all workers at once; stale entries then
+    age out through the backend's eviction. Values are pickled, so hits hand
+    back ready Python objects (or raw bytes) without re-parsing JSON.
+    """
+
+    def __init__(self, backend: Any, default_ttl: Optional[float] = 300.0) -> None:
+        """Initialize over a backend (MemoryBackend, SqliteBackend or RedisBackend)."""
+        self.backend = backend
+        self.default_ttl = default_ttl
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def shared(self) -> bool:
+        """Whether writes and invalidations are seen by every worker."""
+        return not isinstance(self.backend, MemoryBackend)
+
+    def _key(self, namespace: str, key: str, version: Optional[int] = None) -> str:
+        if version is None:
+            version = self.backend.counter(namespace)
+        return f"{namespace}:{version}:{key}"
+
+    def _version(self, namespace: str) -> Optional[int]:
+        try:
+            return self.backend.counter(namespace)
+        except Exception as e:
+            print(f"[ERROR_CACHE] version read failed: {e}")
+            return None
+
+    def get(self, namespace: str, key: str, default: Any = None, version: Optional[int] = None) -> Any:
+        """Return a cached value or default."""
+        try:
+            raw = self.backend.get(self._key(namespace, key, version))
+        except Exception as e:
+            print(f"[ERROR_CACHE] get failed: {e}")
+            raw = None
+        if raw is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return pickle.loads(raw)
+
+    def set(self, namespace: str, key: str, value: Any, ttl: Optional[float] = None, version: Optional[int] = None) -> None:
+        """Store a value (ttl defaults to default_ttl)."""
+        try:
+            self.backend.set(self._key(namespace, key, version), pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), ttl or self.default_ttl)
+        except Exception as e:
+            print(f"[ERROR_CACHE] set failed: {e}")
+
+    def get_or_set(self, namespace: str, key: str, factory: Callable[[], Any], ttl: Optional[float] = None) -> Any:
+        """
+        Return the cached value, computing and storing it on a miss.
+
+        The namespace version is read once, before factory() runs, and the
+        result is stored under that version: if an invalidation lands while
+        the factory is running, the possibly stale result is unreachable.
+        """
+        version = self._version(namespace)
+        if version is None:
+            return factory()
+        value = self.get(namespace, key, _MISSING, version=version)
+        if value is _MISSING:
+            value = factory()
+            self.set(namespace, key, value, ttl, version=version)
+        return value
+
+    def invalidate(self, namespace: str) -> None:
+        """Bump the namespace version so every existing entry becomes unreachable."""
+        try:
+            self.backend.incr(namespace)
+        except Exception as e:
+            print(f"[ERROR_CACHE] invalidate failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for this worker."""
+        return {"backend": type(self.backend).__name__, "hits": self.hits, "misses": self.misses}
+
+_MISSING = object()
+
+def create_shared_cache() -> SharedCache:
+    """Build the cache selected by CACHE_BACKEND (memory | shm | redis)."""
+    kind = os.environ.get("CACHE_BACKEND", "memory").strip().lower()
+    max_bytes = int(os.environ.get("CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+    ttl = float(os.environ.get("CACHE_DEFAULT_TTL", "300"))
+    if kind == "redis":
+        backend: Any = RedisBackend(os.environ.get("CACHE_URL", "redis://localhost:6379/0"))
+    elif kind == "shm":
+        default_dir = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+        backend = SqliteBackend(os.environ.get("CACHE_URL", os.path.join(default_dir, "state_manager_cache.db")), max_bytes)
+    else:
+        backend = MemoryBackend(max_bytes)
+    return SharedCache(backend, default_ttl=ttl)
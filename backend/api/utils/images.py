@@ -0,0 +1,218 @@
+"""
+    file: images.py
+    brief: Server-side image pipeline producing multi-resolution variants
+"""
+# Standard library imports
+import io
+import os
+import re
+import gzip
+import json
+import base64
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Bounding boxes (width, height) per variant, smallest first
+VARIANTS: Dict[str, Tuple[int, int]] = {
+    "thumbnail": (320, 240),
+    "card": (640, 480),
+    "detail": (1280, 960),
+    "full": (1920, 1080),
+}
+
+FORMATS: Dict[str, Dict[str, Any]] = {
+    "avif": {"pil": "AVIF", "mime": "image/avif", "options": {"quality": 60}},
+    "webp": {"pil": "WEBP", "mime": "image/webp", "options": {"quality": 80, "method": 4}},
+    "jpeg": {"pil": "JPEG", "mime": "image/jpeg", "options": {"quality": 82, "optimize": True, "progressive": True}},
+}
+
+# Variant files are stored as <prefix>/<source hash>/<variant>-<file hash>.<ext>
+VARIANT_KEY = re.compile(r"^(?P<dir>.+/[0-9a-f]{32})/[a-z]+-[0-9a-f]{12}\.(?:avif|webp|jpg)$")
+MANIFEST_NAME = "manifest.json"
+
+def available_formats() -> List[str]:
+    """Output formats supported by the installed Pillow build."""
+    # Pillow is imported on first use to keep it off the service's import path
+    from PIL import features
+    formats = ["webp", "jpeg"]
+    try:
+        if features.check("avif"):
+            formats.insert(0, "avif")
+    except Exception:
+        pass
+    return formats
+
+def content_hash(data: bytes) -> str:
+    """Short content hash used for storage paths and cache keys."""
+    return hashlib.sha256(data).hexdigest()[:32]
+
+def decode_inline_image(value: str) -> Optional[bytes]:
+    """
+    Decode an inline image as produced by the frontend (gzipped base64) or a data URL.
+
+    Returns None for values that are not inline images (e.g. http URLs).
+    """
+    if not isinstance(value, str) or not value or value.startswith(("http://", "https://", "profile:")):
+        return None
+    if value.startswith("data:"):
+        try:
+            return base64.b64decode(value.split(",", 1)[1])
+        except Exception:
+            return None
+    try:
+        raw = base64.b64decode(value, validate=True)
+    except Exception:
+        return None
+    if raw[:2] == b"\x1f\x8b":
+        try:
+            return gzip.decompress(raw)
+        except Exception:
+            return None
+    return raw
+
+def build_variants(raw: bytes, formats: Optional[List[str]] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Resize an image into every variant and encode it in every format.
+
+    Runs inside the process pool, so it only takes and returns plain data.
+    Metadata (EXIF, ICC, XMP) is dropped: the image info is cleared before
+    encoding, since some encoders (AVIF) otherwise copy the ICC profile over.
+
+    Returns:
+        dict: {variant: {"width", "height", "files": {fmt: bytes}}}
+    """
+    from PIL import Image, ImageOps
+    formats = formats or available_formats()
+    with Image.open(io.BytesIO(raw)) as img:
+        img = ImageOps.exif_transpose(img)
+        img = img.convert("RGBA" if img.mode in ("RGBA", "LA", "P") else "RGB")
+        if img.mode == "RGBA":
+            background = Image.new("RGB", img.size, (255, 255, 255))
+            background.paste(img, mask=img.split()[-1])
+            img = background
+        img.info = {}
+
+        result: Dict[str, Dict[str, Any]] = {}
+        for name, box in VARIANTS.items():
+            variant = img.copy()
+            variant.thumbnail(box, Image.LANCZOS)
+            files = {}
+            for fmt in formats:
+                spec = FORMATS[fmt]
+                out = io.BytesIO()
+                variant.save(out, spec["pil"], **spec["options"])
+                files[fmt] = out.getvalue()
+            result[name] = {"width": variant.width, "height": variant.height, "files": files}
+        return result
+
+def pick_variant(manifest: Dict[str, Any], variant: str = "card", fmt: str = "webp") -> Optional[str]:
+    """Return the URL of the smallest stored variant at least as large as `variant`."""
+    variants = (manifest or {}).get("variants") or {}
+    names = list(VARIANTS)
+    start = names.index(variant) if variant in names else 0
+    for name in names[start:]:
+        urls = variants.get(name, {}).get("urls", {})
+        if fmt in urls:
+            return urls[fmt]
+        if urls:
+            return urls.get("jpeg") or next(iter(urls.values()))
+    return None
+
+class ImagePipeline:
+    """Runs build_variants in a process pool and stores results in a bucket."""
+
+    def __init__(self, bucket_factory: Any, max_workers: Optional[int] = None, prefix: str = "images") -> None:
+        """Initialize the pipeline (pool and bucket are created lazily)."""
+        self.bucket_factory = bucket_factory
+        self.max_workers = max_workers or int(os.environ.get("IMAGE_PIPELINE_WORKERS", "2"))
+        self.prefix = prefix
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_pid: Optional[int] = None
+
+    @property
+    def pool(self) -> ProcessPoolExecutor:
+        """Process pool, recreated after fork so each worker owns its own."""
+        if self._pool is None or self._pool_pid != os.getpid():
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+            self._pool_pid = os.getpid()
+        return self._pool
+
+    def _store(self, source_hash: str, built: Dict[str, Dict[str, Any]], prefix: Optional[str] = None) -> Dict[str, Any]:
+        """Upload variant files under content-hashed paths and return the manifest."""
+        bucket = self.bucket_factory()
+        variants = {}
+        for name, info in built.items():
+            urls = {}
+            for fmt, data in info["files"].items():
+                path = f"{prefix or self.prefix}/{source_hash}/{name}-{content_hash(data)[:12]}.{'jpg' if fmt == 'jpeg' else fmt}"
+                blob = bucket.blob(path)
+                if not blob.exists():
+                    blob.cache_control = "public, max-age=31536000, immutable"
+                    blob.upload_from_string(data, content_type=FORMATS[fmt]["mime"])
+                    blob.make_public()
+                urls[fmt] = blob.public_url
+            variants[name] = {"width": info["width"], "height": info["height"], "urls": urls}
+        manifest = {"source": source_hash, "variants": variants}
+        # Lets a variant URL submitted as a listing image be matched back to its set
+        blob = bucket.blob(f"{prefix or self.prefix}/{source_hash}/{MANIFEST_NAME}")
+        if not blob.exists():
+            blob.upload_from_string(json.dumps(manifest), content_type="application/json")
+        return manifest
+
+    def stored_manifest(self, key: str) -> Optional[Dict[str, Any]]:
+        """Manifest of the variant set a stored variant file (bucket key) belongs to, or None."""
+        match = VARIANT_KEY.match(key or "")
+        if not match:
+            return None
+        blob = self.bucket_factory().blob(f"{match.group('dir')}/{MANIFEST_NAME}")
+        if not blob.exists():
+            return None
+        return json.loads(blob.download_as_bytes())
+
+    def process(self, raw: bytes, prefix: Optional[str] = None) -> Dict[str, Any]:
+        """Process a single image synchronously (work still runs in the pool)."""
+        return self.process_many([raw], prefix)[0]
+
+    def process_many(self, raws: List[bytes], prefix: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Process several images in parallel; result order matches input."""
+        futures = [self.pool.submit(build_variants, raw) for raw in raws]
+        return [self._store(content_hash(raw), future.result(), prefix) for raw, future in zip(raws, futures)]
+
+    def process_images(self, images: List[str], existing: Optional[List[Dict[str, Any]]] = None, existing_images: Optional[List[str]] = None, loader: Optional[Callable[[str], Optional[bytes]]] = None, prefix: Optional[str] = None, lookup: Optional[Callable[[str], Optional[Dict[str, Any]]]] = None) -> List[Optional[Dict[str, Any]]]:
+        """
+        Build a manifest per entry of an announcement's `images` list.
+
+        Manifests already present in `existing` are reused, matched by source
+        hash for inline images or by value (parallel `existing_images`) for
+        references, so unchanged images are never reprocessed. References
+        that are themselves variants (e.g. /api/upload results) get their
+        stored manifest through `lookup`. Other references are fetched
+        through `loader` when given; entries that cannot be decoded get None.
+        """
+        existing = existing or []
+        known = {m["source"]: m for m in existing if isinstance(m, dict) and m.get("source")}
+        by_value = {img: m for img, m in zip(existing_images or [], existing) if m}
+        manifests: List[Optional[Dict[str, Any]]] = [None] * len(images)
+        pending: List[Tuple[int, bytes]] = []
+        for i, value in enumerate(images):
+            raw = decode_inline_image(value)
+            if raw is None:
+                manifests[i] = by_value.get(value)
+                if manifests[i] is None and lookup is not None:
+                    manifests[i] = lookup(value)
+                if manifests[i] is not None or loader is None:
+                    continue
+                raw = loader(value)
+                if raw is None:
+                    continue
+            source_hash = content_hash(raw)
+            if source_hash in known:
+                manifests[i] = known[source_hash]
+            else:
+                pending.append((i, raw))
+
+        if pending:
+            for (i, _), manifest in zip(pending, self.process_many([raw for _, raw in pending], prefix)):
+                manifests[i] = manifest
+        return manifests
@@ -0,0 +1,107 @@
+"""
+    file: startup.py
+    brief: Lazy initialization of heavy clients and cold-start timing
+"""
+# Standard library imports
+import os
+import time
+import importlib
+import threading
+from typing import Any, Callable, Dict, Iterable, Optional
+
+# Process-relative clock; service.py marks phases against it
+STARTED_AT = time.perf_counter()
+_phases: Dict[str, float] = {}
+_registry: Dict[str, "Lazy"] = {}
+
+class Lazy:
+    """
+    Thread-safe, initialize-once proxy for an expensive object.
+
+    Attribute access is forwarded to the underlying object, so a Lazy can be
+    used in place of a module-level client (`manager.get_announcement(...)`)
+    without changing call sites. Initialization time is recorded for the
+    startup report.
+    """
+
+    def __init__(self, name: str, factory: Callable[[], Any], requires: Iterable["Lazy"] = ()) -> None:
+        """Register a lazily built object under name."""
+        self._name = name
+        self._factory = factory
+        self._requires = list(requires)
+        self._value: Any = None
+        self._ready = False
+        self._init_ms: Optional[float] = None
+        self._lock = threading.Lock()
+        _registry[name] = self
+
+    def get(self) -> Any:
+        """Build the object on first use and return it."""
+        if self._ready:
+            return self._value
+        for dependency in self._requires:
+            dependency.get()
+        with self._lock:
+            if not self._ready:
+                start = time.perf_counter()
+                self._value = self._factory()
+                self._init_ms = (time.perf_counter() - start) * 1000
+                self._ready = True
+        return self._value
+
+    @property
+    def initialized(self) -> bool:
+        """Whether the factory has run."""
+        return self._ready
+
+    def __getattr__(self, item: str) -> Any:
+        return getattr(self.get(), item)
+
+    def __repr__(self) -> str:
+        return f"<Lazy {self._name} {'ready' if self._ready else 'pending'}>"
+
+def lazy_module(name: str) -> Lazy:
+    """Defer importing a heavy module until one of its attributes is used."""
+    if name in _registry:
+        return _registry[name]
+    return Lazy(name, lambda: importlib.import_module(name))
+
+def begin(started_at: float) -> None:
+    """Reset the startup clock to an earlier perf_counter() reading."""
+    global STARTED_AT
+    STARTED_AT = started_at
+
+def mark(phase: str) -> None:
+    """Record milliseconds since process import start for a startup phase (first mark wins)."""
+    _phases.setdefault(phase, (time.perf_counter() - STARTED_AT) * 1000)
+
+def warm(names: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """Initialize registered objects (all, or the given names) and return the report."""
+    for name, lazy in list(_registry.items()):
+        if names is None or name in names:
+            try:
+                lazy.get()
+            except Exception as e:
+                print(f"[ERROR_STARTUP] Warmup of {name} failed: {e}")
+    mark("warm")
+    return report()
+
+def report() -> Dict[str, Any]:
+    """Startup phases, lazy initialization costs and the import budget verdict."""
+    budget = float(os.environ.get("STARTUP_BUDGET_MS", "500"))
+    imports_ms = _phases.get("imports")
+    return {
+        "phases_ms": {k: round(v, 1) for k, v in _phases.items()},
+        "lazy": {
+            name: {"initialized": lazy.initialized, "init_ms": round(lazy._init_ms, 1) if lazy._init_ms is not None else None}
+            for name, lazy in _registry.items()
+        },
+        "budget_ms": budget,
+        "within_budget": imports_ms is None or imports_ms <= budget
+    }
+
+def check_budget() -> None:
+    """Warn when module import took longer than STARTUP_BUDGET_MS."""
+    result = report()
+    if not result["within_budget"]:
+        print(f"Warning: startup imports took {result['phases_ms']['imports']}ms (budget {result['budget_ms']}ms)")
@@ -0,0 +1,192 @@
+"""
+    file: tasks.py
+    brief: Durable background task queue (SQLite-backed) with retry and backoff
+"""
+# Standard library imports
+import os
+import json
+import time
+import random
+import sqlite3
+import tempfile
+import threading
+import traceback
+from typing import Any, Callable, Dict, Optional
+
+class TaskQueue:
+    """
+    Durable task queue shared by all workers on a host.
+
+    Tasks are rows in a SQLite file. Each gunicorn worker runs its own
+    consumer threads (started lazily after fork); claims are atomic, and a
+    claimed task carries a lease, so a task whose worker died is picked up
+    again once the lease expires. Failures are retried with exponential
+    backoff until max_attempts, after which the task is kept as "failed".
+    """
+
+    def __init__(self, path: str, lease_seconds: float = 300.0, poll_interval: float = 1.0, base_delay: float = 2.0, max_delay: float = 600.0) -> None:
+        """Configure the queue at path (the file is created on first use)."""
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.handlers: Dict[str, Callable[[Dict[str, Any]], None]] = {}
+        self._local = threading.local()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._worker_pid: Optional[int] = None
+        self._worker_lock = threading.Lock()
+
+    @staticmethod
+    def _create_schema(conn: sqlite3.Connection) -> None:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS tasks (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                max_attempts INTEGER NOT NULL DEFAULT 5,
+                run_at REAL NOT NULL,
+                locked_until REAL,
+                last_error TEXT,
+                created_at REAL NOT NULL,
+                finished_at REAL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS tasks_ready ON tasks (status, run_at)")
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread per process (sqlite3 connections do not survive fork)
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._create_schema(conn)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def task(self, name: str) -> Callable:
+        """Decorator registering a handler that receives the task payload."""
+        def decorator(func: Callable[[Dict[str, Any]], None]) -> Callable[[Dict[str, Any]], None]:
+            self.handlers[name] = func
+            return func
+        return decorator
+
+    def enqueue(self, name: str, payload: Dict[str, Any], delay: float = 0.0, max_attempts: int = 5) -> int:
+        """Persist a task; returns its id. Handlers must be idempotent (tasks may run twice)."""
+        now = time.time()
+        cursor = self._conn().execute(
+            "INSERT INTO tasks (name, payload, max_attempts, run_at, created_at) VALUES (?, ?, ?, ?, ?)",
+            (name, json.dumps(payload), max_attempts, now + delay, now)
+        )
+        self._wake.set()
+        return cursor.lastrowid
+
+    def _claim(self) -> Optional[Dict[str, Any]]:
+        """Atomically lease the next due task."""
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                """
+                SELECT id, name, payload, attempts, max_attempts FROM tasks
+                WHERE (status = 'pending' AND run_at <= ?) OR (status = 'running' AND locked_until < ?)
+                ORDER BY run_at LIMIT 1
+                """,
+                (now, now)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE tasks SET status = 'running', attempts = attempts + 1, locked_until = ? WHERE id = ?",
+                (now + self.lease_seconds, row[0])
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return {"id": row[0], "name": row[1], "payload": json.loads(row[2]), "attempts": row[3] + 1, "max_attempts": row[4]}
+
+    def run_one(self) -> bool:
+        """Run the next due task, if any. Returns True when a task was processed."""
+        task = self._claim()
+        if task is None:
+            return False
+
+        conn = self._conn()
+        handler = self.handlers.get(task["name"])
+        try:
+            if handler is None:
+                raise LookupError(f"No handler registered for task {task['name']}")
+            handler(task["payload"])
+            conn.execute("UPDATE tasks SET status = 'done', locked_until = NULL, last_error = NULL, finished_at = ? WHERE id = ?", (time.time(), task["id"]))
+        except Exception as e:
+            error = f"{e}\n{traceback.format_exc(limit=5)}"
+            if task["attempts"] >= task["max_attempts"]:
+                print(f"[ERROR_TASKS] Task {task['id']} ({task['name']}) failed permanently: {e}")
+                conn.execute("UPDATE tasks SET status = 'failed', locked_until = NULL, last_error = ?, finished_at = ? WHERE id = ?", (error, time.time(), task["id"]))
+            else:
+                # Exponential backoff with jitter
+                delay = min(self.base_delay * (2 ** (task["attempts"] - 1)), self.max_delay) * random.uniform(0.8, 1.2)
+                print(f"[ERROR_TASKS] Task {task['id']} ({task['name']}) attempt {task['attempts']} failed, retrying in {delay:.0f}s: {e}")
+                conn.execute("UPDATE tasks SET status = 'pending', locked_until = NULL, last_error = ?, run_at = ? WHERE id = ?", (error, time.time() + delay, task["id"]))
+        return True
+
+    def _worker_loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                if self.run_one():
+                    continue
+            except Exception as e:
+                print(f"[ERROR_TASKS] Worker error: {e}")
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def ensure_worker(self, threads: int = 1) -> None:
+        """Start consumer threads in the current process if not already running."""
+        if self._worker_pid == os.getpid():
+            return
+        with self._worker_lock:
+            if self._worker_pid == os.getpid():
+                return
+            self._stop.clear()
+            for i in range(threads):
+                threading.Thread(target=self._worker_loop, name=f"task-worker-{i}", daemon=True).start()
+            self._worker_pid = os.getpid()
+
+    def stop(self) -> None:
+        """Ask consumer threads to exit (running tasks finish; others stay queued)."""
+        self._stop.set()
+        self._wake.set()
+
+    def purge(self, older_than: float = 7 * 86400) -> int:
+        """Delete finished tasks older than the given age in seconds."""
+        cursor = self._conn().execute("DELETE FROM tasks WHERE status = 'done' AND finished_at < ?", (time.time() - older_than,))
+        return cursor.rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        """Task counts per status plus the most recent failures."""
+        conn = self._conn()
+        counts = dict(conn.execute("SELECT status, COUNT(*) FROM tasks GROUP BY status").fetchall())
+        failures = [
+            {"id": r[0], "name": r[1], "attempts": r[2], "error": (r[3] or "").splitlines()[0] if r[3] else None}
+            for r in conn.execute("SELECT id, name, attempts, last_error FROM tasks WHERE status = 'failed' ORDER BY finished_at DESC LIMIT 10")
+        ]
+        return {"counts": counts, "recent_failures": failures}
+
+def create_task_queue() -> TaskQueue:
+    """
+    Build the queue at TASK_QUEUE_PATH.
+
+    The default lives in the system temp directory, shared by every worker
+    on the host but not by redeployed containers; point TASK_QUEUE_PATH at
+    a persistent volume to keep queued tasks across deploys.
+    """
+    default = os.path.join(tempfile.gettempdir(), "state_manager_tasks.db")
+    return TaskQueue(os.environ.get("TASK_QUEUE_PATH") or default)
@@ -0,0 +1,34 @@
+"""
+    file: conftest.py
+    brief: Make the backend importable as in production (`from api... import ...`) and shared fixtures
+"""
+# Standard library imports
+import sys
+from pathlib import Path
+
+# Third-party imports
+import pytest
+
+basedir = Path(__file__).parent.parent
+if str(basedir) not in sys.path:
+    sys.path.insert(0, str(basedir))
+
+from fake_firestore import FakeFirestore
+
+@pytest.fixture
+def fake_db():
+    return FakeFirestore()
+
+@pytest.fixture
+def manager(fake_db, monkeypatch):
+    """PropertyManager over an in-memory Firestore, with time.time() following its clock."""
+    pytest.importorskip("flask")
+    pytest.importorskip("server_utils.database")
+    import api.models.manager as module
+    import api.models.aggregates as aggregates
+    monkeypatch.delenv("ANNOUNCEMENT_REPLICA", raising=False)
+    monkeypatch.setattr(module, "Database", lambda: fake_db)
+    monkeypatch.setattr(module, "firestore", fake_db.module())
+    monkeypatch.setattr(aggregates, "firestore", fake_db.module())
+    monkeypatch.setattr(module.time, "time", lambda: fake_db.now)
+    return module.PropertyManager()
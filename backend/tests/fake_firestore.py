@@ -0,0 +1,243 @@
+"""
+    file: fake_firestore.py
+    brief: In-memory stand-in for the subset of the Firestore client the backend uses
+"""
+# Standard library imports
+import copy
+import itertools
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+SERVER_TIMESTAMP = object()
+DELETE_FIELD = object()
+
+class Increment:
+    def __init__(self, value: int) -> None:
+        self.value = value
+
+class ArrayRemove:
+    def __init__(self, values: List[Any]) -> None:
+        self.values = values
+
+class PreconditionFailed(Exception):
+    pass
+
+class NotFound(Exception):
+    pass
+
+class Snapshot:
+    def __init__(self, reference: "DocumentReference", data: Optional[Dict[str, Any]], update_time: Optional[datetime]) -> None:
+        self.reference = reference
+        self.id = reference.id
+        self._data = data
+        self.exists = data is not None
+        self.update_time = update_time
+
+    def to_dict(self) -> Optional[Dict[str, Any]]:
+        return copy.deepcopy(self._data)
+
+class DocumentReference:
+    def __init__(self, client: "FakeFirestore", collection: str, doc_id: str) -> None:
+        self.client = client
+        self.collection = collection
+        self.id = doc_id
+
+    def get(self) -> Snapshot:
+        entry = self.client.store.get(self.collection, {}).get(self.id)
+        return Snapshot(self, entry["data"] if entry else None, entry["update_time"] if entry else None)
+
+    def set(self, data: Dict[str, Any], merge: bool = False) -> None:
+        self.client.apply([("set", self, data, merge, None)])
+
+    def update(self, data: Dict[str, Any], option: Any = None) -> None:
+        self.client.apply([("update", self, data, False, option)])
+
+    def delete(self) -> None:
+        self.client.apply([("delete", self, None, False, None)])
+
+class Query:
+    def __init__(self, client: "FakeFirestore", collection: str) -> None:
+        self.client = client
+        self.collection = collection
+        self._filters: List[Any] = []
+        self._order: Optional[Any] = None
+        self._limit: Optional[int] = None
+        self._after: Optional[str] = None
+
+    def _copy(self) -> "Query":
+        query = Query(self.client, self.collection)
+        query._filters, query._order, query._limit, query._after = list(self._filters), self._order, self._limit, self._after
+        return query
+
+    def document(self, doc_id: str) -> DocumentReference:
+        return DocumentReference(self.client, self.collection, doc_id)
+
+    def where(self, field: str, op: str, value: Any) -> "Query":
+        query = self._copy()
+        query._filters.append((field, op, value))
+        return query
+
+    def order_by(self, field: str, direction: Any = "ASCENDING") -> "Query":
+        query = self._copy()
+        query._order = (field, direction)
+        return query
+
+    def limit(self, n: int) -> "Query":
+        query = self._copy()
+        query._limit = n
+        return query
+
+    def start_after(self, cursor: Any) -> "Query":
+        # Like the real client: a snapshot or a {field: value} dict, never a bare reference
+        if isinstance(cursor, Snapshot):
+            # A snapshot of a missing document carries no cursor values: the query restarts
+            doc_id = cursor.id if cursor.exists else None
+        elif isinstance(cursor, dict) and isinstance(cursor.get("__name__"), DocumentReference):
+            doc_id = cursor["__name__"].id
+        else:
+            raise TypeError(f"object of type '{type(cursor).__name__}' has no len()")
+        query = self._copy()
+        query._after = doc_id
+        return query
+
+    def select(self, fields: List[str]) -> "Query":
+        return self._copy()
+
+    @staticmethod
+    def _matches(data: Dict[str, Any], field: str, op: str, value: Any) -> bool:
+        if field not in data:
+            return False
+        actual = data[field]
+        if op == "array_contains":
+            return value in (actual or [])
+        if actual is None:
+            return op == "==" and value is None
+        return {"==": actual == value, ">": actual > value, ">=": actual >= value, "<": actual < value, "<=": actual <= value}[op]
+
+    def stream(self) -> List[Snapshot]:
+        ranges = {f for f, op, v in self._filters if op in (">", ">=", "<", "<=")}
+        if len(ranges) > 1:
+            raise ValueError(f"Range filters on several fields need a composite index: {sorted(ranges)}")
+        docs = self.client.store.get(self.collection, {})
+        rows = [
+            (doc_id, entry) for doc_id, entry in sorted(docs.items())
+            if all(self._matches(entry["data"], f, op, v) for f, op, v in self._filters)
+        ]
+        if self._order is not None and self._order[0] != "__name__":
+            field, direction = self._order
+            # Firestore orders nulls first ascending; documents without the field are excluded
+            rows = [r for r in rows if field in r[1]["data"]]
+            rows.sort(key=lambda r: (r[1]["data"][field] is not None, r[1]["data"][field] if r[1]["data"][field] is not None else 0), reverse=(direction == "DESCENDING"))
+        if self._after is not None:
+            rows = [r for r in rows if r[0] > self._after]
+        if self._limit is not None:
+            rows = rows[:self._limit]
+        return [Snapshot(DocumentReference(self.client, self.collection, doc_id), copy.deepcopy(entry["data"]), entry["update_time"]) for doc_id, entry in rows]
+
+    get = stream
+
+class Batch:
+    def __init__(self, client: "FakeFirestore") -> None:
+        self.client = client
+        self.ops: List[Any] = []
+
+    def set(self, ref: DocumentReference, data: Dict[str, Any], merge: bool = False) -> None:
+        self.ops.append(("set", ref, data, merge, None))
+
+    def update(self, ref: DocumentReference, data: Dict[str, Any], option: Any = None) -> None:
+        self.ops.append(("update", ref, data, False, option))
+
+    def delete(self, ref: DocumentReference) -> None:
+        self.ops.append(("delete", ref, None, False, None))
+
+    def commit(self) -> None:
+        self.client.apply(self.ops)
+
+class FakeFirestore:
+    """
+    Collections of plain dicts with commit timestamps from a controllable clock.
+
+    Writes resolve SERVER_TIMESTAMP, DELETE_FIELD, Increment, ArrayRemove and
+    dotted update paths; last_update_time preconditions are enforced.
+    """
+
+    SERVER_TIMESTAMP = SERVER_TIMESTAMP
+
+    def __init__(self, now: float = 1_700_000_000.0) -> None:
+        self.store: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self.now = now
+        self._ticks = itertools.count(1)
+        self.commits = 0
+
+    def tick(self, seconds: float) -> None:
+        self.now += seconds
+
+    def _commit_time(self) -> datetime:
+        # Distinct, increasing commit times even without advancing the clock
+        return datetime.fromtimestamp(self.now, tz=timezone.utc) + timedelta(microseconds=next(self._ticks))
+
+    def client(self) -> "FakeFirestore":
+        return self
+
+    def collection(self, name: str) -> Query:
+        return Query(self, name)
+
+    def batch(self) -> Batch:
+        return Batch(self)
+
+    def write_option(self, last_update_time: datetime) -> Any:
+        return SimpleNamespace(last_update_time=last_update_time)
+
+    @staticmethod
+    def _resolve(value: Any, current: Any, stamp: datetime, merge: bool = False) -> Any:
+        if value is SERVER_TIMESTAMP:
+            return stamp
+        if isinstance(value, Increment):
+            return (current or 0) + value.value
+        if isinstance(value, ArrayRemove):
+            return [v for v in (current or []) if v not in value.values]
+        if isinstance(value, dict):
+            # set(merge=True) merges maps deeply; update() replaces them
+            merged = dict(current) if merge and isinstance(current, dict) else {}
+            for k, v in value.items():
+                merged[k] = FakeFirestore._resolve(v, merged.get(k), stamp, merge)
+            return merged
+        return copy.deepcopy(value)
+
+    def apply(self, ops: List[Any]) -> None:
+        # Preconditions first: a batch is all or nothing
+        for kind, ref, data, merge, option in ops:
+            entry = self.store.get(ref.collection, {}).get(ref.id)
+            if kind == "update" and entry is None:
+                raise NotFound(f"{ref.collection}/{ref.id}")
+            if option is not None and (entry is None or entry["update_time"] != option.last_update_time):
+                raise PreconditionFailed(f"{ref.collection}/{ref.id} changed")
+        stamp = self._commit_time()
+        for kind, ref, data, merge, option in ops:
+            docs = self.store.setdefault(ref.collection, {})
+            if kind == "delete":
+                docs.pop(ref.id, None)
+                continue
+            current = copy.deepcopy(docs[ref.id]["data"]) if ref.id in docs and (merge or kind == "update") else {}
+            for path, value in data.items():
+                keys = path.split(".") if kind == "update" else [path]
+                target = current
+                for key in keys[:-1]:
+                    target = target.setdefault(key, {})
+                if value is DELETE_FIELD:
+                    target.pop(keys[-1], None)
+                else:
+                    target[keys[-1]] = self._resolve(value, target.get(keys[-1]), stamp, merge)
+            docs[ref.id] = {"data": current, "update_time": stamp}
+        self.commits += 1
+
+    def module(self) -> SimpleNamespace:
+        """Stand-in for the firebase_admin.firestore module bound to this client."""
+        module = SimpleNamespace(
+            client=self.client, SERVER_TIMESTAMP=SERVER_TIMESTAMP, DELETE_FIELD=DELETE_FIELD,
+            Increment=Increment, ArrayRemove=ArrayRemove
+        )
+        # firebase_admin.firestore re-exports google.cloud.firestore as `firestore`
+        module.firestore = module
+        return module
@@ -0,0 +1,134 @@
+"""
+    file: test_admission.py
+    brief: Token buckets, concurrency slots and admission decisions
+"""
+# Third-party imports
+import pytest
+
+# Local imports
+from api.utils.admission import AdmissionController, MemoryLimiterBackend, SqliteLimiterBackend
+
+@pytest.fixture(params=["memory", "shm"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        return MemoryLimiterBackend()
+    return SqliteLimiterBackend(str(tmp_path / "admission.db"))
+
+def test_bucket_allows_burst_then_rejects(backend):
+    for _ in range(5):
+        assert backend.take("ip:a", 1, rate=1, burst=5) == 0
+    wait = backend.take("ip:a", 1, rate=1, burst=5)
+    assert 0 < wait <= 1
+
+def test_bucket_refills_over_time(backend, monkeypatch):
+    import api.utils.admission as module
+    now = [1000.0]
+    monkeypatch.setattr(module.time, "time", lambda: now[0])
+    monkeypatch.setattr(module.time, "monotonic", lambda: now[0])
+    assert backend.take("ip:a", 5, rate=1, burst=5) == 0
+    assert backend.take("ip:a", 1, rate=1, burst=5) > 0
+    now[0] += 2
+    assert backend.take("ip:a", 2, rate=1, burst=5) == 0
+
+def test_buckets_are_per_key(backend):
+    assert backend.take("ip:a", 5, rate=1, burst=5) == 0
+    assert backend.take("ip:a", 1, rate=1, burst=5) > 0
+    assert backend.take("ip:b", 1, rate=1, burst=5) == 0
+
+def test_slots_cap_concurrency_and_release(backend):
+    first = backend.acquire("route:x", 2, ttl=60)
+    second = backend.acquire("route:x", 2, ttl=60)
+    assert first and second
+    assert backend.acquire("route:x", 2, ttl=60) is None
+    backend.release("route:x", first)
+    assert backend.acquire("route:x", 2, ttl=60) is not None
+
+def test_expired_slots_are_reclaimed(backend, monkeypatch):
+    import api.utils.admission as module
+    now = [1000.0]
+    monkeypatch.setattr(module.time, "time", lambda: now[0])
+    monkeypatch.setattr(module.time, "monotonic", lambda: now[0])
+    assert backend.acquire("route:x", 1, ttl=10) is not None
+    assert backend.acquire("route:x", 1, ttl=10) is None
+    now[0] += 11
+    assert backend.acquire("route:x", 1, ttl=10) is not None
+
+def test_sqlite_state_is_shared_between_connections(tmp_path):
+    path = str(tmp_path / "admission.db")
+    first, second = SqliteLimiterBackend(path), SqliteLimiterBackend(path)
+    assert first.take("ip:a", 5, rate=1, burst=5) == 0
+    assert second.take("ip:a", 1, rate=1, burst=5) > 0
+
+def controller(**kwargs):
+    return AdmissionController(MemoryLimiterBackend(), ip_rate=1, ip_burst=3, uid_rate=1, uid_burst=2, costs={"free": 0, "scan": 1, "busy": 1}, caps={"busy": 1}, **kwargs)
+
+def test_free_routes_are_never_limited():
+    ctl = controller()
+    for _ in range(10):
+        assert ctl.admit("free", "1.2.3.4") == (None, None)
+
+def test_rate_limited_request_gets_429_with_retry_after():
+    ctl = controller()
+    for _ in range(3):
+        assert ctl.admit("scan", "1.2.3.4")[0] is None
+    rejection, slot = ctl.admit("scan", "1.2.3.4")
+    assert rejection["status"] == 429 and rejection["retry_after"] >= 1
+    assert slot is None
+    assert ctl.stats()["rate_limited"] == 1
+
+def test_uid_bucket_applies_across_ips():
+    ctl = controller()
+    assert ctl.admit("scan", "10.0.0.1", lambda: "u1")[0] is None
+    assert ctl.admit("scan", "10.0.0.2", lambda: "u1")[0] is None
+    assert ctl.admit("scan", "10.0.0.3", lambda: "u1")[0]["status"] == 429
+
+def test_identity_is_only_resolved_after_ip_bucket_admits():
+    ctl = controller()
+    calls = []
+    def identify():
+        calls.append(1)
+        return None
+    for _ in range(10):
+        ctl.admit("scan", "1.2.3.4", identify)
+    # Only the three requests within the IP burst paid for token verification
+    assert len(calls) == 3
+
+def test_capped_route_returns_503_until_released():
+    ctl = controller()
+    rejection, slot = ctl.admit("busy", "1.1.1.1")
+    assert rejection is None and slot is not None
+    assert ctl.admit("busy", "2.2.2.2")[0]["status"] == 503
+    ctl.release(slot)
+    assert ctl.admit("busy", "3.3.3.3")[0] is None
+
+def test_backend_failure_admits():
+    class Broken:
+        def take(self, *args):
+            raise RuntimeError("down")
+    ctl = AdmissionController(Broken())
+    assert ctl.admit("get_announcements", "1.2.3.4") == (None, None)
+
+def test_forwarded_for_cannot_spoof_client_ip():
+    pytest.importorskip("werkzeug")
+    from werkzeug.middleware.proxy_fix import ProxyFix
+    from werkzeug.test import EnvironBuilder
+    seen = {}
+    def app(environ, start_response):
+        seen["addr"] = environ["REMOTE_ADDR"]
+        start_response("200 OK", [])
+        return [b""]
+    environ = EnvironBuilder(headers={"X-Forwarded-For": "6.6.6.6, 203.0.113.7"}, environ_base={"REMOTE_ADDR": "10.0.0.1"}).get_environ()
+    ProxyFix(app, x_for=1)(environ, lambda *a: None)
+    assert seen["addr"] == "203.0.113.7"
+
+def test_preflights_are_never_limited():
+    ctl = controller()
+    for _ in range(10):
+        assert ctl.admit("busy", "1.2.3.4", method="OPTIONS") == (None, None)
+    # Neither tokens nor slots were spent on them
+    assert ctl.admit("busy", "1.2.3.4")[0] is None
+
+def test_health_and_static_routes_are_free():
+    from api.utils.admission import ROUTE_COSTS
+    for endpoint in ("static", "home", "get_replica_status", "get_task_status"):
+        assert ROUTE_COSTS[endpoint] == 0
@@ -0,0 +1,79 @@
+"""
+    file: test_cache.py
+    brief: SharedCache versioning and backend behaviour
+"""
+# Third-party imports
+import pytest
+
+# Local imports
+from api.utils.cache import LRUCache, MemoryBackend, SharedCache, SqliteBackend
+
+@pytest.fixture(params=["memory", "shm"])
+def cache(request, tmp_path):
+    if request.param == "memory":
+        return SharedCache(MemoryBackend(1 << 20))
+    return SharedCache(SqliteBackend(str(tmp_path / "cache.db"), 1 << 20))
+
+def test_invalidate_hides_existing_entries(cache):
+    cache.set("ns", "k", [1])
+    assert cache.get("ns", "k") == [1]
+    cache.invalidate("ns")
+    assert cache.get("ns", "k") is None
+
+def test_invalidate_is_per_namespace(cache):
+    cache.set("a", "k", 1)
+    cache.set("b", "k", 2)
+    cache.invalidate("a")
+    assert cache.get("a", "k") is None
+    assert cache.get("b", "k") == 2
+
+def test_get_or_set_calls_factory_once(cache):
+    calls = []
+    def factory():
+        calls.append(1)
+        return {"v": 1}
+    assert cache.get_or_set("ns", "k", factory) == {"v": 1}
+    assert cache.get_or_set("ns", "k", factory) == {"v": 1}
+    assert len(calls) == 1
+
+def test_get_or_set_drops_result_invalidated_during_factory(cache):
+    def factory():
+        # A write in another worker lands while this read is in flight
+        cache.invalidate("ns")
+        return ["stale"]
+    assert cache.get_or_set("ns", "k", factory) == ["stale"]
+    assert cache.get("ns", "k") is None
+    assert cache.get_or_set("ns", "k", lambda: ["fresh"]) == ["fresh"]
+    assert cache.get("ns", "k") == ["fresh"]
+
+def test_expired_entries_are_misses(cache, monkeypatch):
+    import api.utils.cache as module
+    now = [1000.0]
+    monkeypatch.setattr(module.time, "time", lambda: now[0])
+    cache.set("ns", "k", "v", ttl=10)
+    assert cache.get("ns", "k") == "v"
+    now[0] += 11
+    assert cache.get("ns", "k") is None
+
+def test_only_cross_worker_backends_are_shared(tmp_path):
+    assert not SharedCache(MemoryBackend(1024)).shared
+    assert SharedCache(SqliteBackend(str(tmp_path / "c.db"), 1024)).shared
+
+def test_sqlite_entries_are_visible_to_other_connections(tmp_path):
+    path = str(tmp_path / "cache.db")
+    first = SharedCache(SqliteBackend(path, 1 << 20))
+    second = SharedCache(SqliteBackend(path, 1 << 20))
+    first.set("ns", "k", b"payload")
+    assert second.get("ns", "k") == b"payload"
+    second.invalidate("ns")
+    assert first.get("ns", "k") is None
+
+def test_lru_evicts_by_size():
+    lru = LRUCache(max_entries=10, max_bytes=10)
+    lru.set("a", b"12345")
+    lru.set("b", b"12345")
+    lru.get("a")
+    lru.set("c", b"12345")
+    assert lru.get("b") is None
+    assert lru.get("a") == b"12345"
+    assert lru.get("c") == b"12345"
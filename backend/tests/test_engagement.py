@@ -0,0 +1,52 @@
+"""
+    file: test_engagement.py
+    brief: Buffered engagement counters and protection of server-managed counters
+"""
+# Third-party imports
+import pytest
+
+# Local imports
+from api.models.engagement import EngagementCounters
+
+@pytest.fixture
+def counters(fake_db, monkeypatch):
+    import api.models.engagement as module
+    monkeypatch.setattr(module, "firestore", fake_db.module())
+    monkeypatch.setattr(EngagementCounters, "_ensure_flusher", lambda self: None)
+    return EngagementCounters("announcements", interval=3600)
+
+def test_events_are_buffered_and_flushed_as_increments(counters, fake_db):
+    fake_db.collection("announcements").document("a").set({"title": "A", "engagement": {"views": 5}})
+    for _ in range(3):
+        counters.record("a", "views")
+    counters.record("a", "contact_clicks")
+    assert fake_db.store["announcements"]["a"]["data"]["engagement"] == {"views": 5}
+    assert counters.flush() == 1
+    assert fake_db.store["announcements"]["a"]["data"]["engagement"] == {"views": 8, "contact_clicks": 1}
+    assert counters.stats()["buffered_events"] == 0
+
+def test_unknown_event_is_rejected(counters):
+    with pytest.raises(ValueError):
+        counters.record("a", "likes")
+
+def test_deleted_listing_counts_are_dropped(counters, fake_db, monkeypatch):
+    pytest.importorskip("google.api_core")
+    import google.api_core.exceptions as exceptions
+    import fake_firestore
+    monkeypatch.setattr(fake_firestore, "NotFound", exceptions.NotFound)
+    fake_db.collection("announcements").document("a").set({"title": "A"})
+    counters.record("a", "views")
+    counters.record("gone", "views")
+    assert counters.flush() == 1
+    assert counters.stats()["dropped"] == 1
+
+def test_client_counters_are_ignored(manager, fake_db):
+    from api.models.manager import COUNTER_KEYS, Property
+    prop_id = manager.create_announcement(Property.from_dict({"id": "new", "title": "A"}))
+    fake_db.collection(manager.COLLECTION).document(prop_id).update({"favorite_count": 2, "engagement.views": 7})
+    assert manager.update_announcement(prop_id, {"title": "B", "favorite_count": 999, "engagement": {"views": "lots"}})
+    saved = fake_db.store[manager.COLLECTION][prop_id]["data"]
+    assert saved["title"] == "B"
+    assert saved["favorite_count"] == 2
+    assert saved["engagement"] == {"views": 7}
+    assert set(COUNTER_KEYS) == {"favorite_count", "engagement"}
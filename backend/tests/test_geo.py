@@ -0,0 +1,91 @@
+"""
+    file: test_geo.py
+    brief: Geo reference index, prefix search and the address autocomplete proxy
+"""
+# Standard library imports
+import threading
+
+# Local imports
+from api.models.geo import AddressAutocomplete, GeoIndex, PrefixIndex, filter_prefix, fold
+from api.utils.cache import MemoryBackend, SharedCache
+
+DATASET = {
+    "version": 1,
+    "countries": [{
+        "name": "Brazil", "iso2": "BR", "complete": False,
+        "states": [
+            {"name": "Paraná", "code": "PR", "cities": ["Curitiba", "Londrina"]},
+            {"name": "São Paulo", "code": "SP", "cities": [f"Cidade {i:03d}" for i in range(300)] + ["São Paulo"]},
+        ]
+    }]
+}
+
+def test_fold_strips_accents_case_and_spacing():
+    assert fold("  São   PAULO ") == "sao paulo"
+
+def test_prefix_matches_any_word_whole_name_first():
+    index = PrefixIndex([("Rio de Janeiro", 1), ("Janeiro Novo", 2)])
+    assert index.search("jan") == [2, 1]
+
+def test_states_by_code_and_accent_insensitive_name():
+    geo = GeoIndex(DATASET)
+    assert [s["code"] for s in geo.states("br")] == ["PR", "SP"]
+    assert geo.cities("Brazil", "parana") == ["Curitiba", "Londrina"]
+    assert geo.state_name("Brazil", "sp") == "São Paulo"
+
+def test_full_lists_are_not_truncated():
+    geo = GeoIndex(DATASET)
+    assert len(geo.cities("Brazil", "SP")) == 301
+
+def test_unknown_country_or_state_is_none():
+    geo = GeoIndex(DATASET)
+    assert geo.states("Atlantis") is None
+    assert geo.cities("Brazil", "XX") is None
+
+def test_partial_countries_are_flagged():
+    geo = GeoIndex(DATASET)
+    assert not geo.is_complete("Brazil")
+    assert GeoIndex({"countries": [{"name": "Chile", "states": []}]}).is_complete("Chile")
+
+def test_filter_prefix_matches_words():
+    assert filter_prefix(["São José dos Campos", "Santos", "Campinas"], "camp") == ["Campinas", "São José dos Campos"]
+    assert filter_prefix(["B", "A"]) == ["B", "A"]
+
+def test_bundled_dataset_is_sorted():
+    geo = GeoIndex.load()
+    for country in geo.countries():
+        states = geo.states(country["name"])
+        assert [fold(s["name"]) for s in states] == sorted(fold(s["name"]) for s in states)
+
+def test_autocomplete_caches_and_skips_short_queries():
+    calls = []
+    def fetch(query, limit, lang):
+        calls.append(query)
+        return [{"display_name": query}]
+    proxy = AddressAutocomplete(fetch, SharedCache(MemoryBackend(1 << 20)), min_interval=0)
+    assert proxy.search("ab") == []
+    assert proxy.search("Rua Augusta") == [{"display_name": "Rua Augusta"}]
+    assert proxy.search("rua  augusta") == [{"display_name": "Rua Augusta"}]
+    assert calls == ["Rua Augusta"]
+
+def test_autocomplete_coalesces_concurrent_queries():
+    release = threading.Event()
+    calls = []
+    def fetch(query, limit, lang):
+        calls.append(query)
+        release.wait(5)
+        return [query]
+    proxy = AddressAutocomplete(fetch, SharedCache(MemoryBackend(1 << 20)), min_interval=0)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(proxy.search("Avenida Paulista"))) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for _ in range(500):
+        if calls and proxy.coalesced == 4:
+            break
+        threading.Event().wait(0.01)
+    release.set()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1
+    assert results == [["Avenida Paulista"]] * 5
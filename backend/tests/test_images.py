@@ -0,0 +1,77 @@
+"""
+    file: test_images.py
+    brief: Variant encoding strips metadata; variant URLs map back to their manifest
+"""
+# Standard library imports
+import io
+
+# Third-party imports
+import pytest
+
+PIL = pytest.importorskip("PIL")
+from PIL import Image, ImageCms
+
+# Local imports
+from api.utils.images import ImagePipeline, available_formats, build_variants, content_hash
+
+class FakeBlob:
+    def __init__(self, bucket: "FakeBucket", name: str) -> None:
+        self.bucket = bucket
+        self.name = name
+        self.cache_control = None
+        self.public_url = f"https://storage.googleapis.com/{bucket.name}/{name}"
+
+    def exists(self) -> bool:
+        return self.name in self.bucket.files
+
+    def upload_from_string(self, data, content_type=None) -> None:
+        self.bucket.files[self.name] = data if isinstance(data, bytes) else data.encode("utf-8")
+
+    def download_as_bytes(self) -> bytes:
+        return self.bucket.files[self.name]
+
+    def make_public(self) -> None:
+        pass
+
+class FakeBucket:
+    name = "test-bucket"
+
+    def __init__(self) -> None:
+        self.files = {}
+
+    def blob(self, name: str) -> FakeBlob:
+        return FakeBlob(self, name)
+
+def photo() -> bytes:
+    out = io.BytesIO()
+    icc = ImageCms.ImageCmsProfile(ImageCms.createProfile("sRGB")).tobytes()
+    Image.new("RGB", (800, 600), (200, 120, 40)).save(out, "JPEG", icc_profile=icc, exif=Image.Exif().tobytes())
+    return out.getvalue()
+
+@pytest.mark.parametrize("fmt", ["avif", "webp", "jpeg"])
+def test_variants_carry_no_color_profile(fmt):
+    if fmt not in available_formats():
+        pytest.skip(f"{fmt} not supported by this Pillow build")
+    built = build_variants(photo(), [fmt])
+    for info in built.values():
+        with Image.open(io.BytesIO(info["files"][fmt])) as img:
+            assert "icc_profile" not in img.info
+            assert "exif" not in img.info
+
+def test_uploaded_variant_url_reuses_its_manifest():
+    bucket = FakeBucket()
+    pipeline = ImagePipeline(lambda: bucket)
+    raw = photo()
+    manifest = pipeline._store(content_hash(raw), build_variants(raw, ["jpeg"]), "properties/u1")
+    url = manifest["variants"]["full"]["urls"]["jpeg"]
+    key = url.split(f"{bucket.name}/", 1)[1]
+    files = len(bucket.files)
+
+    def fail(value):
+        raise AssertionError("variant URLs must not be downloaded and re-encoded")
+    manifests = pipeline.process_images([url], loader=fail, prefix="properties/u1", lookup=lambda u: pipeline.stored_manifest(u.split(f"{bucket.name}/", 1)[1]))
+    assert manifests == [manifest]
+    assert len(bucket.files) == files
+    assert pipeline.stored_manifest(key) == manifest
+    # Originals stored by the blob store are not variants
+    assert pipeline.stored_manifest(f"properties/u1/{content_hash(raw)}.jpg") is None
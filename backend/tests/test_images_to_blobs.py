@@ -0,0 +1,111 @@
+"""
+    file: test_images_to_blobs.py
+    brief: Inline image migration: dry runs, checkpoints and concurrent edits
+"""
+# Standard library imports
+import base64
+
+# Third-party imports
+import pytest
+
+pytest.importorskip("firebase_admin")
+pytest.importorskip("dotenv")
+pytest.importorskip("server_utils.database")
+
+# Local imports
+from api.utils.blobstore import LocalBlobStore
+
+IMAGE = "data:image/png;base64," + base64.b64encode(b"\x89PNG\r\n\x1a\n" + b"x" * 2000).decode()
+
+@pytest.fixture
+def migration(fake_db, monkeypatch, tmp_path):
+    import api.migrations.images_to_blobs as module
+    monkeypatch.setattr(module, "firestore", fake_db.module())
+    monkeypatch.setattr(module, "CHECKPOINT_FILE", tmp_path / "checkpoint.json")
+    return module
+
+@pytest.fixture
+def store(tmp_path):
+    return LocalBlobStore(tmp_path / "blobs", "http://localhost/api/blobs")
+
+def seed(fake_db, count=3):
+    for i in range(count):
+        fake_db.collection("announcements").document(f"a{i}").set({"title": f"A{i}", "owner_id": "u1", "images": [IMAGE]})
+
+def test_migration_moves_images_and_checkpoints(migration, fake_db, store):
+    seed(fake_db)
+    checkpoint = {}
+    stats = migration.migrate_collection("announcements", store, checkpoint, 2, 2, dry_run=False)
+    assert stats["migrated"] == 3 and stats["failed"] == 0
+    assert checkpoint["announcements"] == "a2"
+    for doc in fake_db.store["announcements"].values():
+        assert doc["data"]["images"][0].startswith("http://localhost/api/blobs/properties/u1/")
+
+def test_dry_run_writes_nothing(migration, fake_db, store, tmp_path):
+    seed(fake_db)
+    commits = fake_db.commits
+    checkpoint = {}
+    stats = migration.migrate_collection("announcements", migration.DryRunBlobStore(), checkpoint, 2, 2, dry_run=True)
+    assert stats["migrated"] == 3 and stats["bytes_saved"] > 0
+    assert fake_db.commits == commits
+    assert checkpoint == {}
+    assert not (tmp_path / "blobs").exists()
+    assert fake_db.store["announcements"]["a0"]["data"]["images"] == [IMAGE]
+
+def test_checkpoint_stops_before_failed_document(migration, fake_db, store, monkeypatch):
+    seed(fake_db)
+    original = migration.migrate_announcement
+    def flaky(data, store):
+        if data["title"] == "A1":
+            raise IOError("upload failed")
+        return original(data, store)
+    monkeypatch.setattr(migration, "migrate_announcement", flaky)
+    checkpoint = {}
+    stats = migration.migrate_collection("announcements", store, checkpoint, 10, 1, dry_run=False)
+    assert stats["failed"] == 1 and stats["migrated"] == 2
+    assert checkpoint["announcements"] == "a0"
+
+    monkeypatch.setattr(migration, "migrate_announcement", original)
+    stats = migration.migrate_collection("announcements", store, checkpoint, 10, 1, dry_run=False)
+    assert stats["migrated"] == 1 and stats["failed"] == 0
+    assert checkpoint["announcements"] == "a2"
+
+def test_edit_during_migration_is_not_overwritten(migration, fake_db, store, monkeypatch):
+    seed(fake_db, 2)
+    original = migration.migrate_announcement
+    def racing(data, store):
+        result = original(data, store)
+        if data["title"] == "A0":
+            # The owner edits the listing while its images upload
+            fake_db.collection("announcements").document("a0").update({"title": "Edited"})
+        return result
+    monkeypatch.setattr(migration, "migrate_announcement", racing)
+    checkpoint = {}
+    stats = migration.migrate_collection("announcements", store, checkpoint, 10, 1, dry_run=False)
+    assert fake_db.store["announcements"]["a0"]["data"]["title"] == "Edited"
+    assert stats["failed"] == 1 and stats["migrated"] == 1
+    assert "announcements" not in checkpoint
+    assert fake_db.store["announcements"]["a1"]["data"]["images"][0].startswith("http://")
+
+def test_migrated_documents_reach_delta_sync(migration, fake_db, store):
+    seed(fake_db, 1)
+    migration.migrate_collection("announcements", store, {}, 10, 1, dry_run=False)
+    assert "updated_at" in fake_db.store["announcements"]["a0"]["data"]
+
+def test_resume_after_deleted_checkpoint_document(migration, fake_db, store):
+    seed(fake_db)
+    fake_db.collection("announcements").document("a1").delete()
+    checkpoint = {"announcements": "a1"}
+    stats = migration.migrate_collection("announcements", store, checkpoint, 10, 1, dry_run=False)
+    assert stats["scanned"] == 1
+    assert fake_db.store["announcements"]["a0"]["data"]["images"] == [IMAGE]
+    assert checkpoint["announcements"] == "a2"
+
+def test_batches_invalidate_shared_cache(migration, fake_db, store):
+    seed(fake_db, 1)
+    invalidated = []
+    class Cache:
+        def invalidate(self, ns):
+            invalidated.append(ns)
+    migration.migrate_collection("announcements", store, {}, 10, 1, dry_run=False, cache=Cache())
+    assert invalidated == ["announcements"]
@@ -0,0 +1,25 @@
+"""
+    file: test_property.py
+    brief: Property serialization for list views and storage
+"""
+# Third-party imports
+import pytest
+
+pytest.importorskip("flask")
+pytest.importorskip("server_utils.database")
+
+MANIFEST = {"variants": {"card": {"urls": {"webp": "https://cdn/card.webp"}}, "full": {"urls": {"webp": "https://cdn/full.webp"}}}}
+
+def prop():
+    from api.models.manager import Property
+    return Property.from_dict({"id": "p1", "title": "A", "images": ["https://cdn/original.jpg", "https://cdn/plain.jpg"], "image_variants": [MANIFEST, None]})
+
+def test_sized_view_swaps_in_variant_and_omits_manifests():
+    data = prop().to_dict(include_location=False, image_size="card")
+    assert data["images"] == ["https://cdn/card.webp", "https://cdn/plain.jpg"]
+    assert "image_variants" not in data
+
+def test_full_view_keeps_manifests():
+    data = prop().to_dict(include_location=True, is_owner=True)
+    assert data["images"] == ["https://cdn/original.jpg", "https://cdn/plain.jpg"]
+    assert data["image_variants"] == [MANIFEST, None]
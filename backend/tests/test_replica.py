@@ -0,0 +1,80 @@
+"""
+    file: test_replica.py
+    brief: Announcement replica freshness and read fallbacks
+"""
+# Standard library imports
+import os
+import threading
+
+# Third-party imports
+import pytest
+
+pytest.importorskip("server_utils.database")
+
+@pytest.fixture
+def replica_module(fake_db, monkeypatch):
+    import api.models.replica as module
+    monkeypatch.setattr(module, "Database", lambda: fake_db)
+    monkeypatch.setattr(module.time, "time", lambda: fake_db.now)
+    return module
+
+class Watch:
+    def __init__(self, callback):
+        self.callback = callback
+        self.is_active = True
+
+    def unsubscribe(self):
+        self.is_active = False
+
+def test_staleness_is_snapshot_lag_not_idle_time(replica_module, fake_db, monkeypatch):
+    from datetime import datetime, timezone
+    watches = []
+    monkeypatch.setattr(type(fake_db.collection("x")), "on_snapshot", lambda query, cb: watches.append(Watch(cb)) or watches[-1], raising=False)
+    replica = replica_module.AnnouncementReplica("announcements", dict, mode="snapshot")
+    replica._start()
+    # Delivered 3 seconds after Firestore read it
+    watches[-1].callback(None, [], datetime.fromtimestamp(fake_db.now - 3, tz=timezone.utc))
+    assert replica.staleness() == pytest.approx(3)
+    fake_db.tick(120)
+    # A quiet collection gets no callbacks but is not stale
+    assert replica.staleness() == pytest.approx(3)
+    assert replica.status()["idle_seconds"] == pytest.approx(120)
+    assert replica.status()["listener_active"] is True
+
+def test_requests_do_not_wait_for_the_seed(replica_module, fake_db, monkeypatch):
+    watches = []
+    monkeypatch.setattr(type(fake_db.collection("x")), "on_snapshot", lambda query, cb: watches.append(Watch(cb)) or watches[-1], raising=False)
+    replica = replica_module.AnnouncementReplica("announcements", dict, mode="snapshot")
+    # The listener has not delivered anything yet
+    assert replica.ensure_started() is False
+    assert len(watches) == 1
+    watches[-1].callback(None, [], None)
+    assert replica.ensure_started() is True
+    assert len(watches) == 1
+
+def test_closed_listener_is_restarted(replica_module, fake_db, monkeypatch):
+    watches = []
+    def on_snapshot(query, callback):
+        watch = Watch(callback)
+        watches.append(watch)
+        # Firestore delivers snapshots on its own thread
+        threading.Thread(target=callback, args=(None, [], None)).start()
+        return watch
+    monkeypatch.setattr(type(fake_db.collection("x")), "on_snapshot", on_snapshot, raising=False)
+    replica = replica_module.AnnouncementReplica("announcements", dict, mode="snapshot")
+    assert replica.ensure_started(timeout=1)
+    watches[-1].is_active = False
+    assert not replica.status()["listener_active"]
+    assert replica.ensure_started(timeout=1)
+    assert len(watches) == 2
+
+def test_poll_replica_miss_falls_back_to_firestore(manager, replica_module, fake_db):
+    from api.models.manager import Property
+    manager.replica = replica_module.AnnouncementReplica(manager.COLLECTION, Property.from_dict, mode="poll")
+    manager.replica._started, manager.replica._pid = True, os.getpid()
+    manager.replica._poll_once()
+    # Created after the last poll
+    prop_id = manager.create_announcement(Property.from_dict({"id": "new", "title": "Fresh"}))
+    assert manager.replica.get(prop_id) is None
+    assert manager.get_announcement(prop_id).data.title == "Fresh"
+    assert manager.get_announcement("missing") is None
@@ -0,0 +1,120 @@
+"""
+    file: test_schema.py
+    brief: Schema upgrade, one-time migration and edits of migrated documents
+"""
+# Third-party imports
+import pytest
+
+LEGACY = {
+    "id": "legacy-1",
+    "title": "Old house",
+    "listing_type": "sale",
+    "price": 250000,
+    "bedrooms": 3,
+    "total": 420,
+    "private_address": "Rua A, 1",
+    "public_address": "Centro",
+    "characteristics": {"pool": True, "bathrooms": 2},
+}
+
+@pytest.fixture
+def legacy(manager, fake_db):
+    fake_db.collection(manager.COLLECTION).document(LEGACY["id"]).set(dict(LEGACY))
+    return LEGACY["id"]
+
+def stored(manager, fake_db, doc_id):
+    return fake_db.store[manager.COLLECTION][doc_id]["data"]
+
+def test_upgrade_normalizes_legacy_layout(manager):
+    from api.models.manager import SCHEMA_VERSION, upgrade_document
+    upgraded = upgrade_document(LEGACY)
+    assert upgraded["schema_version"] == SCHEMA_VERSION
+    assert upgraded["characteristics"]["bedrooms"] == 3
+    assert upgraded["characteristics"]["bathrooms"] == 2
+    assert upgraded["characteristics"]["total_area"] == 420
+    assert upgraded["features"] == {"pool": True}
+    assert upgraded["address"]["private"] == "Rua A, 1"
+    assert "bedrooms" in LEGACY
+
+def test_migration_rewrites_and_removes_legacy_fields(manager, fake_db, legacy):
+    from api.models.manager import LEGACY_KEYS, SCHEMA_VERSION
+    result = manager.migrate_schema_page()
+    assert result == {"cursor": None, "migrated": 1, "quarantined": 0}
+    data = stored(manager, fake_db, legacy)
+    assert data["schema_version"] == SCHEMA_VERSION
+    assert not LEGACY_KEYS & data.keys()
+    assert data["characteristics"]["bedrooms"] == 3
+    assert data["address"]["private"] == "Rua A, 1"
+    assert "updated_at" in data
+
+def test_migration_is_idempotent(manager, fake_db, legacy):
+    manager.migrate_schema_page()
+    commits = fake_db.commits
+    assert manager.migrate_schema_page()["migrated"] == 0
+    assert fake_db.commits == commits
+
+def test_migration_cleans_documents_left_with_legacy_fields(manager, fake_db, legacy):
+    manager.migrate_schema_page()
+    # A v2 document an earlier run upgraded without removing the old keys
+    fake_db.store[manager.COLLECTION][legacy]["data"]["bedrooms"] = 3
+    assert manager.migrate_schema_page()["migrated"] == 1
+    assert "bedrooms" not in stored(manager, fake_db, legacy)
+
+def test_edit_of_migrated_document_keeps_nested_value(manager, fake_db, legacy):
+    manager.migrate_schema_page()
+    fake_db.store[manager.COLLECTION][legacy]["data"]["bedrooms"] = 3
+    data = dict(stored(manager, fake_db, legacy))
+    data["characteristics"] = dict(data["characteristics"], bedrooms=5)
+    assert manager.update_announcement(legacy, {"characteristics": data["characteristics"], "title": "Renovated"})
+    saved = stored(manager, fake_db, legacy)
+    assert saved["characteristics"]["bedrooms"] == 5
+    assert "bedrooms" not in saved
+
+def test_edit_with_legacy_payload_is_normalized(manager, fake_db, legacy):
+    manager.migrate_schema_page()
+    assert manager.update_announcement(legacy, {"bedrooms": 4})
+    saved = stored(manager, fake_db, legacy)
+    assert saved["characteristics"]["bedrooms"] == 4
+    assert "bedrooms" not in saved
+
+def test_unparseable_document_is_quarantined_then_released(manager, fake_db):
+    fake_db.collection(manager.COLLECTION).document("bad").set({"id": "bad", "title": ""})
+    assert manager.migrate_schema_page()["quarantined"] == 1
+    assert "bad" in manager.quarantined_ids()
+    assert manager.get_all_announcements() == []
+    fake_db.store[manager.COLLECTION]["bad"]["data"]["title"] = "Fixed"
+    manager.migrate_schema_page()
+    assert "bad" not in manager.quarantined_ids()
+
+def test_migration_does_not_overwrite_concurrent_edit(manager, fake_db, legacy, monkeypatch):
+    from fake_firestore import Query
+    original = Query.stream
+    edited = []
+    def stream(query):
+        docs = original(query)
+        if query.collection == manager.COLLECTION and not edited:
+            # A user edit lands between the page read and the batch commit
+            edited.append(1)
+            fake_db.collection(manager.COLLECTION).document(legacy).update({"title": "Edited"})
+        return docs
+    monkeypatch.setattr(Query, "stream", stream)
+    manager.migrate_schema_page()
+    data = stored(manager, fake_db, legacy)
+    assert data["title"] == "Edited"
+    assert "bedrooms" not in data
+
+def test_migration_pages_through_collection(manager, fake_db):
+    from api.models.manager import SCHEMA_VERSION
+    for n in range(3):
+        fake_db.collection(manager.COLLECTION).document(f"legacy-{n}").set(dict(LEGACY, id=f"legacy-{n}"))
+    cursor, migrated, pages = None, 0, 0
+    while True:
+        result = manager.migrate_schema_page(cursor, batch_size=1)
+        migrated += result["migrated"]
+        pages += 1
+        cursor = result["cursor"]
+        if not cursor:
+            break
+    assert migrated == 3
+    assert pages == 4
+    assert all(stored(manager, fake_db, f"legacy-{n}")["schema_version"] == SCHEMA_VERSION for n in range(3))
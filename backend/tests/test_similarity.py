@@ -0,0 +1,51 @@
+"""
+    file: test_similarity.py
+    brief: Similar-listings lookups across workers
+"""
+# Third-party imports
+import pytest
+
+pytest.importorskip("numpy")
+
+def add(manager, title, **fields):
+    from api.models.manager import Property
+    data = {"id": "new", "title": title, "property_type": "house", "listing_type": "sale", "sale_price": 300000, "characteristics": {"bedrooms": 3, "area": 120}}
+    data.update(fields)
+    return manager.create_announcement(Property.from_dict(data))
+
+def test_unknown_listing_is_none(manager):
+    add(manager, "A")
+    assert manager.get_similar_announcements("missing") is None
+
+def test_listing_created_by_another_worker_is_found(manager, fake_db):
+    from api.models.manager import Property, SCHEMA_VERSION
+    add(manager, "A")
+    add(manager, "B", sale_price=320000)
+    manager.get_similar_announcements(next(iter(fake_db.store[manager.COLLECTION])))
+    # Written by another worker: this worker's index has not seen it
+    other = Property.from_dict({"id": "other-worker", "title": "C", "property_type": "house", "listing_type": "sale", "sale_price": 310000})
+    data = other.to_dict(include_location=True, is_owner=True)
+    data["schema_version"] = SCHEMA_VERSION
+    fake_db.collection(manager.COLLECTION).document("other-worker").set(data)
+    results = manager.get_similar_announcements("other-worker")
+    assert results is not None
+    assert {r["title"] for r in results} == {"A", "B"}
+
+def test_results_need_no_reads_per_result(manager, fake_db, monkeypatch):
+    first = add(manager, "A")
+    for n in range(4):
+        add(manager, f"B{n}", sale_price=300000 + n * 10000)
+    manager.get_similar_announcements(first)
+    reads = []
+    monkeypatch.setattr(manager, "get_announcement", lambda pid: reads.append(pid))
+    results = manager.get_similar_announcements(first, k=3)
+    assert len(results) == 3
+    assert reads == []
+
+def test_sold_listings_are_excluded(manager):
+    first = add(manager, "A")
+    sold = add(manager, "Sold", sale_price=300000)
+    add(manager, "B", sale_price=900000)
+    manager.get_similar_announcements(first)
+    manager.update_announcement(sold, {"status": "sold"})
+    assert {r["title"] for r in manager.get_similar_announcements(first)} == {"B"}
@@ -0,0 +1,120 @@
+"""
+    file: test_sync.py
+    brief: Delta-sync tokens, tombstones and the writes that must reach sync clients
+"""
+# Standard library imports
+import os
+
+# Third-party imports
+import pytest
+
+# Local imports
+from api.utils.cache import SharedCache, SqliteBackend
+
+def make(manager, title="House", **fields):
+    from api.models.manager import Property
+    data = {"id": "new", "title": title, "listing_type": "sale", "sale_price": 100000, "currency": "BRL"}
+    data.update(fields)
+    return manager.create_announcement(Property.from_dict(data))
+
+def test_first_sync_returns_everything_with_reset(manager, fake_db):
+    first = make(manager, "A")
+    second = make(manager, "B")
+    result = manager.get_changes(None)
+    assert result["reset"] is True
+    assert {item["id"] for item in result["upserts"]} == {first, second}
+    assert result["deletions"] == []
+
+def test_changes_after_token(manager, fake_db):
+    kept = make(manager, "A")
+    token = int(manager.get_changes(None)["token"])
+    fake_db.tick(60)
+    added = make(manager, "B")
+    manager.update_announcement(kept, {"title": "A2"})
+    result = manager.get_changes(token)
+    assert result["reset"] is False
+    assert {item["id"] for item in result["upserts"]} == {kept, added}
+    assert next(i for i in result["upserts"] if i["id"] == kept)["title"] == "A2"
+
+def test_deletions_are_reported_as_tombstones(manager, fake_db):
+    doomed = make(manager, "A")
+    token = int(manager.get_changes(None)["token"])
+    fake_db.tick(60)
+    manager.delete_announcement(doomed)
+    result = manager.get_changes(token)
+    assert result["deletions"] == [doomed]
+    assert result["upserts"] == []
+
+def test_idle_token_advances_past_overlap(manager, fake_db):
+    make(manager, "A")
+    token = int(manager.get_changes(None)["token"])
+    fake_db.tick(3600)
+    # The first incremental sync re-reads the overlap window once
+    token = int(manager.get_changes(token)["token"])
+    fake_db.tick(3600)
+    result = manager.get_changes(token)
+    assert result["upserts"] == []
+    assert int(result["token"]) > token
+    assert int(result["token"]) / 1e6 >= fake_db.now - manager.SYNC_OVERLAP
+
+def test_token_older_than_tombstone_retention_resets(manager, fake_db):
+    make(manager, "A")
+    token = int(manager.get_changes(None)["token"])
+    fake_db.tick(manager.TOMBSTONE_TTL + 1)
+    assert manager.get_changes(token)["reset"] is True
+
+def test_paged_changes_cover_every_write(manager, fake_db):
+    token = int(manager.get_changes(None)["token"])
+    fake_db.tick(60)
+    ids = {make(manager, f"P{i}") for i in range(5)}
+    seen = set()
+    for _ in range(10):
+        result = manager.get_changes(token, limit=2)
+        seen |= {item["id"] for item in result["upserts"]}
+        token = int(result["token"])
+        if not result["has_more"]:
+            break
+    assert seen == ids
+
+def test_reset_snapshot_bypasses_stale_cache(manager, fake_db, tmp_path):
+    manager.read_cache = manager.cache = SharedCache(SqliteBackend(os.path.join(tmp_path, "c.db"), 1 << 20))
+    make(manager, "A")
+    manager.get_all_announcements()
+    # A write the cache has not heard about (e.g. its invalidation was lost)
+    fake_db.tick(600)
+    hidden = make(manager, "B")
+    manager.cache.set(manager.COLLECTION, "list:{}", [], version=manager.cache._version(manager.COLLECTION))
+    assert manager.get_all_announcements() == []
+    result = manager.get_changes(None)
+    assert hidden in {item["id"] for item in result["upserts"]}
+
+def test_price_recompute_reaches_sync_clients(manager, fake_db):
+    if manager.rates is None:
+        pytest.skip("exchange rate table not available")
+    prop_id = make(manager, "A", currency="USD", sale_price=1000)
+    token = int(manager.get_changes(None)["token"])
+    fake_db.tick(60)
+    token = int(manager.get_changes(token)["token"])
+    fake_db.tick(60)
+    # Simulate a rate table change by clearing the stored normalized price
+    fake_db.store[manager.COLLECTION][prop_id]["data"]["normalized_price"] = None
+    assert manager.recompute_normalized_prices() == 1
+    result = manager.get_changes(token)
+    assert [item["id"] for item in result["upserts"]] == [prop_id]
+    assert result["upserts"][0]["normalized_price"] is not None
+
+def test_engagement_flush_reaches_sync_clients(manager, fake_db, monkeypatch):
+    import api.models.engagement as engagement
+    monkeypatch.setattr(engagement, "firestore", fake_db.module())
+    monkeypatch.setattr(engagement.EngagementCounters, "_ensure_flusher", lambda self: None)
+    prop_id = make(manager, "A")
+    token = int(manager.get_changes(None)["token"])
+    fake_db.tick(60)
+    token = int(manager.get_changes(token)["token"])
+    fake_db.tick(60)
+    counters = engagement.EngagementCounters(manager.COLLECTION, interval=3600)
+    counters.record(prop_id, "views")
+    counters.flush()
+    result = manager.get_changes(token)
+    assert [item["id"] for item in result["upserts"]] == [prop_id]
+    assert result["upserts"][0]["engagement"] == {"views": 1}
@@ -0,0 +1,140 @@
+"""
+    file: test_tasks.py
+    brief: Durable task queue claims, retries with backoff, leases and persistence
+"""
+# Third-party imports
+import pytest
+
+# Local imports
+import api.utils.tasks as tasks
+from api.utils.tasks import TaskQueue
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(tasks.time, "time", clock)
+    # No jitter: retry delays are exactly base_delay * 2 ** (attempt - 1)
+    monkeypatch.setattr(tasks.random, "uniform", lambda a, b: 1.0)
+    return clock
+
+@pytest.fixture
+def queue(tmp_path, clock):
+    return TaskQueue(str(tmp_path / "tasks.db"), lease_seconds=60, base_delay=2, max_delay=10)
+
+def status(queue, task_id):
+    return queue._conn().execute("SELECT status, attempts, run_at FROM tasks WHERE id = ?", (task_id,)).fetchone()
+
+def test_runs_due_task_once(queue):
+    seen = []
+    queue.task("echo")(seen.append)
+    task_id = queue.enqueue("echo", {"n": 1})
+    assert queue.run_one()
+    assert not queue.run_one()
+    assert seen == [{"n": 1}]
+    assert status(queue, task_id)[:2] == ("done", 1)
+
+def test_delayed_task_waits_until_due(queue, clock):
+    seen = []
+    queue.task("echo")(seen.append)
+    queue.enqueue("echo", {}, delay=30)
+    assert not queue.run_one()
+    clock.now += 30
+    assert queue.run_one()
+    assert seen == [{}]
+
+def test_failures_back_off_exponentially_then_fail(queue, clock):
+    @queue.task("flaky")
+    def flaky(payload):
+        raise RuntimeError("boom")
+    task_id = queue.enqueue("flaky", {}, max_attempts=4)
+    delays = []
+    for _ in range(3):
+        assert queue.run_one()
+        state, attempts, run_at = status(queue, task_id)
+        assert state == "pending"
+        delays.append(run_at - clock.now)
+        # Not due before the backoff elapses
+        assert not queue.run_one()
+        clock.now = run_at
+    assert delays == [2, 4, 8]
+    assert queue.run_one()
+    assert status(queue, task_id)[:2] == ("failed", 4)
+    assert queue.stats()["recent_failures"][0]["error"] == "boom"
+
+def test_backoff_is_capped(queue, clock):
+    queue.task("flaky")(lambda payload: 1 / 0)
+    task_id = queue.enqueue("flaky", {}, max_attempts=10)
+    for _ in range(5):
+        queue.run_one()
+        clock.now = status(queue, task_id)[2]
+    queue.run_one()
+    assert status(queue, task_id)[2] - clock.now == 10
+
+def test_retry_succeeds_after_transient_failure(queue, clock):
+    calls = []
+    @queue.task("once")
+    def once(payload):
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("transient")
+    task_id = queue.enqueue("once", {})
+    queue.run_one()
+    clock.now += 2
+    assert queue.run_one()
+    assert status(queue, task_id)[:2] == ("done", 2)
+
+def test_unknown_task_is_retried_not_dropped(queue):
+    task_id = queue.enqueue("missing", {}, max_attempts=2)
+    assert queue.run_one()
+    assert status(queue, task_id)[0] == "pending"
+
+def test_expired_lease_is_reclaimed(queue, clock):
+    task_id = queue.enqueue("echo", {})
+    # A worker claims the task and dies before finishing it
+    assert queue._claim()["id"] == task_id
+    assert queue._claim() is None
+    clock.now += 61
+    seen = []
+    queue.task("echo")(seen.append)
+    assert queue.run_one()
+    assert seen == [{}]
+    assert status(queue, task_id)[:2] == ("done", 2)
+
+def test_tasks_survive_reopening(tmp_path, clock):
+    path = str(tmp_path / "tasks.db")
+    TaskQueue(path).enqueue("echo", {"n": 2})
+    reopened = TaskQueue(path)
+    seen = []
+    reopened.task("echo")(seen.append)
+    assert reopened.run_one()
+    assert seen == [{"n": 2}]
+
+def test_purge_keeps_recent_and_unfinished_tasks(queue, clock):
+    queue.task("echo")(lambda payload: None)
+    old = queue.enqueue("echo", {})
+    queue.run_one()
+    clock.now += 8 * 86400
+    recent = queue.enqueue("echo", {})
+    queue.run_one()
+    pending = queue.enqueue("echo", {}, delay=60)
+    assert queue.purge() == 1
+    assert status(queue, old) is None
+    assert status(queue, recent)[0] == "done"
+    assert status(queue, pending)[0] == "pending"
+
+def test_default_queue_stays_out_of_the_source_tree(monkeypatch, tmp_path):
+    monkeypatch.delenv("TASK_QUEUE_PATH", raising=False)
+    monkeypatch.setattr(tasks.tempfile, "gettempdir", lambda: str(tmp_path))
+    queue = tasks.create_task_queue()
+    assert queue.path == str(tmp_path / "state_manager_tasks.db")
+    # Nothing is written until the queue is used
+    assert not list(tmp_path.iterdir())
+    queue.enqueue("echo", {})
+    assert (tmp_path / "state_manager_tasks.db").exists()
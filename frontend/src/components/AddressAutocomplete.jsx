@@ -1,5 +1,6 @@
 import React, { useState, useEffect, useRef } from 'react';
 import { Search, MapPin, Loader, X } from 'lucide-react';
+import api from '../api';
 
 const AddressAutocomplete = ({
     value,
@@ -42,11 +43,9 @@ const AddressAutocomplete = ({
             if (value && value.length > 2 && showSuggestions) {
                 setLoading(true);
                 try {
-                    const response = await fetch(
-                        `https://nominatim.openstreetmap.org/search?format=json&q=${encodeURIComponent(value)}&addressdetails=1&limit=5`
-                    );
-                    const data = await response.json();
-                    setSuggestions(data);
+                    // Backend proxy caches and coalesces geocoder lookups
+                    const response = await api.get('/geo/autocomplete', { params: { q: value, limit: 5 } });
+                    setSuggestions(response.data);
                 } catch (error) {
                     console.error('Autocomplete failed:', error);
                     setSuggestions([]);
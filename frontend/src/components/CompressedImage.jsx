@@ -1,6 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import { getImageDisplayUrl } from '../utils/imageCompression';
-import { auth } from '../utils/databaseAuth';
+import { getProfilePhotoUrl } from '../utils/profilePhotos';
 
 /**
  * Image component that automatically handles compressed images
@@ -23,27 +23,12 @@ const CompressedImage = ({ src, alt = '', className = '', onError, style, ...pro
             setError(false);
 
             try {
-                // Check if it's a profile reference that needs to be fetched
+                // Profile references resolve to the versioned, browser-cacheable image endpoint
                 if (src.startsWith('profile:')) {
                     const uid = src.split(':')[1];
-                    const user = auth.currentUser;
-                    if (user) {
-                        const token = await user.getIdToken();
-                        const apiBase = import.meta.env.API_BASE_URL || 'http://localhost:5000/api';
-                        const response = await fetch(`${apiBase}/user/profile-photo/${uid}`, {
-                            headers: {
-                                'Authorization': `Bearer ${token}`
-                            }
-                        });
-
-                        if (response.ok) {
-                            const data = await response.json();
-                            // Now decompress the fetched photo data
-                            const url = getImageDisplayUrl(data.photoData);
-                            setDisplayUrl(url);
-                        } else {
-                            setError(true);
-                        }
+                    const url = await getProfilePhotoUrl(uid);
+                    if (url) {
+                        setDisplayUrl(url);
                     } else {
                         setError(true);
                     }
@@ -1,7 +1,8 @@
-import React, { createContext, useContext, useState, useEffect } from 'react';
+import React, { createContext, useContext, useState, useEffect, useCallback } from 'react';
 import { useAuthState } from 'react-firebase-hooks/auth';
 import { auth } from '../utils/databaseAuth';
 import api from '../api';
+import { syncAnnouncements } from '../utils/announcementSync';
 
 const FavoritesContext = createContext();
 
@@ -11,6 +12,9 @@ export const FavoritesProvider = ({ children }) => {
     const [user] = useAuthState(auth);
     const [favorites, setFavorites] = useState([]);
     const [loading, setLoading] = useState(true);
+    // Favorite listings from the delta-synced announcement cache, in favorites order
+    const [favoriteProperties, setFavoriteProperties] = useState([]);
+    const [propertiesLoading, setPropertiesLoading] = useState(true);
 
     useEffect(() => {
         const fetchFavorites = async () => {
@@ -34,6 +38,30 @@ export const FavoritesProvider = ({ children }) => {
         fetchFavorites();
     }, [user]);
 
+    const refreshFavoriteProperties = useCallback(async () => {
+        if (favorites.length === 0) {
+            setFavoriteProperties([]);
+            setPropertiesLoading(false);
+            return;
+        }
+        setPropertiesLoading(true);
+        try {
+            const all = await syncAnnouncements();
+            const byId = Object.fromEntries(all.map(p => [p.id, p]));
+            // Deleted listings are simply absent from the cache
+            setFavoriteProperties(favorites.map(id => byId[id]).filter(Boolean));
+        } catch (err) {
+            console.error('Failed to sync favorite properties:', err);
+        } finally {
+            setPropertiesLoading(false);
+        }
+    }, [favorites]);
+
+    useEffect(() => {
+        if (loading) return;
+        refreshFavoriteProperties();
+    }, [loading, refreshFavoriteProperties]);
+
     const addFavorite = async (propertyId) => {
         if (!user) return; // Or show login modal
         try {
@@ -69,7 +97,7 @@ export const FavoritesProvider = ({ children }) => {
     };
 
     return (
-        <FavoritesContext.Provider value={{ favorites, addFavorite, removeFavorite, isFavorite, loading }}>
+        <FavoritesContext.Provider value={{ favorites, addFavorite, removeFavorite, isFavorite, loading, favoriteProperties, propertiesLoading, refreshFavoriteProperties }}>
             {children}
         </FavoritesContext.Provider>
     );
@@ -8,44 +8,16 @@ import { Heart } from 'lucide-react';
 
 const Favorites = () => {
     const { t } = useLanguage();
-    const { favorites, loading: authLoading } = useFavorites();
-    const [properties, setProperties] = useState([]);
-    const [loading, setLoading] = useState(true);
+    // Listings come from the context, which merges favorites with the delta-synced cache
+    const { favorites, loading: authLoading, favoriteProperties: properties, propertiesLoading: loading } = useFavorites();
 
     const [propertyStatuses, setPropertyStatuses] = useState([]);
 
     useEffect(() => {
-        const fetchProperties = async () => {
-            if (authLoading) return;
-
-            if (favorites.length === 0) {
-                setProperties([]);
-                setLoading(false);
-                return;
-            }
-
-            setLoading(true);
-            try {
-                // Fetch statuses and properties in parallel
-                const [statusesRes, ...propertiesRes] = await Promise.all([
-                    api.get('/statuses'),
-                    ...favorites.map(id =>
-                        api.get(`/announcements/${id}`).then(res => res.data).catch(() => null)
-                    )
-                ]);
-
-                setPropertyStatuses(statusesRes.data);
-                const validProperties = propertiesRes.filter(p => p !== null);
-                setProperties(validProperties);
-            } catch (err) {
-                console.error('Failed to fetch favorite properties:', err);
-            } finally {
-                setLoading(false);
-            }
-        };
-
-        fetchProperties();
-    }, [favorites, authLoading]);
+        api.get('/statuses')
+            .then(res => setPropertyStatuses(res.data))
+            .catch(err => console.error('Failed to fetch property statuses:', err));
+    }, []);
 
     if (authLoading) {
         return (
@@ -3,6 +3,7 @@ import { Search, Filter, MapPin, ChevronRight, ChevronLeft, Trash2, Edit, Calend
 import { motion as Motion, AnimatePresence } from 'framer-motion';
 import { Link, useNavigate, useLocation } from 'react-router-dom';
 import api from '../api';
+import { syncAnnouncements, matchesServerFilters } from '../utils/announcementSync';
 import PropertyStatusBadges from '../components/PropertyStatusBadges';
 import CompressedImage from '../components/CompressedImage';
 import PropertyCardSkeleton from '../components/PropertyCardSkeleton';
@@ -339,8 +340,9 @@ const Home = () => {
             matchesBedrooms && matchesBathrooms && matchesSuites && matchesRooms && matchesGarages &&
             matchesMinArea && matchesMaxArea && matchesAmenities && matchesCountry && matchesState && matchesCity;
     }).sort((a, b) => {
-        if (filter.sortBy === 'price_asc') return Number(a.price) - Number(b.price);
-        if (filter.sortBy === 'price_desc') return Number(b.price) - Number(a.price);
+        // normalized_price is in one base currency with rents as monthly equivalents
+        if (filter.sortBy === 'price_asc') return Number(a.normalized_price ?? a.price) - Number(b.normalized_price ?? b.price);
+        if (filter.sortBy === 'price_desc') return Number(b.normalized_price ?? b.price) - Number(a.normalized_price ?? a.price);
         if (filter.sortBy === 'newest') return new Date(b.created_at || 0) - new Date(a.created_at || 0);
         if (filter.sortBy === 'oldest') return new Date(a.created_at || 0) - new Date(b.created_at || 0);
         if (filter.sortBy === 'beds_desc') return Number(b.characteristics?.bedrooms || 0) - Number(a.characteristics?.bedrooms || 0);
@@ -427,17 +429,9 @@ const Home = () => {
             }
 
             try {
-                const res = await fetch('https://countriesnow.space/api/v0.1/countries/states', {
-                    method: 'POST',
-                    headers: { 'Content-Type': 'application/json' },
-                    body: JSON.stringify({ country: filter.country })
-                });
-                const json = await res.json();
-                if (!json.error) {
-                    setCountryStates(json.data.states.map(s => s.name));
-                } else {
-                    setCountryStates([]);
-                }
+                // Served from the backend's bundled geo dataset (cached)
+                const res = await api.get('/geo/states', { params: { country: filter.country } });
+                setCountryStates(res.data.map(s => s.name));
             } catch (err) {
                 console.error('Failed to fetch states:', err);
                 setCountryStates([]);
@@ -455,17 +449,8 @@ const Home = () => {
             }
 
             try {
-                const res = await fetch('https://countriesnow.space/api/v0.1/countries/state/cities', {
-                    method: 'POST',
-                    headers: { 'Content-Type': 'application/json' },
-                    body: JSON.stringify({ country: filter.country, state: filter.state })
-                });
-                const json = await res.json();
-                if (!json.error) {
-                    setStateCities(json.data);
-                } else {
-                    setStateCities([]);
-                }
+                const res = await api.get('/geo/cities', { params: { country: filter.country, state: filter.state } });
+                setStateCities(res.data);
             } catch (err) {
                 console.error('Failed to fetch cities:', err);
                 setStateCities([]);
@@ -483,9 +468,11 @@ const Home = () => {
                 if (filter.minPrice) params.min_price = filter.minPrice;
                 if (filter.maxPrice) params.max_price = filter.maxPrice;
 
-                const res = await api.get('/announcements', { params });
-                setProperties(res.data);
-                sessionStorage.setItem('home_properties', JSON.stringify(res.data));
+                // Delta sync: only listings changed since the last visit are downloaded
+                const all = await syncAnnouncements();
+                const data = all.filter(item => matchesServerFilters(item, params));
+                setProperties(data);
+                sessionStorage.setItem('home_properties', JSON.stringify(data));
                 sessionStorage.setItem('home_filter', JSON.stringify(filter));
                 setLoading(false);
             } catch (err) {
@@ -7,6 +7,7 @@ import { motion as Motion } from 'framer-motion';
 import ImageEditor from '../components/ImageEditor';
 import CompressedImage from '../components/CompressedImage';
 import { useLanguage } from '../contexts/LanguageContext';
+import { getProfilePhotoUrl, invalidateProfilePhoto } from '../utils/profilePhotos';
 
 const Profile = () => {
     const { t } = useLanguage();
@@ -27,25 +28,11 @@ const Profile = () => {
             if (user) {
                 setDisplayName(user.displayName || '');
 
-                // Check if photoURL is a reference to Firestore
+                // Check if photoURL is a reference to a stored photo
                 if (user.photoURL && user.photoURL.startsWith('profile:')) {
                     try {
                         const uid = user.photoURL.split(':')[1];
-                        const token = await user.getIdToken();
-                        const apiBase = import.meta.env.API_BASE_URL || 'http://localhost:5000/api';
-                        const response = await fetch(`${apiBase}/user/profile-photo/${uid}`, {
-                            headers: {
-                                'Authorization': `Bearer ${token}`
-                            }
-                        });
-
-                        if (response.ok) {
-                            const data = await response.json();
-                            setPhotoURL(data.photoData);
-                        } else {
-                            // Fallback to Google photo or empty
-                            setPhotoURL('');
-                        }
+                        setPhotoURL(await getProfilePhotoUrl(uid) || '');
                     } catch (error) {
                         console.error('Failed to load profile photo:', error);
                         setPhotoURL('');
@@ -66,10 +53,8 @@ const Profile = () => {
         setMessage({ type: '', text: '' });
 
         try {
-            await updateProfile(user, {
-                displayName,
-                photoURL
-            });
+            // photoURL holds a display URL; the stored reference is only set by the photo upload
+            await updateProfile(user, { displayName });
             setMessage({ type: 'success', text: t('profile.success_update') });
         } catch (error) {
             setMessage({ type: 'error', text: error.message });
@@ -150,6 +135,8 @@ const Profile = () => {
 
             // Update Firebase profile with reference (not the full data)
             await updateProfile(user, { photoURL: photoReference });
+            // Other components pick up the new version on their next lookup
+            invalidateProfilePhoto(user.uid);
 
             setMessage({ type: 'success', text: t('profile.photo_updated') });
         } catch (error) {
@@ -0,0 +1,59 @@
+import api from '../api';
+
+const STORAGE_KEY = 'announcement_sync';
+
+const load = () => {
+    try {
+        const stored = JSON.parse(localStorage.getItem(STORAGE_KEY));
+        if (stored && stored.token && stored.items) return stored;
+    } catch (err) {
+        console.error('Failed to read announcement cache:', err);
+    }
+    return { token: null, items: {} };
+};
+
+const save = (state) => {
+    try {
+        localStorage.setItem(STORAGE_KEY, JSON.stringify(state));
+    } catch (err) {
+        // Quota exceeded: drop the cache, the next sync starts from scratch
+        localStorage.removeItem(STORAGE_KEY);
+    }
+};
+
+let inflight = null;
+
+/**
+ * Bring the local announcement cache up to date through /announcements/changes
+ * and return every cached listing. Only changed listings are downloaded after
+ * the first sync. Concurrent callers share one request.
+ */
+export const syncAnnouncements = () => {
+    if (inflight) return inflight;
+    inflight = (async () => {
+        const state = load();
+        let hasMore = true;
+        while (hasMore) {
+            const res = await api.get('/announcements/changes', { params: state.token ? { since: state.token } : {} });
+            const { upserts, deletions, token, reset, has_more } = res.data;
+            if (reset) state.items = {};
+            // Upserts first: a listing edited and then deleted must end up deleted
+            upserts.forEach(item => { state.items[item.id] = item; });
+            deletions.forEach(id => { delete state.items[id]; });
+            state.token = token;
+            hasMore = has_more;
+        }
+        save(state);
+        return Object.values(state.items);
+    })().finally(() => { inflight = null; });
+    return inflight;
+};
+
+/** Same filters the backend applies to /announcements. */
+export const matchesServerFilters = (item, params) => {
+    if (params.type && item.property_type !== params.type) return false;
+    if (params.listing_type && item.listing_type !== params.listing_type) return false;
+    if (params.min_price && item.price < parseFloat(params.min_price)) return false;
+    if (params.max_price && item.price > parseFloat(params.max_price)) return false;
+    return true;
+};
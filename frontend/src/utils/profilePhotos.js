@@ -0,0 +1,57 @@
+import api from '../api';
+
+// uid -> Promise<version | null>
+const versions = new Map();
+let pending = new Map();
+let timer = null;
+
+const flush = async () => {
+    const batch = pending;
+    pending = new Map();
+    timer = null;
+    const uids = [...batch.keys()];
+    // The endpoint accepts at most 100 uids per request
+    for (let i = 0; i < uids.length; i += 100) {
+        const chunk = uids.slice(i, i + 100);
+        try {
+            const res = await api.post('/user/profile-photos', { uids: chunk });
+            chunk.forEach(uid => batch.get(uid).resolve(res.data.versions?.[uid] ?? null));
+        } catch (err) {
+            console.error('Failed to load profile photo versions:', err);
+            chunk.forEach(uid => {
+                versions.delete(uid);
+                batch.get(uid).resolve(null);
+            });
+        }
+    }
+};
+
+/**
+ * Photo version of a user. Lookups made in the same tick (e.g. a page of
+ * listing cards) share one /user/profile-photos request.
+ */
+const getProfilePhotoVersion = (uid) => {
+    if (!versions.has(uid)) {
+        let resolve;
+        const promise = new Promise(r => { resolve = r; });
+        pending.set(uid, { resolve });
+        versions.set(uid, promise);
+        if (!timer) timer = setTimeout(flush, 0);
+    }
+    return versions.get(uid);
+};
+
+/**
+ * Versioned, cacheable image URL for a profile photo, or null when the user has none.
+ * The browser caches it for a year; a new photo gets a new version and URL.
+ */
+export const getProfilePhotoUrl = async (uid) => {
+    const version = await getProfilePhotoVersion(uid);
+    if (!version) return null;
+    return `${api.defaults.baseURL}/user/profile-photo/${encodeURIComponent(uid)}/image?v=${encodeURIComponent(version)}`;
+};
+
+/** Forget a cached version (after the user uploads a new photo). */
+export const invalidateProfilePhoto = (uid) => {
+    versions.delete(uid);
+};